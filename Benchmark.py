@@ -0,0 +1,386 @@
+'''
+Performance benchmarks of Factory3 components.
+Synthetic flowsheets of DummyUnitOps (chains, trees, random DAGs, recycles) and large Spreadsheets are generated,
+solver passes, SetValue, spreadsheet resize and unit conversion are timed, memory taken by properties is measured.
+Results are written to JSON file and can be compared with results of another commit to flag regressions:
+
+    python Benchmark.py --output new.json --compare old.json
+'''
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import random
+import tracemalloc
+from queue import PriorityQueue
+
+import numpy as np
+
+from Factory3 import CalcScheduler, Flowsheet, DummyUnitOp, Connector, Spreadsheet, CellName, NumericalProperty, UnitTypeEnum, PropertyStateEnum, Units
+
+
+class FakeUnitOp:
+    '''
+    Minimal object with fields used by solver queues
+    '''
+    def __init__(self, id, calcOrder):
+        self.Id = id
+        self.CalcOrder = calcOrder
+
+
+def BenchmarkScheduler(count = 100000):
+    '''
+    Enqueue/dequeue throughput of CalcScheduler compared with PriorityQueue + id set,
+    which were used by SequentialSolver before
+    '''
+    items = [FakeUnitOp(i, random.randint(0, 1000)) for i in range(count)]
+    results = {}
+
+    start = time.perf_counter()
+    queue = PriorityQueue()
+    ids = set()
+    for item in items:
+        if item.Id not in ids:
+            ids.add(item.Id)
+            queue.put((item.CalcOrder, item.Id, item))
+    while not queue.empty():
+        order, id, element = queue.get()
+        ids.remove(id)
+    results["PriorityQueue"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scheduler = CalcScheduler()
+    for item in items:
+        scheduler.TryAdd(item)
+    while scheduler.TryPop() is not None:
+        pass
+    results["CalcScheduler"] = time.perf_counter() - start
+
+    for name, elapsed in results.items():
+        print(f"{name:>15}: {elapsed:8.4f} s, {2 * count / elapsed:12.0f} ops/s")
+    return results
+
+
+class DictProperty:
+    '''
+    Object with the same attributes as NumericalProperty had before PropertyStore (kept in __dict__)
+    '''
+    def __init__(self, tag, unitType, owner, value):
+        self.Tag = tag
+        self.UnitType = unitType
+        self.TriggerSolve = False
+        self.Owner = owner
+        self._property_state = PropertyStateEnum.SPECIFIED
+        self.CanModify = True
+        self._calc_by = None
+        self._value = value
+        self.NewValue = None
+
+
+def MeasureMemory(create):
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objects = create()
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return size, objects
+
+
+def BenchmarkPropertyMemory(count = 100000):
+    '''
+    Memory used by properties: old dict-based objects, PropertyStore and ArrayPropertyStore
+    '''
+    results = {}
+    # Tags are shared by all variants and are not measured
+    tags = [f"P{i}" for i in range(count)]
+    flowsheet = Flowsheet()
+    owner = DummyUnitOp("Owner", flowsheet)
+    results["__dict__ objects"], _ = MeasureMemory(
+        lambda: [DictProperty(tags[i], UnitTypeEnum.PRESSURE, owner, float(i)) for i in range(count)])
+
+    for name, compact in (("PropertyStore", False), ("ArrayPropertyStore", True)):
+        flowsheet = Flowsheet(compact)
+        owner = DummyUnitOp("Owner", flowsheet)
+        results[name], _ = MeasureMemory(
+            lambda: [NumericalProperty(tags[i], UnitTypeEnum.PRESSURE, owner, False, None, float(i)) for i in range(count)])
+
+    for name, size in results.items():
+        print(f"{name:>20}: {size / 2**20:8.2f} MiB, {size / count:6.1f} bytes per property")
+    return results
+
+
+def BenchmarkUnits(count = 100000):
+    '''
+    Scalar conversion to SI: UnitsLibrary dict path, cached affine conversion and compiled unit expression
+    '''
+    results = {}
+    values = [float(i) for i in range(count)]
+
+    start = time.perf_counter()
+    for value in values:
+        Units.UnitsLibrary[UnitTypeEnum.MASS_FLOW]["t/h"].convert_to_si(value)
+    results["UnitsLibrary t/h"] = time.perf_counter() - start
+
+    for units in ("t/h", "t/d", "kg/[h*s]*s"):
+        start = time.perf_counter()
+        for value in values:
+            scale, offset = Units.GetConversion(UnitTypeEnum.MASS_FLOW, units, "")
+            value * scale + offset
+        results[f"GetConversion {units}"] = time.perf_counter() - start
+
+    for name, elapsed in results.items():
+        print(f"{name:>25}: {elapsed:8.4f} s, {count / elapsed:12.0f} conversions/s")
+    return results
+
+
+def Connect(flowsheet, upstream, downstream, pressure = True, temperature = True):
+    '''
+    Connects outlet of upstream DummyUnitOp to inlet of downstream one
+    '''
+    if pressure:
+        Connector(f"P_{upstream.Name}_{downstream.Name}", flowsheet, upstream.PressureOut, downstream.PressureIn)
+    if temperature:
+        Connector(f"T_{upstream.Name}_{downstream.Name}", flowsheet, upstream.TemperatureOut, downstream.TemperatureIn)
+
+
+def BuildChain(flowsheet, count):
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    for i in range(1, count):
+        Connect(flowsheet, unitOps[i - 1], unitOps[i])
+    return unitOps
+
+
+def BuildTree(flowsheet, count):
+    '''
+    Binary tree: outlet of every unitop feeds two children
+    '''
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    for i in range(1, count):
+        Connect(flowsheet, unitOps[(i - 1) // 2], unitOps[i])
+    return unitOps
+
+
+def BuildRandomDag(flowsheet, count, seed = 0):
+    '''
+    Random DAG: pressure and temperature of every unitop come from two random previous unitops
+    '''
+    generator = random.Random(seed)
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    for i in range(1, count):
+        Connect(flowsheet, unitOps[generator.randrange(i)], unitOps[i], temperature = False)
+        Connect(flowsheet, unitOps[generator.randrange(i)], unitOps[i], pressure = False)
+    return unitOps
+
+
+def BuildRecycle(flowsheet, count, loopSize = 10):
+    '''
+    Chain split into loops of loopSize unitops: outlet pressure of last unitop in loop is recycled to the first one.
+    Temperature goes through the whole chain
+    '''
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    for i in range(1, count):
+        Connect(flowsheet, unitOps[i - 1], unitOps[i], pressure = i % loopSize != 0)
+    for start in range(0, count - loopSize + 1, loopSize):
+        Connect(flowsheet, unitOps[start + loopSize - 1], unitOps[start], temperature = False)
+    return unitOps
+
+
+def GetSpecs(topology, unitOps, loopSize = 10):
+    specs = {}
+    for i, unitOp in enumerate(unitOps):
+        if topology == "recycle" and i % loopSize == 0:
+            # Pressure drop of last unitop in loop isn't specified, so recycled pressure is never calculated
+            specs[unitOp.PressureIn] = 1e7
+        if not (topology == "recycle" and (i + 1) % loopSize == 0):
+            specs[unitOp.PressureDrop] = 1.0
+        specs[unitOp.TemperatureDrop] = 0.1
+    specs[unitOps[0].PressureIn] = 1e7
+    specs[unitOps[0].TemperatureIn] = 1e4
+    return specs
+
+
+Topologies = {"chain": BuildChain, "tree": BuildTree, "dag": BuildRandomDag, "recycle": BuildRecycle}
+
+
+def Timed(results, key, action):
+    start = time.perf_counter()
+    action()
+    results[key] = time.perf_counter() - start
+
+
+def BenchmarkFlowsheet(topology, count):
+    '''
+    Build, forgetting pass, solving pass, SetValue and Clone timings for synthetic flowsheet
+    '''
+    results = {}
+    prefix = f"flowsheet/{topology}/{count}"
+    flowsheet = Flowsheet()
+    unitOps = []
+    Timed(results, f"{prefix}/build", lambda: unitOps.extend(Topologies[topology](flowsheet, count)))
+
+    recycles = {unitOp.Name for component in flowsheet.GetRecycles() for unitOp in component}
+    specs = GetSpecs(topology, unitOps)
+    Timed(results, f"{prefix}/specify", lambda: flowsheet.SetValues(specs))
+    Timed(results, f"{prefix}/solving_pass", flowsheet.ActivateSolver)
+
+    flowsheet.DisableSolver()
+    Timed(results, f"{prefix}/forgetting_pass", lambda: unitOps[0].PressureDrop.SetValue(2.0))
+    Timed(results, f"{prefix}/solving_pass_after_change", flowsheet.ActivateSolver)
+
+    Timed(results, f"{prefix}/set_value_root", lambda: unitOps[0].PressureDrop.SetValue(1.0))
+    Timed(results, f"{prefix}/set_value_leaf", lambda: unitOps[-1].TemperatureDrop.SetValue(0.2))
+    Timed(results, f"{prefix}/clone", flowsheet.Clone)
+    results[f"{prefix}/recycle_unitops"] = len(recycles)
+    return results
+
+
+def BenchmarkSpreadsheet(size):
+    results = {}
+    prefix = f"spreadsheet/{size}"
+    flowsheet = Flowsheet()
+    sheets = []
+    Timed(results, f"{prefix}/create", lambda: sheets.append(Spreadsheet(size, size, "Sheet", flowsheet)))
+    Timed(results, f"{prefix}/add_rows", lambda: sheets[0].NumberOfRows(size + size // 10))
+    sheet = Spreadsheet(size, size, "Sheet2", flowsheet)
+    Timed(results, f"{prefix}/add_columns", lambda: sheet.NumberOfColums(size + size // 10))
+    Timed(results, f"{prefix}/grow_by_one", lambda: [sheet.NumberOfRows(size + size // 10 + i) for i in range(1, 101)])
+    Timed(results, f"{prefix}/scan_cells", lambda: [sheet.Table[i][j].Value for i in range(size) for j in range(0, size, 10)])
+    sheet.Table[0][0].Formula = f"=SUM(B1:{CellName(size - 1, size - 1)})"
+    Timed(results, f"{prefix}/sum_link", sheet.Recalculate)
+    def UpdateSum():
+        for i in range(100):
+            sheet.Table[size // 2][size // 2].Value = float(i)
+            sheet.Recalculate()
+    Timed(results, f"{prefix}/sum_update", UpdateSum)
+
+    # Sparse table: 10 times more rows, 1% of cells populated
+    sparse = Spreadsheet(10 * size, size, "Sheet3", flowsheet)
+    cells = [(random.randrange(10 * size), random.randrange(size)) for _ in range(10 * size * size // 100)]
+    def Fill():
+        with flowsheet.Batch():
+            for row, column in cells:
+                sparse.Table[row][column].Value = 1.0
+    Timed(results, f"{prefix}/sparse_fill", Fill)
+    Timed(results, f"{prefix}/sparse_scan_rows", lambda: [sparse.GetRow(row) for row in range(10 * size)])
+    Timed(results, f"{prefix}/sparse_range", lambda: sparse.GetValues((0, 0), (5 * size, size // 2)).sum())
+    return results
+
+
+def BenchmarkConversions(count):
+    results = {}
+    prefix = f"units/{count}"
+    flowsheet = Flowsheet()
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    flowsheet.SetValues({unitOp.PressureIn : float(i) for i, unitOp in enumerate(unitOps)})
+    props = [unitOp.PressureIn for unitOp in unitOps]
+    Timed(results, f"{prefix}/get_value_scalar", lambda: [prop.GetValue("kPa") for prop in props])
+    Timed(results, f"{prefix}/get_values_array", lambda: flowsheet.GetValues(props, "kPa"))
+    return results
+
+
+class HeavyUnitOp(DummyUnitOp):
+    '''
+    DummyUnitOp doing NumPy work, which releases GIL, in every solving calculation (like native property packages)
+    '''
+    Matrix = np.random.default_rng(0).random((100, 100)) + 100 * np.eye(100)
+
+    def Calculate(self, IsForgetting: bool):
+        if not IsForgetting:
+            np.linalg.solve(self.Matrix, self.Matrix)
+        return super().Calculate(IsForgetting)
+
+
+def BenchmarkParallel(count, workers, trains = 8):
+    '''
+    ParallelSolver compared with SequentialSolver on independent chains of unitops
+    '''
+    results = {}
+    prefix = f"parallel/{count}"
+    for name, solverWorkers in (("sequential", 1), (f"workers_{workers}", workers)):
+        flowsheet = Flowsheet(workers = solverWorkers)
+        specs = {}
+        for train in range(trains):
+            unitOps = [HeavyUnitOp(f"U{train}_{i}", flowsheet) for i in range(count // trains)]
+            for i in range(1, len(unitOps)):
+                Connect(flowsheet, unitOps[i - 1], unitOps[i])
+            specs.update(GetSpecs("chain", unitOps))
+        flowsheet.SetValues(specs)
+        Timed(results, f"{prefix}/{name}", flowsheet.ActivateSolver)
+    speedup = results[f"{prefix}/sequential"] / results[f"{prefix}/workers_{workers}"]
+    print(f"parallel {count}: {speedup:.2f}x speedup with {workers} workers", file = sys.stderr)
+    return results
+
+
+def RunSuite(sizes, spreadsheetSizes, topologies, workers = 4):
+    results = {}
+    for topology in topologies:
+        for size in sizes:
+            print(f"flowsheet {topology} {size}...", file = sys.stderr)
+            results.update(BenchmarkFlowsheet(topology, size))
+    for size in spreadsheetSizes:
+        print(f"spreadsheet {size}...", file = sys.stderr)
+        results.update(BenchmarkSpreadsheet(size))
+    for size in sizes:
+        results.update(BenchmarkConversions(size))
+    if workers > 1:
+        results.update(BenchmarkParallel(min(sizes), workers))
+    for name, elapsed in BenchmarkScheduler(max(sizes)).items():
+        results[f"scheduler/{max(sizes)}/{name}"] = elapsed
+    for name, elapsed in BenchmarkUnits(max(sizes)).items():
+        results[f"units/{max(sizes)}/{name}"] = elapsed
+    for name, size in BenchmarkPropertyMemory(max(sizes)).items():
+        results[f"memory/{max(sizes)}/{name}"] = size
+    return results
+
+
+def GetCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def CompareResults(old, new, threshold):
+    '''
+    Prints timings, which are slower than old ones by more than threshold (fraction). Returns list of regressions
+    '''
+    regressions = []
+    for key, value in new.items():
+        oldValue = old.get(key)
+        if not oldValue or key.endswith("recycle_unitops"):
+            continue
+        ratio = value / oldValue
+        if ratio > 1 + threshold:
+            regressions.append(key)
+        print(f"{key:>55}: {oldValue:10.4f} -> {value:10.4f} ({ratio:5.2f}x){'  REGRESSION' if ratio > 1 + threshold else ''}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = "Factory3 benchmark suite")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [100, 1000, 10000, 100000],
+                        help = "numbers of unitops, the largest one is used by scheduler, units and property memory benchmarks (100000 takes a few minutes)")
+    parser.add_argument("--spreadsheet-sizes", type = int, nargs = "+", default = [100, 300, 1000], help = "spreadsheet sizes")
+    parser.add_argument("--topologies", nargs = "+", default = list(Topologies), choices = list(Topologies))
+    parser.add_argument("--workers", type = int, default = 4, help = "threads of ParallelSolver benchmark (1 - skip it)")
+    parser.add_argument("--output", default = "bench_output.json", help = "JSON file for results")
+    parser.add_argument("--compare", help = "JSON file with results of another commit")
+    parser.add_argument("--threshold", type = float, default = 0.2, help = "slowdown fraction flagged as regression")
+    args = parser.parse_args()
+
+    results = RunSuite(args.sizes, args.spreadsheet_sizes, args.topologies, args.workers)
+    document = {"commit": GetCommit(), "python": platform.python_version(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results}
+    with open(args.output, "w") as file:
+        json.dump(document, file, indent = 1)
+
+    if args.compare:
+        with open(args.compare) as file:
+            old = json.load(file)["results"]
+        if CompareResults(old, results, args.threshold):
+            sys.exit(1)
+    else:
+        for key, value in results.items():
+            print(f"{key:>55}: {value:10.4f}")
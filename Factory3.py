@@ -1,13 +1,46 @@
 from enum import Enum
-from queue import PriorityQueue
-from typing import Set
+from collections import OrderedDict
+from collections.abc import Mapping
+from heapq import heappush, heappop, heapify
+from functools import lru_cache
 import random
+import re
+import json
+import time
+import threading
+import asyncio
+import struct
+import zipfile
+import copy
+import weakref
 from abc import abstractmethod
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 #from .Factory3 import Flowsheet
 
 import numpy as np
 
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.linalg import spsolve
+except ImportError:
+    # EquationSolver uses dense NumPy solver without SciPy
+    csr_matrix = None
+
+try:
+    import formulas
+    # Value of blank cell in formulas of library formulas
+    from schedula import EMPTY as BlankValue
+    from formulas.tokens.operand import Error as FormulaError
+    # Errors of formulas by code (#DIV/0!, #N/A, ...)
+    FormulaErrors = FormulaError.errors
+except ImportError:
+    # Formulas of spreadsheet cells are unavailable without formulas library
+    formulas = None
+    BlankValue = None
+    FormulaErrors = {}
+
 
 def Compare(val1, val2):
     '''
@@ -16,6 +49,18 @@ def Compare(val1, val2):
     '''
     return abs(val1 - val2) < 1e-5 +  + 1e-5 * (abs(val1) + abs(val2)) * 0.5
 
+def Quantize(value):
+    '''
+    Rounds float point value to accuracy of Compare method (5 decimal places or 6 significant digits),
+    is used to build keys of unitop result caches. Non-finite values are returned unchanged
+    '''
+    if value is None or value == 0 or not np.isfinite(value):
+        return value
+    magnitude = abs(value)
+    if magnitude < 1:
+        return round(value, 5)
+    return round(value, 5 - len(str(int(magnitude))) + 1)
+
 class UnitTypeEnum(Enum):
     '''
     Enumeration class including types of different physical values
@@ -40,6 +85,7 @@ class UnitTypeEnum(Enum):
     UNITLESS = 18
     NONE = 19
     INDEX = 20
+    MASS_ENTHALPY = 21
 class PropertyStateEnum(Enum):
     '''
     Enumeration class including states of properties
@@ -51,10 +97,27 @@ class SolverStateEnum(Enum):
     '''
     Enumeration class including states of solver
     In Frozen state solver calls only forgetting pass for unitops, 
-    in Active state solver also calls solving pass for unitops (see SequentialSolver.Solve()) 
+    in Active state solver also calls solving pass for unitops (see SequentialSolver.Solve()),
+    in Lazy state solver calls only forgetting pass, unitops are calculated when value of property is requested (see SequentialSolver.Pull())
     '''
     Frozen = 0,
     Active = 1
+    Lazy = 2
+class CellStateEnum(Enum):
+    '''
+    Enumeration class including states of spreadsheet cells (codes are kept in Spreadsheet.States)
+    '''
+    EMPTY = 0
+    CONSTANT = 1
+    FORMULA = 2
+    IMPORTED = 3
+class ConvergenceMethodEnum(Enum):
+    '''
+    Enumeration class including methods of recycle convergence (see RecycleConverger)
+    '''
+    DirectSubstitution = 0
+    Wegstein = 1
+    Broyden = 2
 
 
 class UnitToSiConversion:
@@ -72,10 +135,244 @@ class UnitToSiConversion:
     def convert_from_si(self, value_in_si):
         return (value_in_si - self._bias) / self._factor
     
+class UnitParser:
+    '''
+    Parser of unit expressions with prefixes, products, quotients and powers, e.g. "kJ/[kmole*K]", "t/d", "m/s2", "m^3".
+    Expression is compiled once into affine UnitToSiConversion, its dimension is validated against UnitTypeEnum.
+    Compiled conversions are kept in bounded LRU cache
+    '''
+    # Dimension exponents: (mass, length, time, temperature, amount)
+    Mass = (1, 0, 0, 0, 0)
+    Length = (0, 1, 0, 0, 0)
+    Time = (0, 0, 1, 0, 0)
+    Temperature = (0, 0, 0, 1, 0)
+    Amount = (0, 0, 0, 0, 1)
+    Volume = (0, 3, 0, 0, 0)
+    Force = (1, 1, -2, 0, 0)
+    Pressure = (1, -1, -2, 0, 0)
+    Energy = (1, 2, -2, 0, 0)
+    Power = (1, 2, -3, 0, 0)
+
+    @staticmethod
+    def Combine(*terms):
+        '''
+        Dimension of product of (dimension, power) terms
+        '''
+        return tuple(sum(dims[i] * power for dims, power in terms) for i in range(5))
+
+    Dimensionless = (0, 0, 0, 0, 0)
+
+    Prefixes = {"n": 1e-9, "µ": 1e-6, "u": 1e-6, "m": 1e-3, "c": 1e-2, "d": 1e-1, "k": 1e3, "M": 1e6, "G": 1e9}
+
+    Symbols : dict[str, tuple[float, tuple]] = {}
+
+    # Bias is used only if whole expression is single unit of absolute temperature (in brackets, with power 1),
+    # so temperature units can't have prefixes. Absolute temperature in products and powers is an error
+    TemperatureBias = {"C": 273.15}
+
+    Dimensions : dict[UnitTypeEnum, tuple] = {}
+
+    _Token = re.compile(r"\[|\]|\(|\)|\*|/|\^|-?\d+(?:\.\d+)?|[^\[\]()*/^\d\s-]+")
+
+    @staticmethod
+    @lru_cache(maxsize = 1024)
+    def Compile(unitType : UnitTypeEnum, expression : str):
+        factor, dims, bias, absolute = UnitParser._parse(expression)
+        if dims != UnitParser.Dimensions.get(unitType):
+            raise Exception(f"UnitParser error! Units {expression} can't be used for type {unitType}")
+        if unitType is not UnitTypeEnum.TEMPERATURE:
+            # Temperature units of other types are differences (e.g. J/[mole*C])
+            bias = 0.0
+        elif absolute and bias is None:
+            raise Exception(f"UnitParser error! Absolute temperature can't be multiplied or raised to power in units expression {expression}")
+        return UnitToSiConversion(expression, factor, bias or 0.0)
+
+    @staticmethod
+    def Parse(expression : str):
+        '''
+        Factor to SI units and dimension of unit expression
+        '''
+        factor, dims, bias, absolute = UnitParser._parse(expression)
+        return factor, dims
+
+    @staticmethod
+    def _parse(expression : str):
+        # Factor, dimension, bias of single absolute temperature unit (None if expression isn't one)
+        # and whether expression has units of absolute temperature
+        text = "".join(expression.split())
+        tokens = UnitParser._Token.findall(text)
+        if "".join(tokens) != text:
+            raise Exception(f"UnitParser error! Wrong units expression {expression}")
+        if not tokens:
+            return 1.0, UnitParser.Dimensionless, None, False
+        factor, dims, bias, absolute, position = UnitParser._product(tokens, 0, expression)
+        if position != len(tokens):
+            raise Exception(f"UnitParser error! Wrong units expression {expression}")
+        return factor, dims, bias, absolute
+
+    @staticmethod
+    def _product(tokens, position, expression):
+        # product := power (("*" | "/") power)*
+        factor, dims, bias, absolute, position = UnitParser._power(tokens, position, expression)
+        while position < len(tokens) and tokens[position] in ("*", "/"):
+            sign = 1 if tokens[position] == "*" else -1
+            nextFactor, nextDims, _, nextAbsolute, position = UnitParser._power(tokens, position + 1, expression)
+            factor *= nextFactor ** sign
+            dims = UnitParser.Combine((dims, 1), (nextDims, sign))
+            bias, absolute = None, absolute or nextAbsolute
+        return factor, dims, bias, absolute, position
+
+    @staticmethod
+    def _power(tokens, position, expression):
+        # power := atom ("^"? number)?
+        factor, dims, bias, absolute, position = UnitParser._atom(tokens, position, expression)
+        if position < len(tokens) and tokens[position] == "^":
+            position += 1
+            if position >= len(tokens) or not UnitParser._is_number(tokens[position]):
+                raise Exception(f"UnitParser error! Power is expected in units expression {expression}")
+        if position < len(tokens) and UnitParser._is_number(tokens[position]):
+            power = float(tokens[position])
+            if not power.is_integer():
+                raise Exception(f"UnitParser error! Power {tokens[position]} isn't integer in units expression {expression}")
+            power = int(power)
+            factor, dims = factor ** power, UnitParser.Combine((dims, power))
+            if power != 1:
+                bias = None
+            position += 1
+        return factor, dims, bias, absolute, position
+
+    @staticmethod
+    def _atom(tokens, position, expression):
+        # atom := symbol | number | "[" product "]" | "(" product ")"
+        if position >= len(tokens):
+            raise Exception(f"UnitParser error! Unexpected end of units expression {expression}")
+        token = tokens[position]
+        if token in ("[", "("):
+            factor, dims, bias, absolute, position = UnitParser._product(tokens, position + 1, expression)
+            if position >= len(tokens) or tokens[position] != ("]" if token == "[" else ")"):
+                raise Exception(f"UnitParser error! Unclosed bracket in units expression {expression}")
+            return factor, dims, bias, absolute, position + 1
+        if UnitParser._is_number(token):
+            return float(token), UnitParser.Dimensionless, None, False, position + 1
+        if token in ("]", ")", "*", "/", "^"):
+            raise Exception(f"UnitParser error! Unexpected {token} in units expression {expression}")
+        factor, dims = UnitParser._symbol(token, expression)
+        bias = UnitParser.TemperatureBias.get(token)
+        return factor, dims, bias, bias is not None, position + 1
+
+    @staticmethod
+    def _symbol(name, expression):
+        symbol = UnitParser.Symbols.get(name)
+        if symbol is not None:
+            return symbol
+        prefix = UnitParser.Prefixes.get(name[0])
+        symbol = UnitParser.Symbols.get(name[1:])
+        if prefix is None or symbol is None:
+            raise Exception(f"UnitParser error! Unknown units {name} in units expression {expression}")
+        if symbol[1] == UnitParser.Temperature:
+            raise Exception(f"UnitParser error! Temperature units {name} can't have prefix in units expression {expression}")
+        return prefix * symbol[0], symbol[1]
+
+    @staticmethod
+    def _is_number(token):
+        return token[-1].isdigit()
+
+UnitParser.Symbols = {
+    # Mass
+    "g": (1e-3, UnitParser.Mass), "t": (1e3, UnitParser.Mass), "tonn": (1e3, UnitParser.Mass),
+    "lb": (0.45359237, UnitParser.Mass), "lbs": (0.45359237, UnitParser.Mass), "oz": (0.0283495231, UnitParser.Mass),
+    # Length and volume
+    "m": (1.0, UnitParser.Length), "ft": (0.3048, UnitParser.Length), "in": (0.0254, UnitParser.Length),
+    "mi": (1609.34, UnitParser.Length), "yd": (0.9144, UnitParser.Length),
+    "l": (1e-3, UnitParser.Volume), "L": (1e-3, UnitParser.Volume),
+    # Time
+    "s": (1.0, UnitParser.Time), "min": (60.0, UnitParser.Time), "h": (3600.0, UnitParser.Time), "d": (86400.0, UnitParser.Time),
+    # Temperature
+    "K": (1.0, UnitParser.Temperature), "C": (1.0, UnitParser.Temperature),
+    # Amount of substance
+    "mole": (1.0, UnitParser.Amount), "mol": (1.0, UnitParser.Amount), "lbmole": (453.59237, UnitParser.Amount),
+    # Derived
+    "N": (1.0, UnitParser.Force),
+    "Pa": (1.0, UnitParser.Pressure),
+    "bar": (1e5, UnitParser.Pressure),
+    "atm": (101325.0, UnitParser.Pressure),
+    "psi": (6894.74482, UnitParser.Pressure),
+    "J": (1.0, UnitParser.Energy),
+    "cal": (4.184, UnitParser.Energy),
+    "W": (1.0, UnitParser.Power),
+    "hp": (745.69987158, UnitParser.Power),
+}
+UnitParser.Dimensions = {
+    UnitTypeEnum.ACCELERATION: UnitParser.Combine((UnitParser.Length, 1), (UnitParser.Time, -2)),
+    UnitTypeEnum.DELTA_P: UnitParser.Pressure,
+    UnitTypeEnum.DELTA_T: UnitParser.Temperature,
+    UnitTypeEnum.MOLAR_DENS: UnitParser.Combine((UnitParser.Amount, 1), (UnitParser.Length, -3)),
+    UnitTypeEnum.FRACTION: UnitParser.Dimensionless,
+    UnitTypeEnum.MASS_FRACTION: UnitParser.Dimensionless,
+    UnitTypeEnum.MOLAR_FRACTION: UnitParser.Dimensionless,
+    UnitTypeEnum.HEAT_FLOW: UnitParser.Power,
+    UnitTypeEnum.LENGTH: UnitParser.Length,
+    UnitTypeEnum.MASS: UnitParser.Mass,
+    UnitTypeEnum.MASS_DENS: UnitParser.Combine((UnitParser.Mass, 1), (UnitParser.Length, -3)),
+    UnitTypeEnum.MASS_FLOW: UnitParser.Combine((UnitParser.Mass, 1), (UnitParser.Time, -1)),
+    UnitTypeEnum.MOLAR_ENTHALPY: UnitParser.Combine((UnitParser.Energy, 1), (UnitParser.Amount, -1)),
+    UnitTypeEnum.MOLAR_ENTROPY: UnitParser.Combine((UnitParser.Energy, 1), (UnitParser.Amount, -1), (UnitParser.Temperature, -1)),
+    UnitTypeEnum.MOLAR_FLOW: UnitParser.Combine((UnitParser.Amount, 1), (UnitParser.Time, -1)),
+    UnitTypeEnum.PRESSURE: UnitParser.Pressure,
+    UnitTypeEnum.TEMPERATURE: UnitParser.Temperature,
+    UnitTypeEnum.UNITLESS: UnitParser.Dimensionless,
+    UnitTypeEnum.NONE: UnitParser.Dimensionless,
+    UnitTypeEnum.INDEX: UnitParser.Dimensionless,
+    UnitTypeEnum.MASS_ENTHALPY: UnitParser.Combine((UnitParser.Length, 2), (UnitParser.Time, -2)),
+}
+
+
 class Units:
     @staticmethod
     def ConvertValue(val, oldUnits: UnitToSiConversion, newUnits: UnitToSiConversion):
         return newUnits.convert_from_si(oldUnits.convert_to_si(val))
+
+    @staticmethod
+    def Resolve(unitType : UnitTypeEnum, units : str):
+        '''
+        Conversion of units: from UnitsLibrary or compiled from unit expression (see UnitParser)
+        '''
+        conversion = Units.UnitsLibrary.get(unitType, {}).get(units)
+        if conversion is None:
+            conversion = UnitParser.Compile(unitType, units)
+        return conversion
+
+    @staticmethod
+    @lru_cache(maxsize = 4096)
+    def GetConversion(unitType : UnitTypeEnum, fromUnits : str, toUnits : str):
+        '''
+        Conversion between units fused into one affine transform: value * scale + offset.
+        "" means SI units. Units are validated once, result is cached
+        '''
+        fromFactor, fromBias = (1.0, 0.0)
+        toFactor, toBias = (1.0, 0.0)
+        if fromUnits != "":
+            conversion = Units.Resolve(unitType, fromUnits)
+            fromFactor, fromBias = conversion._factor, conversion._bias
+        if toUnits != "":
+            conversion = Units.Resolve(unitType, toUnits)
+            toFactor, toBias = conversion._factor, conversion._bias
+        return (fromFactor / toFactor, (fromBias - toBias) / toFactor)
+
+    @staticmethod
+    def ConvertArray(values : np.ndarray, unitType : UnitTypeEnum, fromUnits : str, toUnits : str):
+        '''
+        Converts array of values between units. Float64 NumPy arrays are converted in place
+        (without temporary arrays), other sequences are copied to new array
+        '''
+        if not (isinstance(values, np.ndarray) and values.dtype == np.float64 and values.flags.writeable):
+            values = np.array(values, dtype = np.float64)
+        scale, offset = Units.GetConversion(unitType, fromUnits, toUnits)
+        if scale != 1.0:
+            np.multiply(values, scale, out = values)
+        if offset != 0.0:
+            np.add(values, offset, out = values)
+        return values
  
     UnitsLibrary: dict[UnitTypeEnum, dict[str, UnitToSiConversion]] = {
         UnitTypeEnum.ACCELERATION: {
@@ -202,6 +499,10 @@ class Units:
         },
         UnitTypeEnum.NONE: {
             "": UnitToSiConversion("", 1.0, 0.0)
+        },
+        UnitTypeEnum.MASS_ENTHALPY: {
+            "J/kg": UnitToSiConversion("J/kg", 1.0, 0.0),
+            "kJ/kg": UnitToSiConversion("kJ/kg", 1e3, 0.0)
         }
     }
 
@@ -210,78 +511,463 @@ class BaseUnitOp:
     pass
 class SequentialSolver:
     pass
+class NumericalProperty:
+    pass
+class Flowsheet:
+    pass
+class Cell:
+    pass
+class Spreadsheet:
+    pass
+
+
+class PropertyStore:
+    '''
+    Flowsheet-wide column storage of NumericalProperty data: value, state, unit type and calc-by unitop.
+    NumericalProperty is a handle keeping index of its row in the store.
+    This default store keeps columns in python lists, see ArrayPropertyStore for compact NumPy layout.
+    '''
+    # Different rows can be written by several threads at once (see ParallelSolver)
+    ConcurrentWrites = True
+
+    def __init__(self):
+        self.Properties : list[NumericalProperty] = []
+        self.Values : list[float] = []
+        self.States : list[PropertyStateEnum] = []
+        self.UnitTypes : list[UnitTypeEnum] = []
+        self.CalcBy : list[BaseUnitOp] = []
+        # Weak references to copy-on-write stores of clones (see ClonedPropertyStore)
+        self.Clones : list[weakref.ref] = []
+
+    def __len__(self):
+        return len(self.Properties)
+
+    def _preserve(self, index):
+        '''
+        Copies row to clones before it's changed, so clones keep values they had.
+        Unitops can be changed together with row, so clones copy them too (see Flowsheet.DetachClones())
+        '''
+        alive = []
+        for reference in self.Clones:
+            clone = reference()
+            if clone is not None:
+                alive.append(reference)
+                clone.Flowsheet.Dependencies.Nodes.CopyAll()
+                if index < clone.BaseCount and index not in clone.Changes:
+                    clone._row(index)
+        self.Clones = alive
+
+    def Add(self, prop : NumericalProperty, unitType : UnitTypeEnum):
+        self.Properties.append(prop)
+        self.Values.append(None)
+        self.States.append(PropertyStateEnum.SPECIFIED)
+        self.UnitTypes.append(unitType)
+        self.CalcBy.append(None)
+        return len(self.Properties) - 1
+
+    def GetValue(self, index):
+        return self.Values[index]
+
+    def SetValue(self, index, value):
+        if self.Clones:
+            self._preserve(index)
+        self.Values[index] = value
+
+    def GetState(self, index):
+        return self.States[index]
+
+    def SetState(self, index, state : PropertyStateEnum):
+        if self.Clones:
+            self._preserve(index)
+        self.States[index] = state
+
+    def GetUnitType(self, index):
+        return self.UnitTypes[index]
+
+    def GetCalcBy(self, index):
+        return self.CalcBy[index]
+
+    def GatherValues(self, props : list[NumericalProperty]):
+        '''
+        Array of SI values of properties (NaN if property has no value)
+        '''
+        values = self.Values
+        return np.fromiter((np.nan if values[prop._index] is None else values[prop._index] for prop in props),
+                           dtype = np.float64, count = len(props))
+
+    def SetCalcBy(self, index, unitOp : BaseUnitOp):
+        if self.Clones:
+            self._preserve(index)
+        self.CalcBy[index] = unitOp
+
+    def GetColumns(self):
+        '''
+        Snapshot columns: values (NaN if none), state codes and ids of calc-by unitops (-1 if none)
+        '''
+        values = self.GatherValues(self.Properties)
+        states = np.fromiter((state.value for state in self.States), dtype = np.int8, count = len(self))
+        calcByIds = np.fromiter((-1 if unitOp is None else unitOp.Id for unitOp in self.CalcBy), dtype = np.int64, count = len(self))
+        return values, states, calcByIds
+
+    def SetColumns(self, values : np.ndarray, states : np.ndarray, calcByIds : np.ndarray, nodes : dict[int, BaseUnitOp], lazy = False):
+        '''
+        Restores columns saved by GetColumns()
+        '''
+        self.Values = [None if value != value else value for value in values.tolist()]
+        self.States = [ArrayPropertyStore._States[state] for state in states.tolist()]
+        self.CalcBy = [nodes.get(id) for id in calcByIds.tolist()]
+
+
+class ArrayPropertyStore(PropertyStore):
+    '''
+    Compact PropertyStore keeping columns in contiguous NumPy arrays, which grow by capacity doubling:
+    value (float64, None is kept as NaN), state and unit type codes and id of calc-by unitop (-1 if none)
+    '''
+    _States = {state.value : state for state in PropertyStateEnum}
+    _UnitTypes = {unitType.value : unitType for unitType in UnitTypeEnum}
+
+    def __init__(self, flowsheet : Flowsheet, capacity = 1024):
+        self.Flowsheet = flowsheet
+        self.Properties : list[NumericalProperty] = []
+        self.Values = np.full(capacity, np.nan)
+        self.States = np.zeros(capacity, dtype = np.int8)
+        self.UnitTypes = np.zeros(capacity, dtype = np.int16)
+        self.CalcByIds = np.full(capacity, -1, dtype = np.int64)
+        self.Clones : list[weakref.ref] = []
+
+    def Add(self, prop : NumericalProperty, unitType : UnitTypeEnum):
+        index = len(self.Properties)
+        if index == len(self.Values):
+            self._grow(2 * index)
+        self.Properties.append(prop)
+        self.States[index] = PropertyStateEnum.SPECIFIED.value
+        self.UnitTypes[index] = unitType.value
+        return index
+
+    def GetValue(self, index):
+        value = self.Values.item(index)
+        return None if value != value else value
+
+    def SetValue(self, index, value):
+        if self.Clones:
+            self._preserve(index)
+        self.Values[index] = np.nan if value is None else value
+
+    def GetState(self, index):
+        return self._States[self.States.item(index)]
+
+    def SetState(self, index, state : PropertyStateEnum):
+        if self.Clones:
+            self._preserve(index)
+        self.States[index] = state.value
+
+    def GetUnitType(self, index):
+        return self._UnitTypes[self.UnitTypes.item(index)]
+
+    def GetCalcBy(self, index):
+        id = self.CalcByIds.item(index)
+        return None if id < 0 else self.Flowsheet.Dependencies.Nodes[id]
+
+    def GatherValues(self, props : list[NumericalProperty]):
+        indices = np.fromiter((prop._index for prop in props), dtype = np.int64, count = len(props))
+        return self.Values.take(indices)
+
+    def SetCalcBy(self, index, unitOp : BaseUnitOp):
+        if self.Clones:
+            self._preserve(index)
+        self.CalcByIds[index] = -1 if unitOp is None else unitOp.Id
+
+    def GetColumns(self):
+        count = len(self.Properties)
+        return self.Values[:count], self.States[:count], self.CalcByIds[:count]
+
+    def SetColumns(self, values : np.ndarray, states : np.ndarray, calcByIds : np.ndarray, nodes : dict[int, BaseUnitOp], lazy = False):
+        '''
+        lazy - columns are used as is (memory-mapped copy-on-write arrays are read from file on access)
+        '''
+        if lazy:
+            self.Values, self.States, self.CalcByIds = values, states, calcByIds
+            return
+        count = len(self.Properties)
+        self.Values[:count] = values
+        self.States[:count] = states
+        self.CalcByIds[:count] = calcByIds
+
+    def _grow(self, capacity):
+        count = len(self.Properties)
+        for name, fill in (("Values", np.nan), ("States", 0), ("UnitTypes", 0), ("CalcByIds", -1)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype = old.dtype)
+            new[:count] = old[:count]
+            setattr(self, name, new)
+
+
+class ClonedPropertyStore(PropertyStore):
+    '''
+    Copy-on-write PropertyStore of flowsheet clone (see Flowsheet.Clone()): rows are read from parent store
+    until property is changed in clone or in parent, changed rows are kept in Changes
+    as [value, state, id of calc-by unitop (-1 if none), unit type].
+    Handles of properties are created on access (see ClonedProperties)
+    '''
+    ConcurrentWrites = False
+
+    def __init__(self, flowsheet : Flowsheet, parent : PropertyStore):
+        self.Flowsheet = flowsheet
+        self.Parent = parent
+        self.BaseCount = len(parent)
+        self.Properties = ClonedProperties(self)
+        self.Handles = ClonedHandles(self)
+        self.Changes : dict[int, list] = {}
+        self.Clones : list[weakref.ref] = []
+        parent.Clones.append(weakref.ref(self))
+
+    def GetHandle(self, index):
+        '''
+        Handle of property of parent in clone, unitop owning property is copied to clone on first access
+        '''
+        handles = self.Properties.Handles
+        handle = handles.get(index)
+        if handle is None:
+            prop = self.Parent.Properties[index]
+            # Copy of unitop creates handles of its properties (see BaseUnitOp.CloneReferences())
+            owner = self.Flowsheet.Dependencies.Nodes[prop.Owner.Id]
+            handle = handles.get(index)
+            if handle is None:
+                handle = handles[index] = object.__new__(NumericalProperty)
+                handle.Tag = prop.Tag
+                handle.TriggerSolve = prop.TriggerSolve
+                handle.Owner = owner
+                handle.NewValue = None
+                handle._store = self
+                handle._index = index
+        return handle
+
+    def _row(self, index):
+        row = self.Changes.get(index)
+        if row is None:
+            parent = self.Parent
+            calcBy = parent.GetCalcBy(index)
+            row = self.Changes[index] = [parent.GetValue(index), parent.GetState(index),
+                                         -1 if calcBy is None else calcBy.Id, parent.GetUnitType(index)]
+        return row
+
+    def Add(self, prop : NumericalProperty, unitType : UnitTypeEnum):
+        index = len(self.Properties)
+        self.Properties.append(prop)
+        self.Changes[index] = [None, PropertyStateEnum.SPECIFIED, -1, unitType]
+        return index
+
+    def GetValue(self, index):
+        row = self.Changes.get(index)
+        return self.Parent.GetValue(index) if row is None else row[0]
+
+    def SetValue(self, index, value):
+        if self.Clones:
+            self._preserve(index)
+        self._row(index)[0] = value
+
+    def GetState(self, index):
+        row = self.Changes.get(index)
+        return self.Parent.GetState(index) if row is None else row[1]
+
+    def SetState(self, index, state : PropertyStateEnum):
+        if self.Clones:
+            self._preserve(index)
+        self._row(index)[1] = state
+
+    def GetUnitType(self, index):
+        row = self.Changes.get(index)
+        return self.Parent.GetUnitType(index) if row is None else row[3]
+
+    def GetCalcBy(self, index):
+        row = self.Changes.get(index)
+        if row is None:
+            unitOp = self.Parent.GetCalcBy(index)
+            return None if unitOp is None else self.Flowsheet.Dependencies.Nodes[unitOp.Id]
+        return None if row[2] < 0 else self.Flowsheet.Dependencies.Nodes[row[2]]
+
+    def SetCalcBy(self, index, unitOp : BaseUnitOp):
+        if self.Clones:
+            self._preserve(index)
+        self._row(index)[2] = -1 if unitOp is None else unitOp.Id
+
+    def GatherValues(self, props : list[NumericalProperty]):
+        return np.fromiter((np.nan if value is None else value for value in (self.GetValue(prop._index) for prop in props)),
+                           dtype = np.float64, count = len(props))
+
+    def GetColumns(self):
+        count = len(self)
+        values = np.fromiter((np.nan if value is None else value for value in map(self.GetValue, range(count))),
+                             dtype = np.float64, count = count)
+        states = np.fromiter((self.GetState(index).value for index in range(count)), dtype = np.int8, count = count)
+        calcByIds = np.fromiter((-1 if unitOp is None else unitOp.Id for unitOp in map(self.GetCalcBy, range(count))),
+                                dtype = np.int64, count = count)
+        return values, states, calcByIds
+
+    def SetColumns(self, values : np.ndarray, states : np.ndarray, calcByIds : np.ndarray, nodes : dict[int, BaseUnitOp], lazy = False):
+        for index, (value, state, id) in enumerate(zip(values.tolist(), states.tolist(), calcByIds.tolist())):
+            row = self._row(index)
+            row[0] = None if value != value else value
+            row[1] = ArrayPropertyStore._States[state]
+            row[2] = id
+
+
+class ClonedProperties:
+    '''
+    Handles of properties of flowsheet clone by indices (see ClonedPropertyStore.Properties): handles of properties
+    of parent are created on access together with copy of their unitop, Handles keeps created ones
+    '''
+    def __init__(self, store : ClonedPropertyStore):
+        self.Store = store
+        self.Handles : dict[int, NumericalProperty] = {}
+        self.Count = store.BaseCount
+
+    def __len__(self):
+        return self.Count
+
+    def __getitem__(self, index):
+        handle = self.Handles.get(index)
+        if handle is None:
+            if not 0 <= index < self.Store.BaseCount:
+                raise IndexError(index)
+            handle = self.Store.GetHandle(index)
+        return handle
+
+    def __iter__(self):
+        return (self[index] for index in range(self.Count))
+
+    def append(self, prop : NumericalProperty):
+        self.Handles[self.Count] = prop
+        self.Count += 1
+
+
+class ClonedHandles:
+    '''
+    Map of properties of parent flowsheet to their handles in clone, is passed to BaseUnitOp.CloneReferences()
+    '''
+    def __init__(self, store : ClonedPropertyStore):
+        self.Store = store
+
+    def get(self, prop : NumericalProperty, default = None):
+        if prop._store is not self.Store.Parent or prop._index >= self.Store.BaseCount:
+            return default
+        return self.Store.GetHandle(prop._index)
+
+    def __getitem__(self, prop : NumericalProperty):
+        handle = self.get(prop)
+        if handle is None:
+            raise KeyError(prop.Tag)
+        return handle
 
 
 class NumericalProperty:
     '''
     Class incapsulating physical value - float point number of defined UnitType.
+    Data is kept in PropertyStore of flowsheet, object itself is a light handle into the store.
     '''
+    __slots__ = ("Tag", "TriggerSolve", "Owner", "NewValue", "_store", "_index")
 
     @property
     def HasValue(self):
         '''
         Determines if value is present or none
         '''
-        return not self.Value == None
+        return self._store.GetValue(self._index) is not None
     
     @property
     def Value(self):
-        return self._value
+        value = self._store.GetValue(self._index)
+        if value is None and self.Owner is not None and self.Owner.Owner.StaticsSolver.SolverState is SolverStateEnum.Lazy:
+            return self.Owner.Owner.StaticsSolver.Pull(self)
+        return value
     
     @property
     def PropertyState(self):
-        return self._property_state
+        return self._store.GetState(self._index)
+
+    @property
+    def UnitType(self):
+        return self._store.GetUnitType(self._index)
+
+    @property
+    def CanModify(self):
+        return self._store.GetState(self._index) is not PropertyStateEnum.CALCULATED
     
     @property
     def CalcBy(self):
         '''
         Object, who called Calculate() method for current property
         '''
-        return self._calc_by
+        return self._store.GetCalcBy(self._index)
+
+    @property
+    def Handle(self):
+        '''
+        Flowsheet-wide integer handle of property (row in property store), is used as key in solver bookkeeping.
+        None for property without owner unitop: it keeps data in its own store and is freed with it
+        '''
+        return None if self.Owner is None else self._index
+
+    @property
+    def Key(self):
+        '''
+        Flowsheet-wide readable key of property
+        '''
+        return f"{self.Owner.Id}.{self.Tag}"
 
     @PropertyState.setter
     def PropertyState(self, state):
-        self._property_state = state
-        self.CanModify = self._property_state != PropertyStateEnum.CALCULATED
+        self._store.SetState(self._index, state)
 
     @Value.setter
     def Value(self, value):
         if not self.CanModify:
             raise Exception(f"NumericalProperty error! Trying to set calculated property {self.Tag} of object {self.Owner.Name}!")
-        self._value = value
+        self._store.SetValue(self._index, value)
         self.PropertyState = PropertyStateEnum.SPECIFIED
         self.TryTriggerSolve()
 
     @CalcBy.setter
     def CalcBy(self, objCalcBy : BaseUnitOp):
-        self._calc_by = objCalcBy
-        if self.TriggerSolve and self._calc_by is not None:
-            objCalcBy.CalculatedTriggeringProperties[f"{self.Owner.Id}.{self.Tag}"]  = self
+        self._store.SetCalcBy(self._index, objCalcBy)
+        if objCalcBy is not None:
+            if self.TriggerSolve:
+                objCalcBy.CalculatedTriggeringProperties[self._index]  = self
+            if objCalcBy is not self.Owner:
+                objCalcBy.Owner.StaticsSolver.AddEdge(objCalcBy, self.Owner)
 
     def __init__(self, tag, unitType: UnitTypeEnum, owner : BaseUnitOp = None, triggerSolve = False, calcByObject : BaseUnitOp = None, defaultValue = None):
         self.Tag = tag
-        self.UnitType = unitType
         self.TriggerSolve = triggerSolve
         self.Owner = owner
+        self.NewValue = None
+        self._store = owner.Owner.PropertyStore if owner is not None else PropertyStore()
+        self._index = self._store.Add(self, unitType)
         self.PropertyState = PropertyStateEnum.CALCULATED if calcByObject is not None else (PropertyStateEnum.DEFAULT if defaultValue is not None else PropertyStateEnum.SPECIFIED)
         self.CalcBy = calcByObject
         self.Value = defaultValue
-        self.NewValue = None
 
 
     def TryTriggerSolve(self):
         if self.TriggerSolve:
             self.Owner.TryAddToCalcQueue(True)
+            for consumer in self.Owner.Owner.GetConsumers(self):
+                consumer.TryAddToCalcQueue(True)
             self.Owner.TriggerSolver()
 
     def AddOwnerToSolver(self):
         self.Owner.TryAddToCalcQueue(False)
 
+    def AddConsumersToSolver(self):
+        for consumer in self.Owner.Owner.GetConsumers(self):
+            consumer.TryAddToCalcQueue(False)
+
     def Calculate(self, calcvalue, ObjCalculator : BaseUnitOp = None):
         noChangesCalcs = False
+        value = self._store.GetValue(self._index)
 
-        if not calcvalue is None and not self._value is None:
-            if not Compare(calcvalue, self._value):
+        if not calcvalue is None and not value is None:
+            if not Compare(calcvalue, value):
                 raise Exception(f"NumericalProperty Calculate method error! Trying to calculate already calculated property \"{self.Tag}\" of object \"{self.Owner.Name}\"!")
             noChangesCalcs = True
 
@@ -290,29 +976,38 @@ class NumericalProperty:
             if not self.Owner.VariableChanging(self):
                 return
             self.PropertyState = PropertyStateEnum.CALCULATED
-            self._value = self.NewValue
+            self._store.SetValue(self._index, self.NewValue)
             self.CalcBy = ObjCalculator
             self.Owner.VariableChanged(self)
-            if self.TriggerSolve and self.CalcBy is not self.Owner:
-                self.AddOwnerToSolver()
+            tracer = self.Owner.Owner.StaticsSolver.Tracer
+            if tracer is not None:
+                tracer.PropertyCalculated(self)
+            if self.TriggerSolve:
+                if self.CalcBy is not self.Owner:
+                    self.AddOwnerToSolver()
+                self.AddConsumersToSolver()
 
     def Clear(self):
         self.PropertyState = PropertyStateEnum.SPECIFIED
-        self._value = None
+        self._store.SetValue(self._index, None)
         self.CalcBy = None
 
     def SetValue(self, val, units=""):
         if not self.CanModify:
             raise Exception(f"NumericalProperty SetValue error! Property can't be modified: {self.Owner.Name}.{self.Tag}!")
 
-        if units != "" and not units in Units.UnitsLibrary[self.UnitType].keys():
+        if units == "" or val is None:
+            self.NewValue = val
+        else:
+            try:
+                scale, offset = Units.GetConversion(self.UnitType, units, "")
+            except Exception:
                 raise Exception(f"NumericalProperty SetValue error! Units with name {units} are unavailable for type {self.UnitType}")
-        
-        self.NewValue = val if (val is None or units == "") else Units.UnitsLibrary[self.UnitType][units].convert_to_si(val)
+            self.NewValue = val * scale + offset
         if not self.Owner.VariableChanging(self):
             return
         self.PropertyState = PropertyStateEnum.SPECIFIED
-        self._value = self.NewValue
+        self._store.SetValue(self._index, self.NewValue)
         self.Owner.VariableChanged(self)
         
         self.TryTriggerSolve()
@@ -320,147 +1015,2002 @@ class NumericalProperty:
 
 
     def GetValue(self, units=""):
-        if units != "" and not units in Units.UnitsLibrary[self.UnitType]:
+        value = self.Value
+        if units == "" or value is None:
+            return value
+        try:
+            scale, offset = Units.GetConversion(self.UnitType, "", units)
+        except Exception:
             raise Exception(f"NumericalProperty GetValue error!  Units with name {units} are unavailable for type {self.UnitType}")
-        return self.Value if (self.Value is None or units == "") else Units.UnitsLibrary[self.UnitType][units].convert_from_si(self.Value) 
-
-class Flowsheet:
-    GlobalIdCounter = 0
+        return value * scale + offset
 
+class DependencyGraph:
+    '''
+    Directed graph of unitops used by solver to order calculations.
+    Edge A -> B means that B depends on A: A calculates property owned by B (NumericalProperty.CalcBy)
+    or B consumes property owned by A (see Flowsheet.AddConsumer()).
+    Topological order is cached and invalidated only when a new edge breaks it.
+    Unitops of one strongly connected component (recycle) get the same rank and are solved as a unit.
+    Independent parts of flowsheet (connected components) are tracked by union-find.
+    Structures keep only ids of unitops and handles of properties, so graph of flowsheet clone shares them
+    with this one (see ClonedDependencyGraph)
+    '''
     def __init__(self):
-        self.StaticsSolver = SequentialSolver(self)
-        self.ItemsDict: dict[int,BaseUnitOp] = {}
+        self.Nodes : dict[int, BaseUnitOp] = {}
+        self.Successors : dict[int, set[int]] = {}
+        self.Predecessors : dict[int, set[int]] = {}
+        # Ids of consumers of properties by handles (see NumericalProperty.Handle)
+        self.PropertyConsumers : dict[int, set[int]] = {}
+        # Handles of properties of other unitops used by unitop with given id
+        self.ConsumedProperties : dict[int, list[int]] = {}
+        self.IsOrderValid = True
+        self._ranks : dict[int, int] = {}
+        self._components : list[list[int]] = []
+        self._parents : dict[int, int] = {}
+        # Order is shared with clones until it's changed (see AddNode())
+        self._ownsOrder = True
+        # Weak references to graphs of clones (see ClonedDependencyGraph)
+        self.Clones : list[weakref.ref] = []
 
-    def AddUnitOp(self, unitOp: BaseUnitOp):
-        if unitOp.Name in self.ItemsDict.keys():
-            raise Exception(f"Flowsheet error! UnitOp with name {unitOp.Name} already exists!")
-        self.GlobalIdCounter += 1
-        self.ItemsDict[unitOp.Name] = unitOp
-        return self.GlobalIdCounter
-    
-    def ActivateSolver(self):
-        self.StaticsSolver.SolverState = SolverStateEnum.Active
-        self.Solve()
+    def _clones(self):
+        alive = [reference for reference in self.Clones if reference() is not None]
+        self.Clones = alive
+        return [reference() for reference in alive]
 
-    def DisableSolver(self):
-        self.StaticsSolver.SolverState = SolverStateEnum.Frozen
+    def _preserve(self, name, key):
+        '''
+        Copies entry of structure to clones before it's changed, so clones keep graph they had
+        '''
+        for clone in self._clones():
+            getattr(clone, name).Preserve(key)
 
-    def Solve(self):
-        self.StaticsSolver.Solve()
+    def _mutable(self, name, key, factory):
+        # Entry of structure, which is changed in place
+        if self.Clones:
+            self._preserve(name, key)
+        structure = getattr(self, name)
+        value = structure.get(key)
+        if value is None:
+            value = structure[key] = factory()
+        return value
 
-class SequentialSolver:
+    def _set_parent(self, id, parent):
+        if self.Clones:
+            self._preserve("_parents", id)
+        self._parents[id] = parent
 
-    def __init__(self, ownerCase: Flowsheet):
-        self.Owner = ownerCase
-        self.SolverState = SolverStateEnum.Frozen
-        self.ForgettingQueue : PriorityQueue[(int,BaseUnitOp)] = PriorityQueue()
-        self.SolvingQueue : PriorityQueue[(int,BaseUnitOp)] = PriorityQueue()
-        self.ForgettingIdSet: Set[int] = set()
-        self.SolvingIdSet: Set[int] = set()
-        self.IsSolving = False
-        self.IsCurrentlySolvePass = False
+    def DetachClones(self):
+        '''
+        Clones copy unitops, which they haven't copied yet: is called before unitops of this flowsheet are changed
+        '''
+        for clone in self._clones():
+            clone.Nodes.CopyAll()
 
-    def TryAddObjectToForgettingQueue(self, ObjectToAdd : BaseUnitOp):
-        if ObjectToAdd.Id not in self.ForgettingIdSet:
-            self.ForgettingIdSet.add(ObjectToAdd.Id)
-            self.ForgettingQueue.put((ObjectToAdd.CalcOrder, ObjectToAdd.Id, ObjectToAdd))
-            return True
-        return False
+    def AddNode(self, id, unitOp : BaseUnitOp):
+        self.Nodes[id] = unitOp
+        self.Successors[id] = set()
+        self.Predecessors[id] = set()
+        self._parents[id] = id
+        if self.IsOrderValid:
+            if not self._ownsOrder:
+                self._ranks = dict(self._ranks)
+                self._components = list(self._components)
+                self._ownsOrder = True
+            # Isolated node can be placed at the end without breaking the order
+            self._ranks[id] = len(self._components)
+            self._components.append([id])
 
-    def TryAddObjectToSolvingQueue(self, ObjectToAdd : BaseUnitOp):
-        if ObjectToAdd.Id not in self.SolvingIdSet:
-            self.SolvingIdSet.add(ObjectToAdd.Id)
-            self.SolvingQueue.put((ObjectToAdd.CalcOrder,ObjectToAdd.Id, ObjectToAdd))
-            return True
-        return False
+    def AddEdge(self, fromOp : BaseUnitOp, toOp : BaseUnitOp):
+        if fromOp is toOp or toOp.Id in self.Successors[fromOp.Id]:
+            return False
+        self._mutable("Successors", fromOp.Id, set).add(toOp.Id)
+        self._mutable("Predecessors", toOp.Id, set).add(fromOp.Id)
+        if self.IsOrderValid and self._ranks[fromOp.Id] >= self._ranks[toOp.Id]:
+            self.IsOrderValid = False
+        fromRoot = self._find(fromOp.Id)
+        toRoot = self._find(toOp.Id)
+        if fromRoot != toRoot:
+            self._set_parent(max(fromRoot, toRoot), min(fromRoot, toRoot))
+        return True
 
-    def TryDequeueForgetting(self):
-        if not self.ForgettingQueue.empty():
-            order, id, element = self.ForgettingQueue.get()
-            self.ForgettingIdSet.remove(id)
-            return element
-        return None
+    def RemoveEdge(self, fromOp : BaseUnitOp, toOp : BaseUnitOp):
+        '''
+        Removes dependency. Connected components aren't split (union-find only merges), so they may stay joined
+        '''
+        if toOp.Id not in self.Successors[fromOp.Id]:
+            return False
+        self._mutable("Successors", fromOp.Id, set).discard(toOp.Id)
+        self._mutable("Predecessors", toOp.Id, set).discard(fromOp.Id)
+        if self.IsOrderValid and self._ranks[fromOp.Id] == self._ranks[toOp.Id]:
+            # Recycle may be broken
+            self.IsOrderValid = False
+        return True
 
-    def TryDequeueCalc(self):
-        if not self.SolvingQueue.empty():
-            order, id, element = self.SolvingQueue.get()
-            self.SolvingIdSet.remove(id)
-            return element
-        return None
-    
-    def Solve(self):
+    def AddConsumer(self, prop : NumericalProperty, unitOp : BaseUnitOp):
+        consumers = self.PropertyConsumers.get(prop._index)
+        if consumers is None or unitOp.Id not in consumers:
+            self._mutable("PropertyConsumers", prop._index, set).add(unitOp.Id)
+        if prop._index not in self.ConsumedProperties.get(unitOp.Id, ()):
+            self._mutable("ConsumedProperties", unitOp.Id, list).append(prop._index)
+        self.AddEdge(prop.Owner, unitOp)
 
-        if self.IsSolving:
-            raise Exception(f"Solver error! Solver already solving.")
-    
-        self.IsSolving = True
+    def GetConsumers(self, prop : NumericalProperty):
+        '''
+        Unitops consuming property (see Flowsheet.AddConsumer())
+        '''
+        consumers = self.PropertyConsumers.get(prop._index)
+        if consumers is None:
+            return ()
+        nodes = self.Nodes
+        return [nodes[id] for id in consumers]
 
-        print("")
-        print("Forgetting PASS")
-        
-        while True:
-            # Get Element from forgetting Queue collection
-            elementF = self.TryDequeueForgetting()
+    def GetRank(self, unitOp : BaseUnitOp):
+        '''
+        Position of unitop in cached topological order (can be outdated, see UpdateOrder())
+        '''
+        return self._ranks.get(unitOp.Id, 0)
 
-            if not elementF is None:
-                if self.IsCurrentlySolvePass:
-                    print("")
-                    print("Forgetting PASS")
-                
-                self.IsCurrentlySolvePass = False
-                
-                print(elementF.Name)
-                
-                # Clear All calculated properties
-                elementF.ClearCalculatedProperties()
-                
-                # Call forgetting calculation of object
-                elementF.Calculate(True)
-                
-                # Add object to Solving queue
-                self.TryAddObjectToSolvingQueue(elementF)
-                
-                continue
-            
-            if self.SolverState is SolverStateEnum.Active:
-                elementS = self.TryDequeueCalc()
-                if not elementS is None:
-
-                    if not self.IsCurrentlySolvePass:
-                        print("")
-                        print("Solving PASS")
-                    
-                    self.IsCurrentlySolvePass = True
-                    
-                    if elementS.IsCalculated:
-                        continue
-                    
-                    print(elementS.Name)
-                    
-                    # Calculate object
-                    elementS.Calculate(False)
+    def UpdateOrder(self):
+        '''
+        Recalculates topological order if it was invalidated. Returns True if order was changed
+        '''
+        if self.IsOrderValid:
+            return False
+        self._components = self._find_components()
+        self._ranks = {id : rank for rank, component in enumerate(self._components) for id in component}
+        self._ownsOrder = True
+        self.IsOrderValid = True
+        return True
 
-                    continue
+    def StronglyConnectedComponents(self):
+        '''
+        Strongly connected components in topological order
+        '''
+        self.UpdateOrder()
+        nodes = self.Nodes
+        return [[nodes[id] for id in component] for component in self._components]
 
-            # Finish loop if we reached this point
-            break
+    def GetDependents(self, prop : NumericalProperty):
+        '''
+        Reverse dependency index: unitops to be forgotten when property is changed or cleared
+        '''
+        consumers = self.PropertyConsumers.get(prop._index)
+        if consumers is None:
+            return (prop.Owner,)
+        nodes = self.Nodes
+        return (prop.Owner, *(nodes[id] for id in consumers))
 
-        self.IsCurrentlySolvePass = False
-        self.IsSolving = False
+    def CollectAffected(self, unitOps):
+        '''
+        Downstream cone of forgotten unitops found in one traversal:
+        unitops and calculated properties which will be cleared by forgetting pass
+        '''
+        affectedOps : dict[int, BaseUnitOp] = {unitOp.Id : unitOp for unitOp in unitOps}
+        affectedProps : list[NumericalProperty] = []
+        frontier = list(affectedOps.values())
+        while frontier:
+            unitOp = frontier.pop()
+            for prop in unitOp.CalculatedTriggeringProperties.values():
+                affectedProps.append(prop)
+                for dependent in self.GetDependents(prop):
+                    if dependent.Id not in affectedOps:
+                        affectedOps[dependent.Id] = dependent
+                        frontier.append(dependent)
+        return list(affectedOps.values()), affectedProps
 
-class BaseUnitOp:
-    def __init__(self, name, Flwsht: Flowsheet, calcOrder = 500):
-        self.Name = name
-        self.Id = Flwsht.AddUnitOp(self)
-        self.Owner = Flwsht
+    def Recycles(self):
+        '''
+        Strongly connected components including more than one unitop
+        '''
+        return [component for component in self.StronglyConnectedComponents() if len(component) > 1]
 
-        self.CalcOrder = calcOrder
+    def FindComponent(self, unitOp : BaseUnitOp):
+        '''
+        Id of connected component (part of flowsheet, which shares no properties with other parts)
+        '''
+        return self._find(unitOp.Id)
 
+    def ConnectedComponents(self):
+        components : dict[int, list[BaseUnitOp]] = {}
+        for id, unitOp in self.Nodes.items():
+            components.setdefault(self._find(id), []).append(unitOp)
+        return list(components.values())
 
-        self.IsCalculated = False
-        self.CalculatedTriggeringProperties : dict[str, NumericalProperty] = {}
-    
-    def TriggerSolver(self):
+    def _find(self, id):
+        parents = self._parents
+        root = id
+        while parents[root] != root:
+            root = parents[root]
+        if self.Clones:
+            # Clones read entries of path, which aren't copied by them
+            return root
+        # Path compression
+        while parents[id] != root:
+            parents[id], id = root, parents[id]
+        return root
+
+    def _find_components(self):
+        # Iterative Tarjan algorithm (recursion limit is too small for large flowsheets)
+        index : dict[int, int] = {}
+        low : dict[int, int] = {}
+        stack : list[int] = []
+        onStack : set[int] = set()
+        components : list[list[int]] = []
+
+        for root in self.Nodes:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            onStack.add(root)
+            work = [(root, iter(self.Successors[root]))]
+            while work:
+                node, successors = work[-1]
+                for successor in successors:
+                    if successor not in index:
+                        index[successor] = low[successor] = len(index)
+                        stack.append(successor)
+                        onStack.add(successor)
+                        work.append((successor, iter(self.Successors[successor])))
+                        break
+                    if successor in onStack:
+                        low[node] = min(low[node], index[successor])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            onStack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(sorted(component))
+
+        # Tarjan algorithm finds components in reverse topological order
+        components.reverse()
+        return components
+
+
+class ClonedDict(Mapping):
+    '''
+    Copy-on-write view of dict of parent flowsheet used by clone (see ClonedDependencyGraph): values are read
+    from parent until they are changed in clone or in parent (parent calls Preserve() before change),
+    changed values are kept in Changes (None - key is absent). Keys not less than Limit
+    (ids of unitops or handles of properties added to parent after cloning) aren't read from parent
+    '''
+    def __init__(self, parent : dict, limit : int):
+        self.Parent = parent
+        self.Limit = limit
+        self.Changes : dict = {}
+
+    def get(self, key, default = None):
+        if key in self.Changes:
+            value = self.Changes[key]
+        elif key < self.Limit:
+            value = self.Parent.get(key)
+        else:
+            value = None
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.Changes[key] = value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        for key in self.Parent:
+            if key < self.Limit and key not in self.Changes:
+                yield key
+        for key, value in self.Changes.items():
+            if value is not None:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def Writable(self, key, factory):
+        '''
+        Own copy of value, which can be changed in place
+        '''
+        value = self.Changes.get(key)
+        if value is None:
+            value = None if key in self.Changes else self.get(key)
+            value = self.Changes[key] = factory() if value is None else copy.copy(value)
+        return value
+
+    def Preserve(self, key):
+        '''
+        Copies value of parent before it's changed by parent
+        '''
+        if key < self.Limit and key not in self.Changes:
+            self.Changes[key] = copy.copy(self.Parent.get(key))
+
+
+class ClonedNodes(Mapping):
+    '''
+    Unitops of flowsheet clone by ids: unitops of parent are copied on first access (see BaseUnitOp.CloneReferences()),
+    copies and unitops added to clone are kept in Changes
+    '''
+    def __init__(self, flowsheet : Flowsheet, parent : dict[int, BaseUnitOp], limit : int):
+        self.Flowsheet = flowsheet
+        self.Parent = parent
+        self.Limit = limit
+        self.Changes : dict[int, BaseUnitOp] = {}
+        self.IsComplete = False
+
+    def __getitem__(self, id):
+        unitOp = self.Changes.get(id)
+        if unitOp is None:
+            if id >= self.Limit:
+                raise KeyError(id)
+            # Copy is registered before references are rebound: its properties can refer to it
+            unitOp = self.Changes[id] = copy.copy(self.Parent[id])
+            unitOp.CloneReferences(self.Flowsheet, self.Flowsheet.PropertyStore.Handles)
+        return unitOp
+
+    def get(self, id, default = None):
+        return self[id] if id in self else default
+
+    def __setitem__(self, id, unitOp : BaseUnitOp):
+        self.Changes[id] = unitOp
+
+    def __contains__(self, id):
+        return id in self.Changes or (id < self.Limit and id in self.Parent)
+
+    def __iter__(self):
+        for id in self.Parent:
+            if id < self.Limit:
+                yield id
+        for id in self.Changes:
+            if id >= self.Limit:
+                yield id
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def CopyAll(self):
+        '''
+        Copies all unitops of parent, which weren't copied yet
+        '''
+        if self.IsComplete:
+            return
+        self.IsComplete = True
+        for id in list(self.Parent):
+            if id < self.Limit:
+                self[id]
+
+
+class ClonedItems(Mapping):
+    '''
+    Unitops of flowsheet clone by names (see Flowsheet.ItemsDict), unitops of parent are copied on access (see ClonedNodes)
+    '''
+    def __init__(self, parent : dict[str, BaseUnitOp], nodes : ClonedNodes):
+        self.Parent = parent
+        self.Nodes = nodes
+        self.Changes : dict[str, BaseUnitOp] = {}
+
+    def _id(self, name):
+        unitOp = self.Parent.get(name)
+        return None if unitOp is None or unitOp.Id >= self.Nodes.Limit else unitOp.Id
+
+    def __getitem__(self, name):
+        unitOp = self.Changes.get(name)
+        if unitOp is not None:
+            return unitOp
+        id = self._id(name)
+        if id is None:
+            raise KeyError(name)
+        return self.Nodes[id]
+
+    def __setitem__(self, name, unitOp : BaseUnitOp):
+        self.Changes[name] = unitOp
+
+    def __contains__(self, name):
+        return name in self.Changes or self._id(name) is not None
+
+    def __iter__(self):
+        for name in self.Parent:
+            if name not in self.Changes and self._id(name) is not None:
+                yield name
+        yield from self.Changes
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class ClonedDependencyGraph(DependencyGraph):
+    '''
+    Copy-on-write DependencyGraph of flowsheet clone: structures of parent graph are shared until they are changed
+    in clone or in parent (see ClonedDict), unitops are copied on first access (see ClonedNodes)
+    '''
+    def __init__(self, flowsheet : Flowsheet, parent : DependencyGraph, propertyCount : int):
+        limit = flowsheet.GlobalIdCounter + 1
+        self.Parent = parent
+        self.Nodes = ClonedNodes(flowsheet, parent.Nodes, limit)
+        self.Successors = ClonedDict(parent.Successors, limit)
+        self.Predecessors = ClonedDict(parent.Predecessors, limit)
+        self.PropertyConsumers = ClonedDict(parent.PropertyConsumers, propertyCount)
+        self.ConsumedProperties = ClonedDict(parent.ConsumedProperties, limit)
+        self.IsOrderValid = parent.IsOrderValid
+        self._ranks = parent._ranks
+        self._components = parent._components
+        self._parents = ClonedDict(parent._parents, limit)
+        self._ownsOrder = parent._ownsOrder = False
+        self.Clones : list[weakref.ref] = []
+        parent.Clones.append(weakref.ref(self))
+
+    def _mutable(self, name, key, factory):
+        if self.Clones:
+            self._preserve(name, key)
+        return getattr(self, name).Writable(key, factory)
+
+
+class Flowsheet:
+    GlobalIdCounter = 0
+
+    def __init__(self, compactProperties = False, workers = 1, equationOriented = False):
+        '''
+        compactProperties - keep data of all properties in NumPy arrays (ArrayPropertyStore)
+        workers - number of threads solving independent parts of flowsheet (see ParallelSolver)
+        equationOriented - solve linear relations of unitops simultaneously (see EquationSolver)
+        '''
+        self.Dependencies = DependencyGraph()
+        self.PropertyStore = ArrayPropertyStore(self) if compactProperties else PropertyStore()
+        if equationOriented:
+            self.StaticsSolver = EquationSolver(self)
+        else:
+            self.StaticsSolver = ParallelSolver(self, workers) if workers > 1 else SequentialSolver(self)
+        self.ItemsDict: dict[int,BaseUnitOp] = {}
+
+        # Flowsheet this one was cloned from (see Clone())
+        self.Parent : Flowsheet = None
+
+        # Async solve in progress (see SolveIter())
+        self.IsSolvingAsync = False
+        self._solve_lock : asyncio.Lock = None
+
+        # Spec change transactions (see Batch())
+        self.BatchDepth = 0
+        self.IsSolvePending = False
+        self.SolveRequestsCount = 0
+        self.SolvesCount = 0
+        self.SolvesAvoidedCount = 0
+
+    def AddUnitOp(self, unitOp: BaseUnitOp):
+        if unitOp.Name in self.ItemsDict:
+            raise Exception(f"Flowsheet error! UnitOp with name {unitOp.Name} already exists!")
+        self.GlobalIdCounter += 1
+        self.ItemsDict[unitOp.Name] = unitOp
+        self.Dependencies.AddNode(self.GlobalIdCounter, unitOp)
+        return self.GlobalIdCounter
+
+    def AddConsumer(self, prop : NumericalProperty, unitOp : BaseUnitOp):
+        '''
+        Registers unitop, which uses value of property in its calculations.
+        Consumer is forgotten when property is changed or cleared and is solved when property is calculated
+        '''
+        self.Dependencies.AddConsumer(prop, unitOp)
+
+    def GetConsumers(self, prop : NumericalProperty):
+        return self.Dependencies.GetConsumers(prop)
+
+    def DetachClones(self):
+        '''
+        Clones copy unitops of this flowsheet, which they haven't copied yet (see Clone()).
+        Is called before unitops are changed by solver, spreadsheet edits and recycle convergence
+        '''
+        if self.Dependencies.Clones:
+            self.Dependencies.DetachClones()
+
+    def GetProperty(self, unitOpName : str, tag : str):
+        '''
+        Property of unitop by names, None if unitop has no property with tag
+        '''
+        unitOp = self.ItemsDict.get(unitOpName)
+        if unitOp is None:
+            raise Exception(f"Flowsheet error! UnitOp with name {unitOpName} doesn't exist!")
+        for prop in unitOp.Properties:
+            if prop.Tag == tag:
+                return prop
+        return None
+
+    def GetPropertyByHandle(self, handle : int):
+        return self.PropertyStore.Properties[handle]
+
+    def AffectedBy(self, prop : NumericalProperty):
+        '''
+        Unitops and calculated properties which will be forgotten if property is changed
+        '''
+        if not prop.TriggerSolve:
+            return [], []
+        return self.Dependencies.CollectAffected(self.Dependencies.GetDependents(prop))
+
+    def GetRecycles(self):
+        '''
+        Groups of unitops depending on each other (strongly connected components of dependency graph)
+        '''
+        return self.Dependencies.Recycles()
+
+    def GetValues(self, props : list[NumericalProperty], units = ""):
+        '''
+        Array of values of properties in given units (NaN if property has no value)
+        '''
+        values = self.PropertyStore.GatherValues(props)
+        if units == "":
+            return values
+        unitTypes = {prop.UnitType for prop in props}
+        if len(unitTypes) == 1:
+            return Units.ConvertArray(values, unitTypes.pop(), "", units)
+        for unitType in unitTypes:
+            mask = np.fromiter((prop.UnitType is unitType for prop in props), dtype = bool, count = len(props))
+            scale, offset = Units.GetConversion(unitType, "", units)
+            values[mask] = values[mask] * scale + offset
+        return values
+
+    def ConvergeRecycles(self, method = ConvergenceMethodEnum.Wegstein, maxIterations = 50):
+        '''
+        Solves flowsheet with recycles by iterations on tear connectors (see RecycleConverger)
+        '''
+        converger = RecycleConverger(self, method, maxIterations)
+        converger.Converge()
+        return converger
+
+    def Sweep(self, specs : dict[NumericalProperty, np.ndarray]):
+        '''
+        Evaluates scenarios given by arrays of specified values (one array element per scenario).
+        Returns dict "UnitOpName.Tag" -> array of values (NaN if unknown) for all properties of flowsheet parts
+        touched by specs, all values of scenario are NaN if its spec is rejected by unitop (see VariableChanging()). If all unitops of these parts support vectorized calculation (see BaseUnitOp.CalculateArrays)
+        all scenarios are calculated in one pass, otherwise every scenario is solved separately.
+        State of flowsheet is not changed
+        '''
+        for prop in specs:
+            if not prop.CanModify:
+                raise Exception(f"Flowsheet Sweep error! Property can't be modified: {prop.Owner.Name}.{prop.Tag}!")
+        arrays = np.broadcast_arrays(*[np.asarray(values, dtype = float) for values in specs.values()])
+        specs = {prop : values.ravel() for prop, values in zip(specs, arrays)}
+
+        components = {self.Dependencies.FindComponent(prop.Owner) for prop in specs}
+        unitOps = [unitOp for component in self.Dependencies.StronglyConnectedComponents() for unitOp in component
+                   if self.Dependencies.FindComponent(unitOp) in components]
+        props = [prop for prop in self.PropertyStore.Properties
+                 if prop.Owner is not None and self.Dependencies.FindComponent(prop.Owner) in components]
+
+        if all(unitOp.SupportsArrays for unitOp in unitOps):
+            values = self._sweep_arrays(specs, unitOps, props)
+        else:
+            values = self._sweep_scenarios(specs, props)
+        return {f"{prop.Owner.Name}.{prop.Tag}" : values[prop] for prop in props}
+
+    def _sweep_arrays(self, specs, unitOps, props):
+        count = len(next(iter(specs.values())))
+        rejected = np.zeros(count, dtype = bool)
+        for prop, specValues in specs.items():
+            known = ~np.isnan(specValues)
+            rejected[known] |= ~np.asarray(prop.Owner.VariableChangingArray(prop, specValues[known]), dtype = bool)
+        values : dict[NumericalProperty, np.ndarray] = {}
+        for prop in props:
+            if prop in specs:
+                values[prop] = specs[prop].copy()
+            elif prop.PropertyState is not PropertyStateEnum.CALCULATED and prop.HasValue:
+                values[prop] = np.full(count, prop.Value, dtype = float)
+            else:
+                values[prop] = np.full(count, np.nan)
+
+        # Same as solving pass: calculate unitops in topological order while something changes
+        for _ in range(len(unitOps) + 1):
+            changed = False
+            for unitOp in unitOps:
+                changed = unitOp.CalculateArrays(values) or changed
+            if not changed:
+                break
+        for array in values.values():
+            array[rejected] = np.nan
+        return values
+
+    def _sweep_scenarios(self, specs, props):
+        count = len(next(iter(specs.values())))
+        values = {prop : np.full(count, np.nan) for prop in props}
+        saved = [(prop, prop.Value, prop.PropertyState) for prop in specs]
+        solverState = self.StaticsSolver.SolverState
+        self.StaticsSolver.SolverState = SolverStateEnum.Active
+        try:
+            for i in range(count):
+                scenario = {prop : specValues[i].item() for prop, specValues in specs.items()}
+                self.SetValues(scenario)
+                # Rejected spec isn't set, results of previous scenario are left in flowsheet
+                if any(prop.Value != value for prop, value in scenario.items()):
+                    continue
+                for prop in props:
+                    if prop.HasValue:
+                        values[prop][i] = prop.Value
+        finally:
+            self.StaticsSolver.SolverState = solverState
+            with self.Batch():
+                for prop, value, state in saved:
+                    prop.Value = value
+                    prop.PropertyState = state
+        return values
+    
+    def ActivateSolver(self):
+        self.StaticsSolver.SolverState = SolverStateEnum.Active
+        self.Solve()
+
+    def DisableSolver(self):
+        self.StaticsSolver.SolverState = SolverStateEnum.Frozen
+
+    def ActivateLazySolver(self):
+        '''
+        Spec changes only forget dependent properties, they are calculated on demand when their values are read
+        '''
+        self.StaticsSolver.SolverState = SolverStateEnum.Lazy
+        self.Solve()
+
+    def Solve(self):
+        self.SolveRequestsCount += 1
+        if self.BatchDepth > 0:
+            # Spec changes are collected in forgetting queue, one solve is called at the end of batch
+            if self.IsSolvePending:
+                self.SolvesAvoidedCount += 1
+            self.IsSolvePending = True
+            return
+        if self.IsSolvingAsync or self.StaticsSolver.IsSolving:
+            # Running solve takes spec changes from forgetting queue (see SequentialSolver.FlushPendingChanges())
+            self.SolvesAvoidedCount += 1
+            return
+        self.SolvesCount += 1
+        self.StaticsSolver.Solve()
+
+    async def SolveAsync(self, timeout : float = None):
+        '''
+        Solve giving control back to event loop between unitop calculations (see SolveIter())
+        '''
+        async for _ in self.SolveIter(timeout):
+            pass
+
+    async def SolveIter(self, timeout : float = None):
+        '''
+        Solve as async iterator of SolveProgress reported after every forgotten or calculated unitop:
+
+            async for progress in Flwsht.SolveIter(timeout = 10):
+                print(progress.Steps, progress.Pending)
+
+        Concurrent async solves are serialized by lock, spec changes made while solve is suspended are taken by it.
+        On cancellation or timeout (asyncio.TimeoutError) forgetting pass is finished, so flowsheet is left in consistent
+        forgotten state: not calculated unitops stay in solving queue and are solved by next solve
+        '''
+        if self._solve_lock is None:
+            self._solve_lock = asyncio.Lock()
+        async with self._solve_lock:
+            loop = asyncio.get_running_loop()
+            deadline = None if timeout is None else loop.time() + timeout
+            solver = self.StaticsSolver
+            self.IsSolvingAsync = True
+            self.SolvesCount += 1
+            steps = solver.SolveSteps()
+            count = 0
+            try:
+                for unitOp, isForgetting in steps:
+                    count += 1
+                    yield SolveProgress(unitOp, isForgetting, count, len(solver.ForgettingQueue) + len(solver.SolvingQueue))
+                    if deadline is not None and loop.time() > deadline:
+                        raise asyncio.TimeoutError(f"Flowsheet SolveAsync error! Solve wasn't finished in {timeout} s")
+                    await asyncio.sleep(0)
+            finally:
+                steps.close()
+                solver.ForgetPending()
+                self.IsSolvingAsync = False
+
+    @contextmanager
+    def Batch(self):
+        '''
+        Transaction collecting spec changes. Owners of changed properties are added to forgetting queue
+        (without duplicates) and only one solve is called when the outermost batch block exits:
+
+            with Flwsht.Batch():
+                UO.PressureIn.SetValue(200, "kPa")
+                UO.TemperatureIn.SetValue(10, "C")
+        '''
+        self.BatchDepth += 1
+        try:
+            yield self
+        finally:
+            self.BatchDepth -= 1
+            if self.BatchDepth == 0 and self.IsSolvePending:
+                self.IsSolvePending = False
+                if not self.IsSolvingAsync and not self.StaticsSolver.IsSolving:
+                    self.SolvesCount += 1
+                    self.StaticsSolver.Solve()
+
+    def SetValues(self, specs: dict[NumericalProperty, object]):
+        '''
+        Sets values of several properties with one solve call.
+        Value of dict can be a number (SI units) or a tuple (value, units)
+        '''
+        with self.Batch():
+            for prop, val in specs.items():
+                if isinstance(val, tuple):
+                    prop.SetValue(*val)
+                else:
+                    prop.SetValue(val)
+
+    def Clone(self):
+        '''
+        What-if copy of flowsheet. Nothing is copied when clone is made: data of properties, unitops, handles of properties
+        and dependency graph are read from this flowsheet until they are changed in clone or here
+        (see ClonedPropertyStore, ClonedDependencyGraph), so memory taken by clone is proportional to differences.
+        Unitops are copied on first access in clone (see BaseUnitOp.CloneReferences()), remaining unitops are copied
+        before unitops of this flowsheet are changed (see DetachClones())
+        '''
+        if self.StaticsSolver.IsSolving:
+            raise Exception(f"Flowsheet Clone error! Flowsheet is solving")
+        solver = self.StaticsSolver
+        clone = Flowsheet(workers = getattr(solver, "Workers", 1), equationOriented = isinstance(solver, EquationSolver))
+        clone.Parent = self
+        clone.GlobalIdCounter = self.GlobalIdCounter
+        clone.PropertyStore = ClonedPropertyStore(clone, self.PropertyStore)
+        clone.Dependencies = ClonedDependencyGraph(clone, self.Dependencies, len(self.PropertyStore))
+        clone.ItemsDict = ClonedItems(self.ItemsDict, clone.Dependencies.Nodes)
+        clone.StaticsSolver.SolverState = solver.SolverState
+
+        # Unitops waiting in solver queues are copied
+        nodes = clone.Dependencies.Nodes
+        for unitOp in solver.ForgettingQueue:
+            clone.StaticsSolver.TryAddObjectToForgettingQueue(nodes[unitOp.Id])
+        for unitOp in solver.SolvingQueue:
+            clone.StaticsSolver.TryAddObjectToSolvingQueue(nodes[unitOp.Id])
+        return clone
+
+    def Diff(self):
+        '''
+        Difference between clone and its parent: dict "UnitOpName.Tag" -> (value in parent, value in clone)
+        for properties changed in clone or in parent after cloning
+        '''
+        store = self.PropertyStore
+        if not isinstance(store, ClonedPropertyStore):
+            raise Exception(f"Flowsheet Diff error! Flowsheet isn't a clone")
+        differences = {}
+        for index in sorted(store.Changes):
+            value = store.Changes[index][0]
+            parentValue = store.Parent.GetValue(index) if index < store.BaseCount else None
+            if value is None and parentValue is None:
+                continue
+            if value is None or parentValue is None or not Compare(value, parentValue):
+                prop = store.Properties[index]
+                differences[f"{prop.Owner.Name}.{prop.Tag}"] = (parentValue, value)
+        return differences
+
+    def Save(self, path):
+        '''
+        Saves state of flowsheet to binary snapshot (uncompressed npz): unitop structure,
+        values, states and calc-by links of all properties and additional arrays of unitops (spreadsheet tables)
+        '''
+        unitOps = [self.Dependencies.Nodes[id] for id in sorted(self.Dependencies.Nodes)]
+        properties = self.PropertyStore.Properties
+        values, states, calcByIds = self.PropertyStore.GetColumns()
+        arrays = {
+            "UnitOpIds": np.array([unitOp.Id for unitOp in unitOps], dtype = np.int64),
+            "UnitOpNames": np.array([unitOp.Name for unitOp in unitOps], dtype = str),
+            "UnitOpTypes": np.array([type(unitOp).__name__ for unitOp in unitOps], dtype = str),
+            "IsCalculated": np.array([unitOp.IsCalculated for unitOp in unitOps], dtype = bool),
+            "PropertyOwners": np.array([-1 if prop.Owner is None else prop.Owner.Id for prop in properties], dtype = np.int64),
+            "PropertyTags": np.array([prop.Tag for prop in properties], dtype = str),
+            "Values": values,
+            "States": states,
+            "CalcByIds": calcByIds,
+        }
+        for unitOp in unitOps:
+            for name, array in unitOp.GetSnapshotArrays().items():
+                arrays[f"{unitOp.Id}.{name}"] = array
+        with open(path, "wb") as file:
+            np.savez(file, **arrays)
+
+    def Load(self, path, lazy = False):
+        '''
+        Restores state saved by Save() to flowsheet with the same structure (built by the same code, solver may be frozen)
+        without running solver. lazy - columns of ArrayPropertyStore are memory-mapped and read from file on access
+        '''
+        arrays = MapSnapshot(path) if lazy else dict(np.load(path))
+
+        unitOps = [self.Dependencies.Nodes[id] for id in sorted(self.Dependencies.Nodes)]
+        properties = self.PropertyStore.Properties
+        if (arrays["UnitOpIds"].tolist() != [unitOp.Id for unitOp in unitOps]
+                or arrays["UnitOpNames"].tolist() != [unitOp.Name for unitOp in unitOps]
+                or arrays["UnitOpTypes"].tolist() != [type(unitOp).__name__ for unitOp in unitOps]):
+            raise Exception(f"Flowsheet Load error! Unitops of snapshot {path} don't match flowsheet")
+        if (len(arrays["PropertyTags"]) != len(properties)
+                or arrays["PropertyTags"].tolist() != [prop.Tag for prop in properties]):
+            raise Exception(f"Flowsheet Load error! Properties of snapshot {path} don't match flowsheet")
+
+        if self.PropertyStore.Clones or self.Dependencies.Clones:
+            raise Exception(f"Flowsheet Load error! Flowsheet has clones")
+        nodes = self.Dependencies.Nodes
+        self.PropertyStore.SetColumns(arrays["Values"], arrays["States"], arrays["CalcByIds"], nodes, lazy)
+
+        # Restore calc-by links
+        for unitOp in unitOps:
+            unitOp.CalculatedTriggeringProperties.clear()
+        calcByIds = arrays["CalcByIds"]
+        for index in np.flatnonzero(calcByIds >= 0).tolist():
+            prop = properties[index]
+            calcBy = nodes[int(calcByIds[index])]
+            if prop.TriggerSolve:
+                calcBy.CalculatedTriggeringProperties[index] = prop
+            if calcBy is not prop.Owner:
+                self.Dependencies.AddEdge(calcBy, prop.Owner)
+
+        # Restored case is solved, only not calculated unitops are left in solving queue
+        solver = self.StaticsSolver
+        solver.ForgettingQueue.Clear()
+        solver.SolvingQueue.Clear()
+        for unitOp, isCalculated in zip(unitOps, arrays["IsCalculated"].tolist()):
+            unitOp.IsCalculated = isCalculated
+            if not isCalculated:
+                solver.TryAddObjectToSolvingQueue(unitOp)
+            prefix = f"{unitOp.Id}."
+            unitArrays = {name[len(prefix):] : array for name, array in arrays.items() if name.startswith(prefix)}
+            if unitArrays:
+                unitOp.SetSnapshotArrays(unitArrays)
+
+class SolveProgress:
+    '''
+    Progress of async solve (see Flowsheet.SolveIter()): unitop forgotten or calculated on the last step
+    (None if solver calculates flowsheet in one step), number of steps made and number of unitops left in solver queues
+    '''
+    __slots__ = ("UnitOp", "IsForgetting", "Steps", "Pending")
+
+    def __init__(self, unitOp : BaseUnitOp, isForgetting : bool, steps : int, pending : int):
+        self.UnitOp = unitOp
+        self.IsForgetting = isForgetting
+        self.Steps = steps
+        self.Pending = pending
+
+
+def MapSnapshot(path):
+    '''
+    Memory-maps arrays of uncompressed npz file (copy-on-write, data is read from file on access)
+    '''
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as file:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise Exception(f"Flowsheet Load error! Snapshot {path} is compressed and can't be loaded lazily")
+            # Data follows local file header (30 bytes, name and extra field) and npy header
+            file.seek(info.header_offset + 26)
+            nameLength, extraLength = struct.unpack("<HH", file.read(4))
+            file.seek(info.header_offset + 30 + nameLength + extraLength)
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortranOrder, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortranOrder, dtype = np.lib.format.read_array_header_2_0(file)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if dtype.hasobject:
+                raise Exception(f"Flowsheet Load error! Array {name} of snapshot {path} contains objects")
+            if 0 in shape:
+                arrays[name] = np.empty(shape, dtype = dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype = dtype, mode = "c", offset = file.tell(), shape = shape,
+                                         order = "F" if fortranOrder else "C")
+    return arrays
+
+
+class SolverTracer:
+    '''
+    Base class of solver instrumentation (see SequentialSolver.Tracer).
+    Solver calls methods of tracer on solver events, methods of base class do nothing
+    '''
+    def PassStarted(self, isForgetting : bool):
+        pass
+
+    def PassFinished(self, isForgetting : bool):
+        pass
+
+    def UnitOpDequeued(self, unitOp : BaseUnitOp, isForgetting : bool):
+        pass
+
+    def CalculateStarted(self, unitOp : BaseUnitOp, isForgetting : bool):
+        pass
+
+    def CalculateFinished(self, unitOp : BaseUnitOp, isForgetting : bool):
+        pass
+
+    def PropertyCalculated(self, prop : NumericalProperty):
+        pass
+
+
+class MultiTracer(SolverTracer):
+    '''
+    Sends solver events to several tracers
+    '''
+    def __init__(self, *tracers : SolverTracer):
+        self.Tracers = tracers
+
+    def PassStarted(self, isForgetting : bool):
+        for tracer in self.Tracers:
+            tracer.PassStarted(isForgetting)
+
+    def PassFinished(self, isForgetting : bool):
+        for tracer in self.Tracers:
+            tracer.PassFinished(isForgetting)
+
+    def UnitOpDequeued(self, unitOp : BaseUnitOp, isForgetting : bool):
+        for tracer in self.Tracers:
+            tracer.UnitOpDequeued(unitOp, isForgetting)
+
+    def CalculateStarted(self, unitOp : BaseUnitOp, isForgetting : bool):
+        for tracer in self.Tracers:
+            tracer.CalculateStarted(unitOp, isForgetting)
+
+    def CalculateFinished(self, unitOp : BaseUnitOp, isForgetting : bool):
+        for tracer in self.Tracers:
+            tracer.CalculateFinished(unitOp, isForgetting)
+
+    def PropertyCalculated(self, prop : NumericalProperty):
+        for tracer in self.Tracers:
+            tracer.PropertyCalculated(prop)
+
+
+class LockedTracer(SolverTracer):
+    '''
+    Serializes calls to tracer made from pool threads of ParallelSolver
+    '''
+    def __init__(self, tracer : SolverTracer):
+        self.Tracer = tracer
+        self._lock = threading.Lock()
+
+    def PassStarted(self, isForgetting : bool):
+        with self._lock:
+            self.Tracer.PassStarted(isForgetting)
+
+    def PassFinished(self, isForgetting : bool):
+        with self._lock:
+            self.Tracer.PassFinished(isForgetting)
+
+    def UnitOpDequeued(self, unitOp : BaseUnitOp, isForgetting : bool):
+        with self._lock:
+            self.Tracer.UnitOpDequeued(unitOp, isForgetting)
+
+    def CalculateStarted(self, unitOp : BaseUnitOp, isForgetting : bool):
+        with self._lock:
+            self.Tracer.CalculateStarted(unitOp, isForgetting)
+
+    def CalculateFinished(self, unitOp : BaseUnitOp, isForgetting : bool):
+        with self._lock:
+            self.Tracer.CalculateFinished(unitOp, isForgetting)
+
+    def PropertyCalculated(self, prop : NumericalProperty):
+        with self._lock:
+            self.Tracer.PropertyCalculated(prop)
+
+
+class PrintTracer(SolverTracer):
+    '''
+    Prints passes and calculated unitops to stdout
+    '''
+    def PassStarted(self, isForgetting : bool):
+        print("")
+        print("Forgetting PASS" if isForgetting else "Solving PASS")
+
+    def CalculateStarted(self, unitOp : BaseUnitOp, isForgetting : bool):
+        print(unitOp.Name)
+
+
+class CallCountTracer(SolverTracer):
+    '''
+    Counts passes and Calculate calls of every unitop
+    '''
+    def __init__(self):
+        self.ForgettingPasses = 0
+        self.SolvingPasses = 0
+        self.ForgettingCalls : dict[str, int] = {}
+        self.SolvingCalls : dict[str, int] = {}
+        self.CalculatedProperties = 0
+
+    def PassStarted(self, isForgetting : bool):
+        if isForgetting:
+            self.ForgettingPasses += 1
+        else:
+            self.SolvingPasses += 1
+
+    def CalculateStarted(self, unitOp : BaseUnitOp, isForgetting : bool):
+        calls = self.ForgettingCalls if isForgetting else self.SolvingCalls
+        calls[unitOp.Name] = calls.get(unitOp.Name, 0) + 1
+
+    def PropertyCalculated(self, prop : NumericalProperty):
+        self.CalculatedProperties += 1
+
+
+class TimingTracer(SolverTracer):
+    '''
+    Wall-clock time of Calculate calls accumulated for every unitop
+    '''
+    def __init__(self):
+        self.ForgettingTimes : dict[str, float] = {}
+        self.SolvingTimes : dict[str, float] = {}
+        self._starts : dict[int, float] = {}
+
+    def CalculateStarted(self, unitOp : BaseUnitOp, isForgetting : bool):
+        self._starts[unitOp.Id] = time.perf_counter()
+
+    def CalculateFinished(self, unitOp : BaseUnitOp, isForgetting : bool):
+        elapsed = time.perf_counter() - self._starts.pop(unitOp.Id)
+        times = self.ForgettingTimes if isForgetting else self.SolvingTimes
+        times[unitOp.Name] = times.get(unitOp.Name, 0.0) + elapsed
+
+    def Slowest(self, count = 10):
+        total : dict[str, float] = dict(self.ForgettingTimes)
+        for name, elapsed in self.SolvingTimes.items():
+            total[name] = total.get(name, 0.0) + elapsed
+        return sorted(total.items(), key = lambda item: item[1], reverse = True)[:count]
+
+
+class ChromeTraceTracer(SolverTracer):
+    '''
+    Collects solver events in Chrome trace-event format (chrome://tracing, Perfetto)
+    '''
+    def __init__(self):
+        self.Events : list[dict] = []
+        self._start = time.perf_counter()
+
+    def _add(self, name, category, phase, **args):
+        event = {"name": name, "cat": category, "ph": phase, "pid": 0, "tid": threading.get_ident(),
+                 "ts": (time.perf_counter() - self._start) * 1e6}
+        if args:
+            event["args"] = args
+        self.Events.append(event)
+
+    def PassStarted(self, isForgetting : bool):
+        self._add("Forgetting PASS" if isForgetting else "Solving PASS", "pass", "B")
+
+    def PassFinished(self, isForgetting : bool):
+        self._add("Forgetting PASS" if isForgetting else "Solving PASS", "pass", "E")
+
+    def CalculateStarted(self, unitOp : BaseUnitOp, isForgetting : bool):
+        self._add(unitOp.Name, "forgetting" if isForgetting else "solving", "B")
+
+    def CalculateFinished(self, unitOp : BaseUnitOp, isForgetting : bool):
+        self._add(unitOp.Name, "forgetting" if isForgetting else "solving", "E")
+
+    def PropertyCalculated(self, prop : NumericalProperty):
+        self._add(f"{prop.Owner.Name}.{prop.Tag}", "property", "i", value = prop.Value)
+
+    def Save(self, path):
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.Events}, file)
+
+
+class CalcScheduler:
+    '''
+    Priority queue of unitops used by SequentialSolver.
+    Solver is single-threaded, so plain heapq is used instead of locking queue.PriorityQueue.
+    Unitops are ordered by (key, Id), where key is CalcOrder by default; membership test is O(1).
+    When key of queued unitop changes, Reprioritize() pushes new heap entry,
+    the old one becomes stale and is skipped on pop.
+    '''
+    def __init__(self, keyFunc = lambda unitOp: unitOp.CalcOrder):
+        self.KeyFunc = keyFunc
+        self._heap : list[tuple] = []
+        self._entries : dict[int, tuple] = {}
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, unitOp : BaseUnitOp):
+        return unitOp.Id in self._entries
+
+    def __iter__(self):
+        return (entry[3] for entry in list(self._entries.values()))
+
+    def TryAdd(self, unitOp : BaseUnitOp):
+        if unitOp.Id in self._entries:
+            return False
+        self._push(unitOp)
+        return True
+
+    def Reprioritize(self, unitOp : BaseUnitOp):
+        entry = self._entries.get(unitOp.Id)
+        if entry is None or entry[0] == self.KeyFunc(unitOp):
+            return False
+        self._push(unitOp)
+        return True
+
+    def TryPop(self):
+        heap = self._heap
+        entries = self._entries
+        while heap:
+            entry = heappop(heap)
+            # Skip stale entries of reprioritized unitops
+            if entries.get(entry[1]) is entry:
+                del entries[entry[1]]
+                return entry[3]
+        return None
+
+    def Rebuild(self):
+        '''
+        Recalculates keys of all queued unitops
+        '''
+        self._entries = {id : (self.KeyFunc(entry[3]),) + entry[1:] for id, entry in self._entries.items()}
+        self._heap = list(self._entries.values())
+        heapify(self._heap)
+
+    def Remove(self, unitOp : BaseUnitOp):
+        # Heap entry becomes stale and is skipped on pop
+        return self._entries.pop(unitOp.Id, None) is not None
+
+    def Clear(self):
+        self._heap.clear()
+        self._entries.clear()
+
+    def _push(self, unitOp : BaseUnitOp):
+        # Counter keeps entries with equal (key, Id) comparable without comparing unitops
+        self._counter += 1
+        entry = (self.KeyFunc(unitOp), unitOp.Id, self._counter, unitOp)
+        self._entries[unitOp.Id] = entry
+        heappush(self._heap, entry)
+
+
+class SequentialSolver:
+
+    def __init__(self, ownerCase: Flowsheet):
+        self.Owner = ownerCase
+        self.SolverState = SolverStateEnum.Frozen
+        self.ForgettingQueue = CalcScheduler(self.GetCalcKey)
+        self.SolvingQueue = CalcScheduler(self.GetCalcKey)
+        # Spec changes made during solving pass, they are forgotten after the pass (see FlushPendingChanges())
+        self.PendingChanges = CalcScheduler(self.GetCalcKey)
+        self.IsSolving = False
+        self.IsCurrentlySolvePass = False
+        # Instrumentation (see SolverTracer), None - no tracing
+        self.Tracer : SolverTracer = None
+
+    def TryAddObjectToForgettingQueue(self, ObjectToAdd : BaseUnitOp):
+        if self.IsCurrentlySolvePass:
+            return self.PendingChanges.TryAdd(ObjectToAdd)
+        return self.ForgettingQueue.TryAdd(ObjectToAdd)
+
+    def FlushPendingChanges(self):
+        '''
+        Moves unitops changed during solving pass to forgetting queue (several changes of one unitop give one entry).
+        Returns True if there were any changes
+        '''
+        if len(self.PendingChanges) == 0:
+            return False
+        while True:
+            unitOp = self.PendingChanges.TryPop()
+            if unitOp is None:
+                break
+            self.ForgettingQueue.TryAdd(unitOp)
+        return True
+
+    def TryAddObjectToSolvingQueue(self, ObjectToAdd : BaseUnitOp):
+        return self.SolvingQueue.TryAdd(ObjectToAdd)
+
+    def TryDequeueForgetting(self):
+        return self.ForgettingQueue.TryPop()
+
+    def TryDequeueCalc(self):
+        # Order is recalculated only here: forgetting pass doesn't depend on it
+        if self.Owner.Dependencies.UpdateOrder():
+            self.ForgettingQueue.Rebuild()
+            self.SolvingQueue.Rebuild()
+        return self.SolvingQueue.TryPop()
+
+    def Forget(self, unitOp : BaseUnitOp):
+        '''
+        Forgetting of unitop together with its downstream cone in one traversal:
+        calculated properties are cleared in bulk and all affected unitops are added to solving queue
+        '''
+        affectedOps, affectedProps = self.Owner.Dependencies.CollectAffected(self.GetForgettingRoots(unitOp))
+
+        # Clear All calculated properties
+        for prop in affectedProps:
+            prop.Clear()
+
+        tracer = self.Tracer
+        if tracer is not None:
+            tracer.UnitOpDequeued(unitOp, True)
+
+        for element in affectedOps:
+            self.ForgettingQueue.Remove(element)
+            element.CalculatedTriggeringProperties.clear()
+
+            # Call forgetting calculation of object
+            if tracer is None:
+                element.Calculate(True)
+            else:
+                tracer.CalculateStarted(element, True)
+                element.Calculate(True)
+                tracer.CalculateFinished(element, True)
+
+            # Add object to Solving queue
+            self.TryAddObjectToSolvingQueue(element)
+
+    def GetForgettingRoots(self, unitOp : BaseUnitOp):
+        '''
+        Unitops to be forgotten together with dequeued one
+        '''
+        return (unitOp,)
+
+    def GetCalcKey(self, unitOp : BaseUnitOp):
+        '''
+        Unitops are solved in topological order of flowsheet dependency graph,
+        CalcOrder is used to order unitops inside one recycle or independent from each other
+        '''
+        return (self.Owner.Dependencies.GetRank(unitOp), unitOp.CalcOrder)
+
+    def Reprioritize(self, unitOp : BaseUnitOp):
+        '''
+        Updates position of unitop in solver queues after its CalcOrder was changed
+        '''
+        self.ForgettingQueue.Reprioritize(unitOp)
+        self.SolvingQueue.Reprioritize(unitOp)
+        self.PendingChanges.Reprioritize(unitOp)
+
+    def AddEdge(self, fromOp : BaseUnitOp, toOp : BaseUnitOp):
+        '''
+        Dependency found by calculation: property of toOp was calculated by fromOp
+        '''
+        return self.Owner.Dependencies.AddEdge(fromOp, toOp)
+    
+    def Solve(self):
+        for _ in self.SolveSteps():
+            pass
+
+    def SolveSteps(self):
+        '''
+        Solving loop as generator: yields (unitop, isForgetting) after forgetting or calculation of every unitop,
+        so caller can interrupt solve between calculations (see Flowsheet.SolveIter())
+        '''
+        if self.IsSolving:
+            raise Exception(f"Solver error! Solver already solving.")
+    
+        self.Owner.DetachClones()
+        self.IsSolving = True
+
+        tracer = self.Tracer
+        if tracer is not None:
+            tracer.PassStarted(True)
+        
+        try:
+            while True:
+                # Get Element from forgetting Queue collection
+                elementF = self.TryDequeueForgetting()
+
+                if not elementF is None:
+                    if self.IsCurrentlySolvePass and tracer is not None:
+                        tracer.PassFinished(False)
+                        tracer.PassStarted(True)
+                    
+                    self.IsCurrentlySolvePass = False
+
+                    self.Forget(elementF)
+
+                    yield elementF, True
+                    continue
+                
+                if self.SolverState is SolverStateEnum.Active:
+                    elementS = self.TryDequeueCalc()
+                    if not elementS is None:
+
+                        if not self.IsCurrentlySolvePass and tracer is not None:
+                            tracer.PassFinished(True)
+                            tracer.PassStarted(False)
+                        
+                        self.IsCurrentlySolvePass = True
+
+                        if tracer is not None:
+                            tracer.UnitOpDequeued(elementS, False)
+                        
+                        if elementS.IsCalculated:
+                            continue
+                        
+                        # Calculate object
+                        if tracer is None:
+                            elementS.CalculateCached()
+                        else:
+                            tracer.CalculateStarted(elementS, False)
+                            elementS.CalculateCached()
+                            tracer.CalculateFinished(elementS, False)
+
+                        yield elementS, False
+                        continue
+
+                # Changes made during solving pass are forgotten in the next pass
+                if self.FlushPendingChanges():
+                    continue
+
+                # Finish loop if we reached this point
+                break
+
+            if tracer is not None:
+                tracer.PassFinished(not self.IsCurrentlySolvePass)
+        finally:
+            self.IsCurrentlySolvePass = False
+            self.FlushPendingChanges()
+            self.IsSolving = False
+
+    def Pull(self, prop : NumericalProperty):
+        '''
+        Demand-driven calculation (Lazy state): calculates only unitops, which value of property depends on
+        (owner of property and its upstream unitops, which are waiting in solving queue or aren't calculated). Returns value of property,
+        None if it can't be calculated (flowsheet is under-specified): unitops, which weren't calculated, are left in solving queue
+        '''
+        if self.IsSolving:
+            return prop._store.GetValue(prop._index)
+        self.Owner.DetachClones()
+        self.ForgetPending()
+        dependencies = self.Owner.Dependencies
+        previous = None
+
+        while True:
+            if dependencies.UpdateOrder():
+                self.ForgettingQueue.Rebuild()
+                self.SolvingQueue.Rebuild()
+
+            # Upstream unitops waiting for calculation or not calculated, search stops at calculated unitops
+            required = CalcScheduler(self.GetCalcKey)
+            visited = {prop.Owner.Id}
+            stack = [prop.Owner.Id]
+            while stack:
+                id = stack.pop()
+                unitOp = dependencies.Nodes[id]
+                if unitOp in self.SolvingQueue:
+                    self.SolvingQueue.Remove(unitOp)
+                    required.TryAdd(unitOp)
+                elif not unitOp.IsCalculated:
+                    required.TryAdd(unitOp)
+                elif id != prop.Owner.Id:
+                    continue
+                for predecessor in dependencies.Predecessors[id]:
+                    if predecessor not in visited:
+                        visited.add(predecessor)
+                        stack.append(predecessor)
+            if len(required) == 0:
+                break
+            ids = {unitOp.Id for unitOp in required}
+            if ids == previous:
+                # Nothing was changed by the previous round
+                for unitOp in required:
+                    self.TryAddObjectToSolvingQueue(unitOp)
+                break
+            previous = ids
+
+            self.IsSolving = True
+            tracer = self.Tracer
+            calculated = False
+            failed = []
+            try:
+                if tracer is not None:
+                    tracer.PassStarted(False)
+                while True:
+                    unitOp = required.TryPop()
+                    if unitOp is None:
+                        break
+                    if unitOp.IsCalculated:
+                        continue
+                    if tracer is None:
+                        unitOp.CalculateCached()
+                    else:
+                        tracer.CalculateStarted(unitOp, False)
+                        unitOp.CalculateCached()
+                        tracer.CalculateFinished(unitOp, False)
+                    if unitOp.IsCalculated:
+                        calculated = True
+                    else:
+                        failed.append(unitOp)
+                    # Unitops of recycle can be added back to solving queue by calculations
+                    for id in dependencies.Predecessors[unitOp.Id] | dependencies.Successors[unitOp.Id] | {unitOp.Id}:
+                        if id in visited:
+                            other = dependencies.Nodes[id]
+                            if other in self.SolvingQueue:
+                                self.SolvingQueue.Remove(other)
+                                required.TryAdd(other)
+                if tracer is not None:
+                    tracer.PassFinished(False)
+            finally:
+                self.IsSolving = False
+            for unitOp in failed:
+                if not unitOp.IsCalculated:
+                    self.TryAddObjectToSolvingQueue(unitOp)
+            self.ForgetPending()
+            if not calculated:
+                break
+        return prop._store.GetValue(prop._index)
+
+    def SolveWhole(self):
+        '''
+        SolveSteps() for solvers, which can't be interrupted: whole solve is one step
+        '''
+        self.Solve()
+        yield None, False
+
+    def ForgetPending(self):
+        '''
+        Finishes forgetting pass: unitops left in forgetting queue are forgotten and added to solving queue
+        '''
+        self.Owner.DetachClones()
+        self.FlushPendingChanges()
+        while True:
+            unitOp = self.TryDequeueForgetting()
+            if unitOp is None:
+                break
+            self.Forget(unitOp)
+
+
+class ComponentSolver(SequentialSolver):
+    '''
+    Solver of one connected component used by ParallelSolver.
+    Uses order of dependency graph prepared by ParallelSolver and doesn't update it
+    '''
+    def __init__(self, ownerCase: Flowsheet):
+        super().__init__(ownerCase)
+        self.SolverState = SolverStateEnum.Active
+        # Dependencies found by calculations, they are added to graph by coordinating thread
+        self.NewEdges : list[tuple[BaseUnitOp, BaseUnitOp]] = []
+
+    def TryDequeueCalc(self):
+        return self.SolvingQueue.TryPop()
+
+
+class ParallelSolver(SequentialSolver):
+    '''
+    Solver calculating independent parts of flowsheet (connected components of dependency graph) concurrently.
+    Forgetting pass is made sequentially, then unitops of solving queue are split by components
+    and every component is solved by its own ComponentSolver in thread pool.
+    Components share no properties, so results are identical to SequentialSolver.
+    Pool threads only calculate unitops of their components: queue requests of unitops go to solver of the thread,
+    dependency graph and solver queues are changed by coordinating thread after all components are solved.
+    Threads speed up solve only if calculations of unitops release GIL (NumPy, native code)
+    '''
+    def __init__(self, ownerCase: Flowsheet, workers = 4):
+        super().__init__(ownerCase)
+        self.Workers = workers
+        self._componentSolvers : dict[int, ComponentSolver] = None
+        # ComponentSolver of current thread while components are solved
+        self._local = threading.local()
+
+    def TryAddObjectToForgettingQueue(self, ObjectToAdd : BaseUnitOp):
+        solver = getattr(self._local, "Solver", None)
+        if solver is None:
+            return super().TryAddObjectToForgettingQueue(ObjectToAdd)
+        return solver.TryAddObjectToForgettingQueue(ObjectToAdd)
+
+    def TryAddObjectToSolvingQueue(self, ObjectToAdd : BaseUnitOp):
+        solver = getattr(self._local, "Solver", None)
+        if solver is None:
+            return super().TryAddObjectToSolvingQueue(ObjectToAdd)
+        return solver.TryAddObjectToSolvingQueue(ObjectToAdd)
+
+    def Reprioritize(self, unitOp : BaseUnitOp):
+        solver = getattr(self._local, "Solver", None)
+        if solver is None:
+            return super().Reprioritize(unitOp)
+        return solver.Reprioritize(unitOp)
+
+    def AddEdge(self, fromOp : BaseUnitOp, toOp : BaseUnitOp):
+        solver = getattr(self._local, "Solver", None)
+        if solver is None:
+            return super().AddEdge(fromOp, toOp)
+        if fromOp is toOp or toOp.Id in self.Owner.Dependencies.Successors[fromOp.Id]:
+            return False
+        solver.NewEdges.append((fromOp, toOp))
+        return True
+
+    def SolveSteps(self):
+        if self.SolverState is not SolverStateEnum.Active or self.Workers < 2:
+            return super().SolveSteps()
+        return self.SolveWhole()
+
+    def Solve(self):
+        if self.SolverState is not SolverStateEnum.Active or self.Workers < 2:
+            return super().Solve()
+
+        if self.IsSolving:
+            raise Exception(f"Solver error! Solver already solving.")
+
+        self.Owner.DetachClones()
+        self.IsSolving = True
+        try:
+            while True:
+                if self.Tracer is not None:
+                    self.Tracer.PassStarted(True)
+                while True:
+                    elementF = self.TryDequeueForgetting()
+                    if elementF is None:
+                        break
+                    self.Forget(elementF)
+                if self.Tracer is not None:
+                    self.Tracer.PassFinished(True)
+
+                if len(self.SolvingQueue) == 0:
+                    break
+                self.SolveComponents()
+        finally:
+            self._componentSolvers = None
+            self.IsSolving = False
+
+    def SolveComponents(self):
+        dependencies = self.Owner.Dependencies
+        if dependencies.UpdateOrder():
+            self.ForgettingQueue.Rebuild()
+            self.SolvingQueue.Rebuild()
+
+        # Split solving queue by components
+        self._componentSolvers = {}
+        while True:
+            element = self.SolvingQueue.TryPop()
+            if element is None:
+                break
+            self._get_component_solver(element).SolvingQueue.TryAdd(element)
+        componentSolvers = list(self._componentSolvers.values())
+        self._componentSolvers = None
+
+        store = self.Owner.PropertyStore
+        tracer = self.Tracer
+        if len(componentSolvers) > 1 and store.ConcurrentWrites and not store.Clones:
+            if tracer is not None:
+                # Tracer is also called by properties calculated in pool threads (see NumericalProperty.Calculate())
+                self.Tracer = LockedTracer(tracer)
+            try:
+                with ThreadPoolExecutor(max_workers = self.Workers) as pool:
+                    for future in [pool.submit(self._solve_component, solver) for solver in componentSolvers]:
+                        future.result()
+            finally:
+                self.Tracer = tracer
+        else:
+            # Copy-on-write rows of clones can't be written concurrently
+            for solver in componentSolvers:
+                self._solve_component(solver)
+
+        for solver in componentSolvers:
+            for fromOp, toOp in solver.NewEdges:
+                dependencies.AddEdge(fromOp, toOp)
+            # Keep elements left in component queues (if any) for the next pass
+            for queue, ownQueue in ((solver.ForgettingQueue, self.ForgettingQueue), (solver.SolvingQueue, self.SolvingQueue)):
+                while True:
+                    element = queue.TryPop()
+                    if element is None:
+                        break
+                    ownQueue.TryAdd(element)
+
+    def _solve_component(self, solver : ComponentSolver):
+        solver.Tracer = self.Tracer
+        self._local.Solver = solver
+        try:
+            solver.Solve()
+        finally:
+            self._local.Solver = None
+
+    def _get_component_solver(self, unitOp : BaseUnitOp):
+        component = self.Owner.Dependencies.FindComponent(unitOp)
+        solver = self._componentSolvers.get(component)
+        if solver is None:
+            solver = self._componentSolvers[component] = ComponentSolver(self.Owner)
+        return solver
+
+
+class EquationSolver(SequentialSolver):
+    '''
+    Equation-oriented solver: instead of sequential solving pass linear relations of all unitops
+    (see BaseUnitOp.GetLinearRelations) are gathered into sparse linear system and solved at once.
+    System is split into independent blocks, degrees of freedom of every block are checked before solving.
+    Unknowns are all properties, which are not specified. Unitops of a block are forgotten together.
+    Under-specified blocks aren't solved: their unitops are left in solving queue (see UnderSpecified)
+    '''
+    def __init__(self, ownerCase: Flowsheet):
+        super().__init__(ownerCase)
+        self._blocks : dict[int, list[BaseUnitOp]] = {}
+        # Problems of under-specified blocks found by the last solve
+        self.UnderSpecified : list[str] = []
+
+    def GetForgettingRoots(self, unitOp : BaseUnitOp):
+        return self._blocks.get(unitOp.Id, (unitOp,))
+
+    def SolveSteps(self):
+        if self.SolverState is not SolverStateEnum.Active:
+            return super().SolveSteps()
+        return self.SolveWhole()
+
+    def Solve(self):
+        if self.SolverState is not SolverStateEnum.Active:
+            return super().Solve()
+
+        if self.IsSolving:
+            raise Exception(f"Solver error! Solver already solving.")
+
+        self.Owner.DetachClones()
+        self.IsSolving = True
+        tracer = self.Tracer
+        try:
+            # Spec changes made by unitops while results are written need one more pass
+            while True:
+                if tracer is not None:
+                    tracer.PassStarted(True)
+                while True:
+                    elementF = self.TryDequeueForgetting()
+                    if elementF is None:
+                        break
+                    self.Forget(elementF)
+                if tracer is not None:
+                    tracer.PassFinished(True)
+
+                unitOps = []
+                while True:
+                    element = self.TryDequeueCalc()
+                    if element is None:
+                        break
+                    unitOps.append(element)
+
+                unsolved = []
+                if unitOps:
+                    if tracer is not None:
+                        tracer.PassStarted(False)
+                    try:
+                        unsolved = self.SolveBlocks(unitOps)
+                    except Exception:
+                        # Nothing was written, unitops are solved by the next solve
+                        for unitOp in unitOps:
+                            self.TryAddObjectToSolvingQueue(unitOp)
+                        raise
+                    if tracer is not None:
+                        tracer.PassFinished(False)
+
+                # Writing of results adds consumers to solving queue, they are already solved.
+                # Unitops of under-specified blocks wait for specs
+                self.SolvingQueue.Clear()
+                for unitOp in unsolved:
+                    self.TryAddObjectToSolvingQueue(unitOp)
+                if len(self.ForgettingQueue) == 0:
+                    break
+        finally:
+            self.IsSolving = False
+
+    def GatherBlocks(self, unitOps):
+        '''
+        Linear relations of flowsheet parts including unitops split into independent blocks.
+        Returns list of blocks: (unitops, relations, unknown properties), where relation is (unitop, coefficients, rhs)
+        and known (specified) values are moved to rhs
+        '''
+        dependencies = self.Owner.Dependencies
+        components = {dependencies.FindComponent(unitOp) for unitOp in unitOps}
+        relations = []
+        for unitOp in dependencies.Nodes.values():
+            if dependencies.FindComponent(unitOp) not in components:
+                continue
+            unitOpRelations = unitOp.GetLinearRelations()
+            if unitOpRelations is None:
+                raise Exception(f"EquationSolver error! UnitOp {unitOp.Name} doesn't provide linear relations")
+            for coefficients, rhs in unitOpRelations:
+                unknowns = {}
+                for prop, coefficient in coefficients.items():
+                    if prop.PropertyState is not PropertyStateEnum.CALCULATED and prop.HasValue:
+                        rhs -= coefficient * prop.Value
+                    else:
+                        unknowns[prop] = coefficient
+                relations.append((unitOp, unknowns, rhs))
+
+        # Union-find of relations connected by unknowns
+        parents = list(range(len(relations)))
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+        owners : dict[NumericalProperty, int] = {}
+        for i, (unitOp, unknowns, rhs) in enumerate(relations):
+            for prop in unknowns:
+                j = owners.setdefault(prop, i)
+                rootI, rootJ = find(i), find(j)
+                if rootI != rootJ:
+                    parents[rootI] = rootJ
+
+        blocks : dict[int, tuple] = {}
+        for i, relation in enumerate(relations):
+            blockOps, blockRelations, blockUnknowns = blocks.setdefault(find(i), ([], [], {}))
+            if relation[0] not in blockOps:
+                blockOps.append(relation[0])
+            blockRelations.append(relation)
+            for prop in relation[1]:
+                blockUnknowns.setdefault(prop, None)
+        return [(blockOps, blockRelations, list(blockUnknowns)) for blockOps, blockRelations, blockUnknowns in blocks.values()]
+
+    def CheckSpecification(self, blocks):
+        '''
+        Degrees of freedom check: list of errors (over-specified blocks, inconsistent specifications)
+        and problems of under-specified blocks by indices of blocks
+        '''
+        errors = []
+        underSpecified : dict[int, str] = {}
+        for index, (blockOps, relations, unknowns) in enumerate(blocks):
+            names = ", ".join(unitOp.Name for unitOp in blockOps)
+            if not unknowns:
+                for unitOp, coefficients, rhs in relations:
+                    if not Compare(rhs, 0.0):
+                        errors.append(f"over-specified: relation of {unitOp.Name} isn't satisfied by specified values (residual {rhs})")
+                continue
+            if len(relations) > len(unknowns):
+                errors.append(f"over-specified: {len(relations)} relations for {len(unknowns)} unknowns ({names})")
+            elif len(relations) < len(unknowns):
+                underSpecified[index] = f"under-specified: {len(unknowns) - len(relations)} degrees of freedom ({names})"
+        return errors, underSpecified
+
+    def SolveBlocks(self, unitOps):
+        '''
+        Solves all blocks before writing results, so flowsheet isn't changed if any block can't be solved.
+        Raises exception if block is over-specified or specifications are inconsistent. Under-specified blocks
+        aren't solved (specs may be still entered one by one), their problems are kept in UnderSpecified.
+        Returns unitops of under-specified blocks
+        '''
+        blocks = self.GatherBlocks(unitOps)
+        errors, underSpecified = self.CheckSpecification(blocks)
+        if errors:
+            raise Exception("EquationSolver error! " + "; ".join(errors))
+        self.UnderSpecified = list(underSpecified.values())
+        unsolved = [unitOp for index in underSpecified for unitOp in blocks[index][0]]
+        blocks = [block for index, block in enumerate(blocks) if index not in underSpecified]
+
+        solutions = [self.SolveLinearSystem(relations, unknowns) if unknowns else [] for blockOps, relations, unknowns in blocks]
+        for (blockOps, relations, unknowns), values in zip(blocks, solutions):
+            if unknowns:
+                for prop, value in zip(unknowns, values):
+                    providers = [unitOp for unitOp, coefficients, rhs in relations if prop in coefficients]
+                    calcBy = prop.Owner if prop.Owner in providers else providers[0]
+                    prop.Calculate(value, calcBy)
+            for unitOp in blockOps:
+                self._blocks[unitOp.Id] = blockOps
+                unitOp.IsCalculated = True
+        # Unitop with relations in solved and under-specified blocks is calculated partially
+        for unitOp in unsolved:
+            unitOp.IsCalculated = False
+        return unsolved
+
+    def SolveLinearSystem(self, relations, unknowns):
+        columns = {prop : i for i, prop in enumerate(unknowns)}
+        rows, cols, data = [], [], []
+        for row, (unitOp, coefficients, rhs) in enumerate(relations):
+            for prop, coefficient in coefficients.items():
+                rows.append(row)
+                cols.append(columns[prop])
+                data.append(coefficient)
+        b = np.array([rhs for unitOp, coefficients, rhs in relations], dtype = float)
+        size = len(unknowns)
+        try:
+            if csr_matrix is not None:
+                with np.errstate(all = "raise"):
+                    values = np.atleast_1d(spsolve(csr_matrix((data, (rows, cols)), shape = (size, size)), b))
+                if not np.all(np.isfinite(values)):
+                    raise np.linalg.LinAlgError()
+            else:
+                matrix = np.zeros((size, size))
+                np.add.at(matrix, (rows, cols), data)
+                values = np.linalg.solve(matrix, b)
+        except (np.linalg.LinAlgError, FloatingPointError, RuntimeError):
+            names = ", ".join(f"{prop.Owner.Name}.{prop.Tag}" for prop in unknowns)
+            raise Exception(f"EquationSolver error! Singular system for unknowns: {names}")
+        return values.tolist()
+
+
+class RecycleConverger:
+    '''
+    Convergence loop of recycles around flowsheet solver.
+    Tear connectors break every recycle: torn connector sets guess to its target, after solve
+    value of its source is compared with guess (using Compare) and guesses are updated by
+    direct substitution, Wegstein or Broyden method until they converge or iteration limit is reached.
+    History keeps max residual of every iteration
+    '''
+    def __init__(self, flowsheet : Flowsheet, method = ConvergenceMethodEnum.Wegstein, maxIterations = 50,
+                 tears : list = None, wegsteinBounds = (-5.0, 0.0)):
+        self.Flowsheet = flowsheet
+        self.Method = method
+        self.MaxIterations = maxIterations
+        self.Tears = tears if tears is not None else SelectTears(flowsheet)
+        self.WegsteinBounds = wegsteinBounds
+        self.History : list[float] = []
+        self.Iterations = 0
+        self.IsConverged = False
+
+    def Converge(self, initialGuesses : list[float] = None):
+        if self.Flowsheet.StaticsSolver.SolverState is not SolverStateEnum.Active:
+            raise Exception(f"RecycleConverger error! Solver must be active")
+        self.History = []
+        self.IsConverged = False
+        if not self.Tears:
+            self.IsConverged = True
+            return True
+
+        if initialGuesses is None:
+            initialGuesses = [tear.Target.Value if tear.Target.HasValue else (tear.Source.Value if tear.Source.HasValue else 0.0)
+                              for tear in self.Tears]
+        x = np.array(initialGuesses, dtype = float)
+        previousX = previousG = inverseJacobian = None
+
+        self.Flowsheet.DetachClones()
+        try:
+            for tear in self.Tears:
+                tear.IsTear = True
+                tear.Guess = None
+            for self.Iterations in range(1, self.MaxIterations + 1):
+                g = self.Evaluate(x)
+                if g is None:
+                    raise Exception(f"RecycleConverger error! Source of tear connector isn't calculated, recycle is under-specified")
+                self.History.append(float(np.max(np.abs(g - x))))
+                if all(Compare(gi, xi) for gi, xi in zip(g, x)):
+                    self.IsConverged = True
+                    break
+
+                if self.Method is ConvergenceMethodEnum.Wegstein and previousX is not None:
+                    newX = self.WegsteinStep(x, g, previousX, previousG)
+                elif self.Method is ConvergenceMethodEnum.Broyden:
+                    newX, inverseJacobian = self.BroydenStep(x, g, previousX, previousG, inverseJacobian)
+                else:
+                    newX = g
+                previousX, previousG, x = x, g, newX
+        finally:
+            self.ReleaseTears()
+        return self.IsConverged
+
+    def Evaluate(self, x):
+        '''
+        Solves flowsheet with guesses x, returns calculated values of tear sources
+        '''
+        with self.Flowsheet.Batch():
+            for tear, value in zip(self.Tears, x):
+                tear.SetGuess(float(value))
+        if not all(tear.Source.HasValue for tear in self.Tears):
+            return None
+        return np.array([tear.Source.Value for tear in self.Tears], dtype = float)
+
+    def WegsteinStep(self, x, g, previousX, previousG):
+        dx = x - previousX
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            slope = np.where(dx != 0, (g - previousG) / dx, 0.0)
+            q = np.where(slope != 1, slope / (slope - 1), self.WegsteinBounds[0])
+        q = np.clip(q, *self.WegsteinBounds)
+        return q * x + (1 - q) * g
+
+    def BroydenStep(self, x, g, previousX, previousG, inverseJacobian):
+        # Root of f(x) = g(x) - x, inverse Jacobian starts from -I (first step is direct substitution)
+        f = g - x
+        if inverseJacobian is None:
+            inverseJacobian = -np.eye(len(x))
+        else:
+            dx = x - previousX
+            df = f - (previousG - previousX)
+            hdf = inverseJacobian @ df
+            denominator = dx @ hdf
+            if denominator != 0:
+                inverseJacobian = inverseJacobian + np.outer(dx - hdf, dx @ inverseJacobian) / denominator
+        return x - inverseJacobian @ f, inverseJacobian
+
+    def ReleaseTears(self):
+        '''
+        Returns tear connectors to normal mode. If recycle isn't converged, connectors are forgotten
+        '''
+        with self.Flowsheet.Batch():
+            for tear in self.Tears:
+                tear.IsTear = False
+                if not self.IsConverged:
+                    tear.TryAddToCalcQueue(True)
+                    tear.TriggerSolver()
+
+
+def SelectTears(flowsheet : Flowsheet):
+    '''
+    Tear connectors breaking all recycles of flowsheet: connectors on back edges of
+    depth-first search inside every strongly connected component of dependency graph
+    '''
+    dependencies = flowsheet.Dependencies
+    tears = []
+    for component in dependencies.Recycles():
+        members = {unitOp.Id for unitOp in component}
+        torn = set()
+        while True:
+            backEdge = FindBackEdge(dependencies, members - torn)
+            if backEdge is None:
+                break
+            fromOp, toOp = (dependencies.Nodes[id] for id in backEdge)
+            tear = fromOp if isinstance(fromOp, Connector) else toOp
+            if not isinstance(tear, Connector):
+                raise Exception(f"RecycleConverger error! Recycle between {fromOp.Name} and {toOp.Name} has no connector to tear")
+            torn.add(tear.Id)
+            tears.append(tear)
+    return tears
+
+
+def FindBackEdge(dependencies : DependencyGraph, members : set[int]):
+    # Iterative depth-first search in order of unitop ids
+    state : dict[int, bool] = {}  # True - on stack, False - finished
+    for root in sorted(members):
+        if root in state:
+            continue
+        state[root] = True
+        work = [(root, iter(sorted(dependencies.Successors[root] & members)))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if state.get(successor) is True:
+                    return node, successor
+                if successor not in state:
+                    state[successor] = True
+                    work.append((successor, iter(sorted(dependencies.Successors[successor] & members))))
+                    break
+            else:
+                state[node] = False
+                work.pop()
+    return None
+
+
+class ResultCache:
+    '''
+    LRU cache of unitop calculation results: key is built from values and states of input properties,
+    value is list of (property, calculated value)
+    '''
+    def __init__(self, maxSize : int):
+        self.MaxSize = maxSize
+        self.Entries : OrderedDict = OrderedDict()
+        self.Hits = 0
+        self.Misses = 0
+
+    def __len__(self):
+        return len(self.Entries)
+
+    def Get(self, key):
+        results = self.Entries.get(key)
+        if results is None:
+            self.Misses += 1
+            return None
+        self.Entries.move_to_end(key)
+        self.Hits += 1
+        return results
+
+    def Put(self, key, results : list):
+        self.Entries[key] = results
+        self.Entries.move_to_end(key)
+        while len(self.Entries) > self.MaxSize:
+            self.Entries.popitem(last = False)
+
+    def Clear(self):
+        self.Entries.clear()
+        self.Hits = 0
+        self.Misses = 0
+
+
+class BaseUnitOp:
+    def __init__(self, name, Flwsht: Flowsheet, calcOrder = 500):
+        self.Name = name
+        self.Id = Flwsht.AddUnitOp(self)
+        self.Owner = Flwsht
+
+        self._calc_order = calcOrder
+
+
+        self.IsCalculated = False
+        # Calculated properties by handles (see NumericalProperty.Handle)
+        self.CalculatedTriggeringProperties : dict[int, NumericalProperty] = {}
+
+    @property
+    def CalcOrder(self):
+        return self._calc_order
+
+    @CalcOrder.setter
+    def CalcOrder(self, calcOrder):
+        self.Owner.DetachClones()
+        self._calc_order = calcOrder
+        self.Owner.StaticsSolver.Reprioritize(self)
+    
+    def TriggerSolver(self):
         self.Owner.Solve()
 
     def TryAddToCalcQueue(self, forgetting):
@@ -470,113 +3020,576 @@ class BaseUnitOp:
             return self.Owner.StaticsSolver.TryAddObjectToSolvingQueue(self)
         
     def ClearCalculatedProperties(self):
-        for prop in self.CalculatedTriggeringProperties.values():
-            if prop.Owner.Id != self.Id:
-                self.Owner.StaticsSolver.TryAddObjectToForgettingQueue(prop.Owner)
-            prop.Clear()
-        
-        self.CalculatedTriggeringProperties.clear()
+        '''
+        Forgets unitop together with its downstream cone (see SequentialSolver.Forget())
+        '''
+        self.Owner.StaticsSolver.Forget(self)
+
+    @abstractmethod
+    def Calculate(self, IsForgetting: bool):
+        pass
+
+    # Size of result cache for unitop type, 0 - results aren't cached (see CalculateCached())
+    ResultCacheSize = 0
+
+    @property
+    def ResultCache(self):
+        cache = self.__dict__.get("_result_cache")
+        if cache is None:
+            cache = self._result_cache = ResultCache(self.ResultCacheSize)
+        return cache
+
+    @property
+    def Properties(self):
+        '''
+        Numerical properties owned by unitop
+        '''
+        properties = self.__dict__.get("_properties")
+        if properties is None:
+            properties = self._properties = [value for value in vars(self).values()
+                                             if isinstance(value, NumericalProperty) and value.Owner is self]
+        return properties
+
+    def GetResultCacheKey(self):
+        '''
+        Key of result cache: quantized values and states of own properties, which aren't calculated by unitop itself,
+        and values of consumed properties of other unitops. Unitops with results depending on other attributes should extend key
+        '''
+        key = [(prop.Tag, prop.PropertyState, Quantize(prop.Value))
+               for prop in self.Properties if prop.CalcBy is not self]
+        store = self.Owner.PropertyStore
+        for index in self.Owner.Dependencies.ConsumedProperties.get(self.Id, ()):
+            key.append((index, store.GetState(index), Quantize(store.GetValue(index))))
+        return tuple(key)
+
+    def CalculateCached(self):
+        '''
+        Solving calculation using result cache: results of previous calculation with the same inputs
+        are restored without calling Calculate()
+        '''
+        if self.ResultCacheSize <= 0:
+            return self.Calculate(False)
+
+        cache = self.ResultCache
+        key = self.GetResultCacheKey()
+        results = cache.Get(key)
+        if results is not None:
+            for prop, value in results:
+                if prop.CalcBy is not self:
+                    prop.Calculate(value, self)
+            self.IsCalculated = True
+            return True
+
+        if self.Calculate(False):
+            results = [(prop, prop.Value) for prop in self.Properties if prop.CalcBy is self]
+            results += [(prop, prop.Value) for prop in self.CalculatedTriggeringProperties.values()
+                        if prop.Owner is not self and prop.CalcBy is self and prop.HasValue]
+            cache.Put(key, results)
+            return True
+        return False
+
+    def ClearResultCache(self):
+        self.ResultCache.Clear()
+
+    def GetLinearRelations(self):
+        '''
+        Linear relations between properties for EquationSolver: list of (coefficients, rhs),
+        meaning sum(coefficient * property value) = rhs. None - unitop can't be solved by EquationSolver
+        '''
+        return None
+
+    def CloneReferences(self, flowsheet : Flowsheet, properties : dict[NumericalProperty, NumericalProperty]):
+        '''
+        Is called for shallow copy of unitop made by Flowsheet.Clone(): rebinds unitop to cloned flowsheet,
+        properties - map of original properties to their copies. Unitops keeping properties in containers should extend it
+        '''
+        self.Owner = flowsheet
+        for name, value in list(vars(self).items()):
+            if isinstance(value, NumericalProperty):
+                setattr(self, name, properties.get(value, value))
+        self.CalculatedTriggeringProperties = {key : properties[prop] for key, prop in self.CalculatedTriggeringProperties.items()}
+        self.__dict__.pop("_result_cache", None)
+        self.__dict__.pop("_properties", None)
+
+    def GetSnapshotArrays(self):
+        '''
+        Additional state of unitop saved by Flowsheet.Save(): dict name -> NumPy array
+        '''
+        return {}
+
+    def SetSnapshotArrays(self, arrays : dict[str, np.ndarray]):
+        '''
+        Restores state returned by GetSnapshotArrays()
+        '''
+        pass
+
+    # Unitop can calculate many scenarios at once (see Flowsheet.Sweep())
+    SupportsArrays = False
+
+    def CalculateArrays(self, values : dict[NumericalProperty, np.ndarray]):
+        '''
+        Vectorized Calculate: values contains array for every property (NaN - unknown value).
+        Fills unknown elements of arrays, returns True if anything was calculated
+        '''
+        return False
+
+    def VariableChangingArray(self, Variable : NumericalProperty, NewValues : np.ndarray):
+        '''
+        Vectorized VariableChanging: mask of values, which can be accepted
+        '''
+        return np.ones(len(NewValues), dtype = bool)
+
+    @abstractmethod 
+    def VariableChanging(self, Variable : NumericalProperty):
+        pass
+
+    @abstractmethod
+    def VariableChanged(self, Variable : NumericalProperty):
+        pass
+
+# My class 
+'''
+class Cell:
+
+    CalcOrder : int
+
+    def __init__(self, name, SimCase: Flowsheet, calcOrder = 500):
+        self.NumberofColums = 5
+         
+        self.ImportedVeriable : NumericalProperty = None
+'''
+
+
+class DummyUnitOp(BaseUnitOp):
+
+    CalcOrder : int
+
+    def __init__(self, name, SimCase: Flowsheet, calcOrder = 500):
+        super().__init__(name, SimCase, calcOrder)
+        self.PressureIn = NumericalProperty("PressureIn", UnitTypeEnum.PRESSURE, self, True, None)
+        self.PressureOut = NumericalProperty("PressureOut", UnitTypeEnum.PRESSURE, self, True, None)
+        self.PressureDrop = NumericalProperty("dP", UnitTypeEnum.DELTA_P, self, True, None)
+        self.TemperatureIn = NumericalProperty("TemperatureIn", UnitTypeEnum.TEMPERATURE, self, True, None)
+        self.TemperatureOut = NumericalProperty("TemperatureOut", UnitTypeEnum.TEMPERATURE, self, True, None)
+        self.TemperatureDrop = NumericalProperty("dT", UnitTypeEnum.DELTA_T, self, True, None)
+        self.pressureFlag = False
+        self.temperatureFlag = False
+        #self.NumberOfRows = NumericalProperty("RowsNumber", UnitTypeEnum.INDEX, self, True, None, 10)
+        #self.NumberOfColumns = NumericalProperty("ColumnsNumber", UnitTypeEnum.INDEX, self, True, None,  10)
+
+
+    def __lt__(self, other):
+        return self.CalcOrder < other.CalcOrder
+    
+
+    def Calculate(self, IsForgetting: bool):
+        self.IsCalculated = False
+
+        if IsForgetting:
+            self.pressureFlag = False
+            self.temperatureFlag = False
+            return True
+
+        # Calculate UnitOp
+        if not self.pressureFlag:
+            self.pressureFlag = self.Balance(self.PressureIn, self.PressureOut, self.PressureDrop) 
+
+        if not self.temperatureFlag:
+            self.temperatureFlag = self.Balance(self.TemperatureIn, self.TemperatureOut, self.TemperatureDrop)
+
+        self.IsCalculated = self.pressureFlag and self.temperatureFlag
+        return self.IsCalculated
+
+
+    def VariableChanging(self, Variable : NumericalProperty):
+
+        if Variable.NewValue < 0 : return False
+        return True
+
+    def GetLinearRelations(self):
+        # larger = smaller + delta
+        return [({self.PressureIn: 1.0, self.PressureOut: -1.0, self.PressureDrop: -1.0}, 0.0),
+                ({self.TemperatureIn: 1.0, self.TemperatureOut: -1.0, self.TemperatureDrop: -1.0}, 0.0)]
+
+    SupportsArrays = True
+
+    def CalculateArrays(self, values : dict[NumericalProperty, np.ndarray]):
+        pressureChanged = self.BalanceArrays(values, self.PressureIn, self.PressureOut, self.PressureDrop)
+        temperatureChanged = self.BalanceArrays(values, self.TemperatureIn, self.TemperatureOut, self.TemperatureDrop)
+        return pressureChanged or temperatureChanged
+
+    def VariableChangingArray(self, Variable : NumericalProperty, NewValues : np.ndarray):
+        return NewValues >= 0
+
+    def VariableChanged(self, Variable : NumericalProperty):
+        pass
+
+    def Balance(self, larger_property : NumericalProperty, smaller_property : NumericalProperty, delta : NumericalProperty):
+        if smaller_property.HasValue and larger_property.HasValue:
+            delta.Calculate(larger_property.Value - smaller_property.Value, self)
+            return True
+        elif smaller_property.HasValue and delta.HasValue:
+            larger_property.Calculate(smaller_property.Value + delta.Value, self)
+            return True
+        elif larger_property.HasValue and delta.HasValue:
+            smaller_property.Calculate(larger_property.Value - delta.Value, self)
+            return True
+        return False
+
+    def BalanceArrays(self, values : dict[NumericalProperty, np.ndarray], larger_property : NumericalProperty, smaller_property : NumericalProperty, delta : NumericalProperty):
+        '''
+        Balance for every scenario: unknown element is calculated from two known ones
+        '''
+        larger, smaller, dP = values[larger_property], values[smaller_property], values[delta]
+        changed = False
+        for prop, target, newValues in ((delta, dP, larger - smaller),
+                                        (larger_property, larger, smaller + dP),
+                                        (smaller_property, smaller, larger - dP)):
+            mask = np.isnan(target) & ~np.isnan(newValues)
+            mask[mask] = self.VariableChangingArray(prop, newValues[mask])
+            if mask.any():
+                target[mask] = newValues[mask]
+                changed = True
+        return changed
+
+
+class Connector(BaseUnitOp):
+    '''
+    Connection between unitops: copies value of source property to target property
+    '''
+    def __init__(self, name, SimCase: Flowsheet, source : NumericalProperty, target : NumericalProperty, calcOrder = 500):
+        super().__init__(name, SimCase, calcOrder)
+        self.Source = source
+        self.Target = target
+        # Torn connector sets guess value to target instead of source value (see RecycleConverger)
+        self.IsTear = False
+        self.Guess = None
+        SimCase.AddConsumer(source, self)
+        SimCase.Dependencies.AddEdge(self, target.Owner)
+
+    def Calculate(self, IsForgetting: bool):
+        self.IsCalculated = False
+
+        if IsForgetting:
+            return True
+
+        if self.IsTear:
+            if self.Guess is not None:
+                self.Target.Calculate(self.Guess, self)
+                self.IsCalculated = True
+        elif self.Source.HasValue:
+            self.Target.Calculate(self.Source.Value, self)
+            self.IsCalculated = True
+        return self.IsCalculated
+
+    def SetGuess(self, value):
+        '''
+        Changes guess of torn connector, connector is forgotten if value is changed
+        '''
+        if self.Guess is not None and Compare(value, self.Guess):
+            return
+        self.Owner.DetachClones()
+        self.Guess = value
+        self.TryAddToCalcQueue(True)
+        self.TriggerSolver()
+
+    def GetLinearRelations(self):
+        return [({self.Target: 1.0, self.Source: -1.0}, 0.0)]
+
+    SupportsArrays = True
+
+    def CalculateArrays(self, values : dict[NumericalProperty, np.ndarray]):
+        target = values[self.Target]
+        mask = np.isnan(target) & ~np.isnan(values[self.Source])
+        mask[mask] = self.Target.Owner.VariableChangingArray(self.Target, values[self.Source][mask])
+        target[mask] = values[self.Source][mask]
+        return bool(mask.any())
+
+    def VariableChanging(self, Variable : NumericalProperty):
+        return True
+
+    def VariableChanged(self, Variable : NumericalProperty):
+        pass
+
+
+# my Spreadsheet 
+class DenseCellStore:
+    '''
+    Data of spreadsheet cells in 2-D arrays growing by capacity doubling: values (float64, NaN - empty or not a number),
+    state codes (CellStateEnum) and handles of imported and exported properties (-1 if none)
+    '''
+    IsSparse = False
+
+    def __init__(self, rows, columns):
+        self.Rows = rows
+        self.Columns = columns
+        self.Values = np.full((rows, columns), np.nan)
+        self.States = np.zeros((rows, columns), dtype = np.int8)
+        self.Imports = np.full((rows, columns), -1, dtype = np.int32)
+        self.Exports = np.full((rows, columns), -1, dtype = np.int32)
+
+    def Resize(self, rows, columns):
+        capacityRows, capacityColumns = self.Values.shape
+        if rows > capacityRows or columns > capacityColumns:
+            capacity = (max(rows, 2 * capacityRows) if rows > capacityRows else capacityRows,
+                        max(columns, 2 * capacityColumns) if columns > capacityColumns else capacityColumns)
+            for name, fill in (("Values", np.nan), ("States", CellStateEnum.EMPTY.value), ("Imports", -1), ("Exports", -1)):
+                old = getattr(self, name)
+                new = np.full(capacity, fill, dtype = old.dtype)
+                new[:self.Rows, :self.Columns] = old[:self.Rows, :self.Columns]
+                setattr(self, name, new)
+
+        # Clear cells outside of table (they must be empty when table grows again)
+        for region in ((slice(rows, self.Rows), slice(None)), (slice(None), slice(columns, self.Columns))):
+            self.Values[region] = np.nan
+            self.States[region] = CellStateEnum.EMPTY.value
+            self.Imports[region] = -1
+            self.Exports[region] = -1
+        self.Rows, self.Columns = rows, columns
+
+    def GetValue(self, row, column):
+        return self.Values.item(row, column)
+
+    def SetValue(self, row, column, value):
+        self.Values[row, column] = value
+
+    def GetState(self, row, column):
+        return self.States.item(row, column)
+
+    def SetState(self, row, column, state):
+        self.States[row, column] = state
+
+    def GetImport(self, row, column):
+        return self.Imports.item(row, column)
+
+    def SetImport(self, row, column, handle):
+        self.Imports[row, column] = handle
+
+    def GetExport(self, row, column):
+        return self.Exports.item(row, column)
+
+    def SetExport(self, row, column, handle):
+        self.Exports[row, column] = handle
+
+    def GetValues(self, first : tuple, last : tuple):
+        return self.Values[first[0]:min(last[0] + 1, self.Rows), first[1]:min(last[1] + 1, self.Columns)]
+
+    def GetRow(self, row):
+        values = self.Values[row, :self.Columns]
+        columns = np.flatnonzero(values == values)
+        return columns, values[columns]
 
-    @abstractmethod
-    def Calculate(self, IsForgetting: bool):
-        pass
+    def GetColumn(self, column):
+        values = self.Values[:self.Rows, column]
+        rows = np.flatnonzero(values == values)
+        return rows, values[rows]
 
-    @abstractmethod 
-    def VariableChanging(self, Variable : NumericalProperty):
-        pass
+    def Count(self):
+        return len(self.GetItems()[0])
 
-    @abstractmethod
-    def VariableChanged(self, Variable : NumericalProperty):
-        pass
+    def GetItems(self):
+        '''
+        Coordinates and data of populated cells: rows, columns, values, states, imports, exports
+        '''
+        values = self.Values[:self.Rows, :self.Columns]
+        states = self.States[:self.Rows, :self.Columns]
+        imports = self.Imports[:self.Rows, :self.Columns]
+        exports = self.Exports[:self.Rows, :self.Columns]
+        rows, columns = np.nonzero((values == values) | (states != CellStateEnum.EMPTY.value) | (imports >= 0) | (exports >= 0))
+        return rows, columns, values[rows, columns], states[rows, columns], imports[rows, columns], exports[rows, columns]
 
-# My class 
-'''
-class Cell:
+    def SetItems(self, rows, columns, values, states, imports, exports):
+        self.Values[rows, columns] = values
+        self.States[rows, columns] = states
+        self.Imports[rows, columns] = imports
+        self.Exports[rows, columns] = exports
 
-    CalcOrder : int
+    def Copy(self):
+        store = copy.copy(self)
+        store.Values = self.Values.copy()
+        store.States = self.States.copy()
+        store.Imports = self.Imports.copy()
+        store.Exports = self.Exports.copy()
+        return store
 
-    def __init__(self, name, SimCase: Flowsheet, calcOrder = 500):
-        self.NumberofColums = 5
-         
-        self.ImportedVeriable : NumericalProperty = None
-'''
 
+class SparseCellStore:
+    '''
+    Data of spreadsheet cells with memory proportional to number of populated cells.
+    Edits go to dictionary of keys {(row, column): [value, state, import, export]}. Rows and ranges are read from
+    CSR layout (row pointers, column indices and values of cells sorted by row), columns - from CSC layout.
+    Layouts are built on first read after cells were added or removed, changed values are written to them in place
+    '''
+    IsSparse = True
+    _Empty = (np.nan, CellStateEnum.EMPTY.value, -1, -1)
 
-class DummyUnitOp(BaseUnitOp):
+    def __init__(self, rows, columns):
+        self.Rows = rows
+        self.Columns = columns
+        self.Cells : dict[tuple, list] = {}
+        self._csr : tuple = None
+        self._csc : tuple = None
 
-    CalcOrder : int
+    def Resize(self, rows, columns):
+        if rows < self.Rows or columns < self.Columns:
+            self.Cells = {coordinates : cell for coordinates, cell in self.Cells.items()
+                          if coordinates[0] < rows and coordinates[1] < columns}
+        self.Rows, self.Columns = rows, columns
+        self._csr = self._csc = None
 
-    def __init__(self, name, SimCase: Flowsheet, calcOrder = 500):
-        super().__init__(name, SimCase, calcOrder)
-        self.PressureIn = NumericalProperty("PressureIn", UnitTypeEnum.PRESSURE, self, True, None)
-        self.PressureOut = NumericalProperty("PressureOut", UnitTypeEnum.PRESSURE, self, True, None)
-        self.PressureDrop = NumericalProperty("dP", UnitTypeEnum.DELTA_P, self, True, None)
-        self.TemperatureIn = NumericalProperty("TemperatureIn", UnitTypeEnum.TEMPERATURE, self, True, None)
-        self.TemperatureOut = NumericalProperty("TemperatureOut", UnitTypeEnum.TEMPERATURE, self, True, None)
-        self.TemperatureDrop = NumericalProperty("dT", UnitTypeEnum.DELTA_T, self, True, None)
-        self.pressureFlag = False
-        self.temperatureFlag = False
-        #self.NumberOfRows = NumericalProperty("RowsNumber", UnitTypeEnum.INDEX, self, True, None, 10)
-        #self.NumberOfColumns = NumericalProperty("ColumnsNumber", UnitTypeEnum.INDEX, self, True, None,  10)
+    def _get(self, row, column, field):
+        cell = self.Cells.get((row, column))
+        return self._Empty[field] if cell is None else cell[field]
 
+    def _set(self, row, column, field, value):
+        coordinates = (row, column)
+        cell = self.Cells.get(coordinates)
+        if cell is None:
+            if value == self._Empty[field] or value != value:
+                return
+            cell = self.Cells[coordinates] = list(self._Empty)
+            self._csr = self._csc = None
+        cell[field] = value
+        if cell[0] != cell[0] and cell[1] == CellStateEnum.EMPTY.value and cell[2] < 0 and cell[3] < 0:
+            del self.Cells[coordinates]
+            self._csr = self._csc = None
+        elif field == 0:
+            for layout, major, minor in ((self._csr, row, column), (self._csc, column, row)):
+                if layout is not None:
+                    pointers, indices, values = layout
+                    start = pointers[major]
+                    values[start + np.searchsorted(indices[start:pointers[major + 1]], minor)] = value
 
-    def __lt__(self, other):
-        return self.CalcOrder < other.CalcOrder
-    
+    def GetValue(self, row, column):
+        return self._get(row, column, 0)
 
-    def Calculate(self, IsForgetting: bool):
-        self.IsCalculated = False
+    def SetValue(self, row, column, value):
+        self._set(row, column, 0, float(value))
 
-        if IsForgetting:
-            self.pressureFlag = False
-            self.temperatureFlag = False
-            return True
+    def GetState(self, row, column):
+        return self._get(row, column, 1)
 
-        # Calculate UnitOp
-        if not self.pressureFlag:
-            self.pressureFlag = self.Balance(self.PressureIn, self.PressureOut, self.PressureDrop) 
+    def SetState(self, row, column, state):
+        self._set(row, column, 1, state)
 
-        if not self.temperatureFlag:
-            self.temperatureFlag = self.Balance(self.TemperatureIn, self.TemperatureOut, self.TemperatureDrop)
+    def GetImport(self, row, column):
+        return self._get(row, column, 2)
 
-        self.IsCalculated = self.pressureFlag and self.temperatureFlag
-        return self.IsCalculated
+    def SetImport(self, row, column, handle):
+        self._set(row, column, 2, handle)
 
+    def GetExport(self, row, column):
+        return self._get(row, column, 3)
 
-    def VariableChanging(self, Variable : NumericalProperty):
+    def SetExport(self, row, column, handle):
+        self._set(row, column, 3, handle)
 
-        if Variable.NewValue < 0 : return False
-        return True
+    def _layout(self, byColumns):
+        layout = self._csc if byColumns else self._csr
+        if layout is None:
+            count = len(self.Cells)
+            coordinates = np.fromiter((index for key in self.Cells for index in key), dtype = np.int64, count = 2 * count).reshape(count, 2)
+            values = np.fromiter((cell[0] for cell in self.Cells.values()), dtype = np.float64, count = count)
+            major, minor = (coordinates[:, 1], coordinates[:, 0]) if byColumns else (coordinates[:, 0], coordinates[:, 1])
+            order = np.lexsort((minor, major))
+            pointers = np.zeros((self.Columns if byColumns else self.Rows) + 1, dtype = np.int64)
+            np.cumsum(np.bincount(major, minlength = len(pointers) - 1), out = pointers[1:])
+            layout = (pointers, minor[order], values[order])
+            if byColumns:
+                self._csc = layout
+            else:
+                self._csr = layout
+        return layout
 
-    def VariableChanged(self, Variable : NumericalProperty):
-        pass
+    def GetValues(self, first : tuple, last : tuple):
+        lastRow, lastColumn = min(last[0], self.Rows - 1), min(last[1], self.Columns - 1)
+        block = np.full((max(lastRow - first[0] + 1, 0), max(lastColumn - first[1] + 1, 0)), np.nan)
+        if block.size == 0:
+            return block
+        pointers, indices, values = self._layout(False)
+        start, end = pointers[first[0]], pointers[lastRow + 1]
+        rows = np.repeat(np.arange(len(block)), np.diff(pointers[first[0]:lastRow + 2]))
+        columns = indices[start:end]
+        inside = (columns >= first[1]) & (columns <= lastColumn)
+        block[rows[inside], columns[inside] - first[1]] = values[start:end][inside]
+        return block
 
-    def Balance(self, larger_property : NumericalProperty, smaller_property : NumericalProperty, delta : NumericalProperty):
-        if smaller_property.HasValue and larger_property.HasValue:
-            delta.Calculate(larger_property.Value - smaller_property.Value, self)
-            return True
-        elif smaller_property.HasValue and delta.HasValue:
-            larger_property.Calculate(smaller_property.Value + delta.Value, self)
-            return True
-        elif larger_property.HasValue and delta.HasValue:
-            smaller_property.Calculate(larger_property.Value - delta.Value, self)
-            return True
-        return False
+    def GetRow(self, row):
+        pointers, indices, values = self._layout(False)
+        start, end = pointers[row], pointers[row + 1]
+        inside = values[start:end] == values[start:end]
+        return indices[start:end][inside], values[start:end][inside]
+
+    def GetColumn(self, column):
+        pointers, indices, values = self._layout(True)
+        start, end = pointers[column], pointers[column + 1]
+        inside = values[start:end] == values[start:end]
+        return indices[start:end][inside], values[start:end][inside]
+
+    def Count(self):
+        return len(self.Cells)
+
+    def GetItems(self):
+        count = len(self.Cells)
+        rows = np.fromiter((key[0] for key in self.Cells), dtype = np.int64, count = count)
+        columns = np.fromiter((key[1] for key in self.Cells), dtype = np.int64, count = count)
+        fields = [np.fromiter((cell[field] for cell in self.Cells.values()), dtype = dtype, count = count)
+                  for field, dtype in enumerate((np.float64, np.int8, np.int32, np.int32))]
+        return (rows, columns, *fields)
+
+    def SetItems(self, rows, columns, values, states, imports, exports):
+        for item in zip(rows.tolist(), columns.tolist(), values.tolist(), states.tolist(), imports.tolist(), exports.tolist()):
+            self.Cells[item[:2]] = list(item[2:])
+        self._csr = self._csc = None
+
+    def Copy(self):
+        store = SparseCellStore(self.Rows, self.Columns)
+        store.Cells = {coordinates : list(cell) for coordinates, cell in self.Cells.items()}
+        return store
 
 
-# my Spreadsheet 
 class Spreadsheet(BaseUnitOp):
+    '''
+    Table of cells: constants, formulas and values imported from properties of flowsheet.
+    Values of cells can be exported to properties. Spreadsheet is solved as a unitop: it consumes imported properties
+    and calculates exported ones. Cells depending on each other form dependency graph, so only cells affected by changes
+    are recalculated in topological order (see Recalculate()).
+    Data of cells is kept in Store: typed arrays of DenseCellStore or SparseCellStore for huge and mostly empty tables.
+    Store is switched automatically by size of table and fraction of populated cells (see SelectStore()).
+    Cell objects are light views created on access (see Table), only cells with formulas are kept
+    '''
+    # Tables with at least SparseMinimumSize cells are sparse while less than SparseFillRatio of cells are populated,
+    # they become dense when more than DenseFillRatio of cells are populated
+    SparseMinimumSize = 100000
+    SparseFillRatio = 0.01
+    DenseFillRatio = 0.05
     
     def __init__(self, y, x, name, SimCase: Flowsheet):
         super().__init__(name, SimCase, calcOrder = 500)
+        # Graph of cells: formula cell -> input cells, cell -> formula cells using it
+        self._precedents : dict[tuple, list[tuple]] = {}
+        self._dependents : dict[tuple, set[tuple]] = {}
+        # Cells changed since last recalculation and formula cells with changed text
+        self._dirty : set[tuple] = set()
+        self._relink : set[tuple] = set()
+        # Cells linked to properties
+        self._imports : set[tuple] = set()
+        self._exports : set[tuple] = set()
+        # Cells with formulas and values, which are not float point numbers (text, errors of formulas)
+        self._cells : dict[tuple, Cell] = {}
+        self._objects : dict[tuple, object] = {}
+        # Cells with errors of formulas (XlError), range functions look for errors of their ranges in them
+        self._errors : set[tuple] = set()
+        # Values of cells before their changes since last recalculation: (float value, is error of formula).
+        # They are used to update running aggregates of range functions (see RangeFunction)
+        self._changes : dict[tuple, tuple] = {}
+
+        self.Store = (SparseCellStore if y * x >= self.SparseMinimumSize else DenseCellStore)(y, x)
+        self.Table = CellTable(self)
+
         #self.NumberOfRows : NumericalProperty = x
         self.x = x
         self.y = y
-        self.Table = np.empty(shape=(self.y, self.x), dtype =  Cell )
-        for i in range(y):
-            for j in range (x):
-                self.Table[i][j] = Cell("TestCell")
-        
         # для ф измен. разм.
         self.NumberOfRows_y = y
         self.NumberOfColums_x = x
@@ -586,18 +3599,7 @@ class Spreadsheet(BaseUnitOp):
     # def for change size of rows
     def NumberOfRows (self, send):
         if type(round(send)) == int and send > 0:
-            new  =  int(send)
-
-            #how we change size
-            self.Table.resize((new, self.NumberOfColums_x),  refcheck= False)
-            
-            # filling in new part class Cells
-            if new > self.NumberOfRows_y:
-                for i in range(self.NumberOfRows_y - 1, new):
-                    for j in range (self.NumberOfColums_x):
-                        self.Table[i][j] =  Cell("TestCell")
-            
-            self.NumberOfRows_y = new
+            self.Resize(int(send), self.NumberOfColums_x)
             return True
         else:
             print("Wrong tipe!")
@@ -605,41 +3607,771 @@ class Spreadsheet(BaseUnitOp):
        
     # def for change size of colums
     def NumberOfColums (self, send):
-
         if type(round(send)) == int and send > 0:
-            new  =  int(send)
-            if new < self.NumberOfRows_y:
+            self.Resize(self.NumberOfRows_y, int(send))
+            return True
+        else:
+            print("Wrong tipe!")
+            return False
 
-                #How do we reduce the size of the table (axis = 0  -  строка  1  столбец )//np.delete(self.Table,1,axis = 1) -  УДОЛЯЕТ 1 СТОЛБЕЦ 
-                self.Table  = self.Table[:, :-(self.NumberOfRows_y - new)]
-                #self.Table = np.delete(self.Table, self.NumberOfRows_y - new ,axis = 1) 
-            else:
+    def Resize(self, rows, columns):
+        '''
+        Changes size of table. Arrays of dense store grow by capacity doubling, cells outside of new size are cleared
+        '''
+        self.Owner.DetachClones()
+        inside = lambda coordinates: coordinates[0] < rows and coordinates[1] < columns
+        removedExports = [self.Store.GetExport(*coordinates) for coordinates in self._exports if not inside(coordinates)]
+        self.Store.Resize(rows, columns)
+        self._cells = {coordinates : cell for coordinates, cell in self._cells.items() if inside(coordinates)}
+        self._objects = {coordinates : value for coordinates, value in self._objects.items() if inside(coordinates)}
+        self._errors = {coordinates for coordinates in self._errors if inside(coordinates)}
 
-                #How do we increase the size of the table
-                self.Table = np.append(self.Table, np.zeros([len(self.Table), (new - self.NumberOfRows_y)]),1)
-                
-                # filling in new part class Cells
-                for i in range(self.NumberOfRows_y):
-                    for j in range(self.NumberOfColums_x - 1, new):
-                        self.Table[i][j] =  Cell("TestCell")  
+        self.y, self.x = self.NumberOfRows_y, self.NumberOfColums_x = rows, columns
+        self.SelectStore()
+        self.RebuildGraph()
+        if removedExports:
+            self._remove_export_edges(removedExports)
 
-            self.NumberOfColums_x = new
-            return True
+    @property
+    def IsSparse(self):
+        return self.Store.IsSparse
+
+    def SelectStore(self):
+        '''
+        Switches store of cells between dense and sparse by size of table and fraction of populated cells.
+        Returns True if store was switched
+        '''
+        size = self.NumberOfRows_y * self.NumberOfColums_x
+        count = self.Store.Count()
+        if self.Store.IsSparse:
+            sparse = size >= self.SparseMinimumSize and count <= self.DenseFillRatio * size
         else:
-            print("Wrong tipe!")
+            sparse = size >= self.SparseMinimumSize and count < self.SparseFillRatio * size
+        if sparse == self.Store.IsSparse:
             return False
-       
+        store = (SparseCellStore if sparse else DenseCellStore)(self.NumberOfRows_y, self.NumberOfColums_x)
+        store.SetItems(*self.Store.GetItems())
+        self.Store = store
+        return True
+
+    def GetCell(self, row, column):
+        '''
+        Cell object of table, it is created on access (cells with formulas are kept)
+        '''
+        if not (0 <= row < self.NumberOfRows_y and 0 <= column < self.NumberOfColums_x):
+            raise IndexError(f"Spreadsheet error! Cell ({row}, {column}) is out of table {self.Name}")
+        cell = self._cells.get((row, column))
+        if cell is None:
+            cell = Cell("TestCell")
+            cell.Sheet = self
+            cell.Row = row
+            cell.Column = column
+        return cell
+
+    def Calculate(self, IsForgetting: bool):
+        self.IsCalculated = False
+
+        if IsForgetting:
+            return True
+
+        # Imported values changed since last calculation
+        properties = self.Owner.PropertyStore.Properties
+        missing = []
+        for coordinates in self._imports:
+            value = properties[self.Store.GetImport(*coordinates)].Value
+            if value is None:
+                missing.append(coordinates)
+            old = self.Store.GetValue(*coordinates)
+            if (value is None) != (old != old) or (value is not None and value != old):
+                self._record(*coordinates)
+                self.Store.SetValue(*coordinates, np.nan if value is None else value)
+                self._dirty.add(coordinates)
+
+        self.Recalculate()
+
+        # Cells depending on imported properties without values aren't exported: spreadsheet is under-specified
+        # and stays in solving queue like other unitops
+        blocked = self._downstream(missing) & self._exports
+        for coordinates in self._exports - blocked:
+            value = self.GetCellValue(*coordinates)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                properties[self.Store.GetExport(*coordinates)].Calculate(float(value), self)
+
+        self.IsCalculated = not blocked
+        return self.IsCalculated
+
+    def VariableChanging(self, Variable : NumericalProperty):
+        return True
+
+    def VariableChanged(self, Variable : NumericalProperty):
+        pass
+
+    def SetCellValue(self, row, column, value):
+        '''
+        Sets constant value of cell (None - empty cell)
+        '''
+        self.Owner.DetachClones()
+        self._set_value(row, column, value)
+        if self.Store.GetState(row, column) in (CellStateEnum.EMPTY.value, CellStateEnum.CONSTANT.value):
+            self.Store.SetState(row, column, (CellStateEnum.EMPTY if value is None else CellStateEnum.CONSTANT).value)
+        self.CellChanged(row, column)
+
+    def SetFormula(self, row, column, text : str):
+        cell = self.GetCell(row, column)
+        if text == cell._formula:
+            return
+        self.Owner.DetachClones()
+        cell._formula = text
+        cell._function = None
+        cell._inputs = None
+        if text is None:
+            self._cells.pop((row, column), None)
+            if self.Store.GetState(row, column) == CellStateEnum.FORMULA.value:
+                self.Store.SetState(row, column, CellStateEnum.EMPTY.value)
+        else:
+            self._cells[(row, column)] = cell
+            if self.Store.GetImport(row, column) < 0:
+                self.Store.SetState(row, column, CellStateEnum.FORMULA.value)
+        self.CellChanged(row, column, isFormula = True)
+
+    def SetImport(self, row, column, prop : NumericalProperty):
+        '''
+        Links cell to property: value of property is imported to cell (None - removes link)
+        '''
+        self.Owner.DetachClones()
+        if prop is None:
+            self.Store.SetImport(row, column, -1)
+            self._imports.discard((row, column))
+            self.Store.SetState(row, column, (CellStateEnum.FORMULA if (row, column) in self._cells else CellStateEnum.EMPTY).value)
+            self._record(row, column)
+            self.Store.SetValue(row, column, np.nan)
+        else:
+            self._check_property(prop)
+            self.Store.SetImport(row, column, prop._index)
+            self._imports.add((row, column))
+            self.Store.SetState(row, column, CellStateEnum.IMPORTED.value)
+            self._record(row, column)
+            self.Store.SetValue(row, column, np.nan)
+            self.Owner.AddConsumer(prop, self)
+        self.CellChanged(row, column)
+
+    def SetExport(self, row, column, prop : NumericalProperty):
+        '''
+        Links cell to property: value of cell is calculated to property (None - removes link)
+        '''
+        self.Owner.DetachClones()
+        old = self.Store.GetExport(row, column)
+        if prop is None:
+            self.Store.SetExport(row, column, -1)
+            self._exports.discard((row, column))
+        else:
+            self._check_property(prop)
+            self.Store.SetExport(row, column, prop._index)
+            self._exports.add((row, column))
+            # Spreadsheet calculates property of its owner
+            self.Owner.Dependencies.AddEdge(self, prop.Owner)
+        if old >= 0 and (prop is None or prop._index != old):
+            self._remove_export_edges([old])
+        self.CellChanged(row, column)
+
+    def _remove_export_edges(self, handles):
+        # Edge to owner of property, which isn't exported anymore, is kept while other cells are exported to it
+        properties = self.Owner.PropertyStore.Properties
+        owners = {properties[handle].Owner for handle in handles}
+        owners.difference_update(properties[self.Store.GetExport(*coordinates)].Owner for coordinates in self._exports)
+        for owner in owners:
+            self.Owner.Dependencies.RemoveEdge(self, owner)
+
+    def _check_property(self, prop : NumericalProperty):
+        if prop._store is not self.Owner.PropertyStore:
+            raise Exception(f"Spreadsheet error! Property {prop.Tag} doesn't belong to flowsheet of spreadsheet {self.Name}")
+
+    def CellChanged(self, row, column, isFormula = False):
+        '''
+        Cell is marked for recalculation and spreadsheet is forgotten to be solved again
+        '''
+        if isFormula:
+            self._relink.add((row, column))
+        self._dirty.add((row, column))
+        if self.Store.IsSparse and self.Store.Count() > self.DenseFillRatio * self.NumberOfRows_y * self.NumberOfColums_x:
+            self.SelectStore()
+        self.TryAddToCalcQueue(True)
+        self.TriggerSolver()
+
+    def RebuildGraph(self):
+        '''
+        Rebuilds graph of cells after structure of table was changed, all formulas are recalculated
+        '''
+        self._precedents.clear()
+        self._dependents.clear()
+        self._changes = {}
+        self._relink = set(self._cells)
+        self._dirty = {coordinates for coordinates in self._dirty
+                       if coordinates[0] < self.NumberOfRows_y and coordinates[1] < self.NumberOfColums_x} | self._relink
+        self._imports = {coordinates for coordinates in self._imports if self.Store.GetImport(*coordinates) >= 0}
+        self._exports = {coordinates for coordinates in self._exports if self.Store.GetExport(*coordinates) >= 0}
+
+    def _link(self, coordinates):
+        # Replaces edges of formula cell by edges to inputs of its current formula
+        for input in self._precedents.pop(coordinates, ()):
+            dependents = self._dependents.get(input)
+            if dependents is not None:
+                dependents.discard(coordinates)
+        cell = self._cells.get(coordinates)
+        if cell is None:
+            return
+        function, inputs = cell.Compile()
+        if isinstance(function, RangeFunction):
+            function.Reset()
+        precedents = [(r, c) for first, last in inputs
+                      for r in range(first[0], min(last[0], self.NumberOfRows_y - 1) + 1)
+                      for c in range(first[1], min(last[1], self.NumberOfColums_x - 1) + 1)]
+        self._precedents[coordinates] = precedents
+        for input in precedents:
+            self._dependents.setdefault(input, set()).add(coordinates)
+
+    def _downstream(self, cells):
+        # Cells and all cells depending on them
+        affected = set(cells)
+        stack = list(cells)
+        while stack:
+            for dependent in self._dependents.get(stack.pop(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    stack.append(dependent)
+        return affected
+
+    def Recalculate(self):
+        '''
+        Evaluates formulas of changed cells and of cells depending on them in topological order.
+        Raises exception if formulas have circular references. Returns number of evaluated formulas
+        '''
+        for coordinates in self._relink:
+            self._link(coordinates)
+        self._relink.clear()
+
+        # Values of imported cells are read from store by range functions
+        properties = self.Owner.PropertyStore.Properties
+        for coordinates in self._dirty & self._imports:
+            value = properties[self.Store.GetImport(*coordinates)].Value
+            value = np.nan if value is None else value
+            old = self.Store.GetValue(*coordinates)
+            if value != old and (value == value or old == old):
+                self._record(*coordinates)
+                self.Store.SetValue(*coordinates, value)
+
+        # Changed cells and everything downstream
+        affected = self._downstream(self._dirty)
+
+        # Kahn algorithm inside affected part of graph. Indegrees are counted by edges going out of affected cells,
+        # so formula with large range costs only changed cells of range
+        indegrees = dict.fromkeys(affected, 0)
+        for coordinates in affected:
+            for dependent in self._dependents.get(coordinates, ()):
+                indegrees[dependent] += 1
+        ready = [coordinates for coordinates, indegree in indegrees.items() if indegree == 0]
+        processed = 0
+        evaluated = 0
+        completed = False
+        try:
+            while ready:
+                coordinates = ready.pop()
+                processed += 1
+                if coordinates in self._cells:
+                    self.EvaluateCell(*coordinates)
+                    evaluated += 1
+                for dependent in self._dependents.get(coordinates, ()):
+                    indegrees[dependent] -= 1
+                    if indegrees[dependent] == 0:
+                        ready.append(dependent)
+
+            if processed < len(affected):
+                cycle = sorted(coordinates for coordinates, indegree in indegrees.items() if indegree > 0)
+                raise Exception(f"Spreadsheet error! Circular reference in formulas of cells {', '.join(CellName(*coordinates) for coordinates in cycle[:10])}")
+            completed = True
+        finally:
+            self._changes = {}
+            if not completed:
+                # Running aggregates may have missed changes, they are calculated again by next evaluation
+                for cell in self._cells.values():
+                    if isinstance(cell._function, RangeFunction):
+                        cell._function.Reset()
+        self._dirty.clear()
+        return evaluated
+
+    def Evaluate(self):
+        '''
+        Evaluates all formulas of table (see Recalculate()).
+        Formulas are compiled once (see Cell.Compile()), so parser isn't used for unchanged formulas
+        '''
+        self.Owner.DetachClones()
+        for cell in self._cells.values():
+            if isinstance(cell._function, RangeFunction):
+                cell._function.Reset()
+        self._dirty.update(self._cells)
+        self._dirty.update(self._imports)
+        return self.Recalculate()
+
+    def CloneReferences(self, flowsheet : Flowsheet, properties : dict[NumericalProperty, NumericalProperty]):
+        # Handles of imported and exported properties are the same in clone
+        super().CloneReferences(flowsheet, properties)
+        self.Store = self.Store.Copy()
+        self.Table = CellTable(self)
+        self._cells = {coordinates : copy.copy(cell) for coordinates, cell in self._cells.items()}
+        for cell in self._cells.values():
+            cell.Sheet = self
+            if isinstance(cell._function, RangeFunction):
+                cell._function = copy.copy(cell._function)
+        self._objects = dict(self._objects)
+        self._errors = set(self._errors)
+        self._precedents = {}
+        self._dependents = {}
+        self._dirty = set(self._dirty)
+        self.RebuildGraph()
+
+    def GetSnapshotArrays(self):
+        # Populated cells are saved by coordinates, so size of snapshot doesn't depend on size of table
+        rows, columns, values, states, imports, exports = self.Store.GetItems()
+        coordinates = sorted(self._cells)
+        # Values, which aren't numbers, are saved as text with kind of value (see _object_kind()), so snapshot is loaded without pickle
+        objects = sorted(self._objects)
+        return {"Shape": np.array([self.NumberOfRows_y, self.NumberOfColums_x], dtype = np.int64),
+                "Rows": rows, "Columns": columns, "Values": values, "States": states, "Imports": imports, "Exports": exports,
+                "FormulaCells": np.array(coordinates, dtype = np.int64).reshape(-1, 2),
+                "Formulas": np.array([self._cells[cell]._formula for cell in coordinates], dtype = str),
+                "ObjectCells": np.array(objects, dtype = np.int64).reshape(-1, 2),
+                "Objects": np.array([str(self._objects[cell]) for cell in objects], dtype = str),
+                "ObjectKinds": np.array([self._object_kind(self._objects[cell]) for cell in objects], dtype = np.int8)}
+
+    @staticmethod
+    def _object_kind(value):
+        # Kind of value, which isn't a number: 0 - text, 1 - error of formula (XlError), 2 - boolean
+        if isinstance(value, (bool, np.bool_)):
+            return 2
+        return 1 if formulas is not None and isinstance(value, formulas.XlError) else 0
+
+    def SetSnapshotArrays(self, arrays : dict[str, np.ndarray]):
+        rows, columns = arrays["Shape"].tolist()
+        self._cells = {}
+        self._objects = {}
+        self._errors = set()
+        self.y, self.x = self.NumberOfRows_y, self.NumberOfColums_x = rows, columns
+        self.Store = (SparseCellStore if rows * columns >= self.SparseMinimumSize else DenseCellStore)(rows, columns)
+        items = [np.asarray(arrays[name]) for name in ("Rows", "Columns", "Values", "States", "Imports", "Exports")]
+        self.Store.SetItems(*items)
+        self.SelectStore()
+        self._imports = set(zip(items[0][items[4] >= 0].tolist(), items[1][items[4] >= 0].tolist()))
+        self._exports = set(zip(items[0][items[5] >= 0].tolist(), items[1][items[5] >= 0].tolist()))
+        for (row, column), text in zip(arrays["FormulaCells"].tolist(), arrays["Formulas"].tolist()):
+            cell = self.GetCell(row, column)
+            cell._formula = text
+            self._cells[(row, column)] = cell
+        if "ObjectCells" in arrays:
+            for (row, column), text, kind in zip(arrays["ObjectCells"].tolist(), arrays["Objects"].tolist(), arrays["ObjectKinds"].tolist()):
+                self._objects[(row, column)] = (text, FormulaErrors.get(text, text), text == "True")[kind]
+                if kind == 1:
+                    self._errors.add((row, column))
+        self.RebuildGraph()
+        # Consumers and edges to owners of exported properties aren't saved in snapshot: spreadsheet is solved again
+        # when imported properties are changed and before unitops using exported properties
+        properties = self.Owner.PropertyStore.Properties
+        for coordinates in self._imports:
+            self.Owner.AddConsumer(properties[self.Store.GetImport(*coordinates)], self)
+        for coordinates in self._exports:
+            self.Owner.Dependencies.AddEdge(self, properties[self.Store.GetExport(*coordinates)].Owner)
+
+    def GetCellValue(self, row, column):
+        '''
+        Value of cell: value of imported property, result of formula or constant
+        '''
+        handle = self.Store.GetImport(row, column)
+        if handle >= 0:
+            return self.Owner.PropertyStore.Properties[handle].Value
+        return self._get_value(row, column)
+
+    def _get_value(self, row, column):
+        value = self.Store.GetValue(row, column)
+        if value != value:
+            return self._objects.get((row, column))
+        return float(value)
+
+    def _record(self, row, column):
+        coordinates = (row, column)
+        if coordinates not in self._changes:
+            self._changes[coordinates] = (self.Store.GetValue(row, column), coordinates in self._errors)
+
+    def _set_value(self, row, column, value):
+        self._record(row, column)
+        if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+            self.Store.SetValue(row, column, value)
+            self._objects.pop((row, column), None)
+            self._errors.discard((row, column))
+        else:
+            self.Store.SetValue(row, column, np.nan)
+            if value is None:
+                self._objects.pop((row, column), None)
+            else:
+                self._objects[(row, column)] = value
+            if self._object_kind(value) == 1:
+                self._errors.add((row, column))
+            else:
+                self._errors.discard((row, column))
+
+    def GetValues(self, first : tuple, last : tuple):
+        '''
+        Array of float values of cells from first to last cell (inclusive), NaN - empty cells and not numbers.
+        Array may be a view of store, it must not be changed
+        '''
+        return self.Store.GetValues(first, last)
+
+    def GetRow(self, row):
+        '''
+        Column indices and values of cells of row having float values
+        '''
+        return self.Store.GetRow(row)
+
+    def GetColumn(self, column):
+        '''
+        Row indices and values of cells of column having float values
+        '''
+        return self.Store.GetColumn(column)
+
+    def EvaluateCell(self, row, column):
+        '''
+        Evaluates formula of cell using current values of its inputs. References are passed as 2D arrays
+        and blank cells as BlankValue like in library formulas, so functions skip blanks as Excel does (AVERAGE, COUNT)
+        '''
+        cell = self._cells[(row, column)]
+        function, inputs = cell.Compile()
+        if isinstance(function, RangeFunction):
+            result = function.Evaluate(self, self._changes)
+        else:
+            arguments = []
+            for first, last in inputs:
+                arguments.append(np.array([[self._get_input(r, c) for c in range(first[1], last[1] + 1)]
+                                           for r in range(first[0], last[0] + 1)], dtype = object))
+            result = function(*arguments)
+            if isinstance(result, np.ndarray) and result.size == 1:
+                result = result.item()
+            if result is BlankValue:
+                # Reference to blank cell is zero
+                result = 0.0
+        self._set_value(row, column, result)
+        return result
+
+    def _get_input(self, row, column):
+        if row >= self.NumberOfRows_y or column >= self.NumberOfColums_x:
+            return BlankValue
+        value = self.GetCellValue(row, column)
+        return BlankValue if value is None else value
+
+
+class CellTable:
+    '''
+    Access to cells of spreadsheet as Table[row][column] or Table[row, column], cells are created on access
+    '''
+    __slots__ = ("Sheet",)
+
+    def __init__(self, sheet : Spreadsheet):
+        self.Sheet = sheet
+
+    @property
+    def shape(self):
+        return (self.Sheet.NumberOfRows_y, self.Sheet.NumberOfColums_x)
+
+    def __len__(self):
+        return self.Sheet.NumberOfRows_y
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.Sheet.GetCell(*key)
+        if not 0 <= key < self.Sheet.NumberOfRows_y:
+            raise IndexError(f"Spreadsheet error! Row {key} is out of table {self.Sheet.Name}")
+        return CellRow(self.Sheet, key)
+
+    def __repr__(self):
+        return f"CellTable({self.Sheet.Name}, {self.Sheet.NumberOfRows_y}x{self.Sheet.NumberOfColums_x})"
+
+
+class CellRow:
+    __slots__ = ("Sheet", "Row")
+
+    def __init__(self, sheet : Spreadsheet, row):
+        self.Sheet = sheet
+        self.Row = row
+
+    def __len__(self):
+        return self.Sheet.NumberOfColums_x
+
+    def __getitem__(self, column):
+        return self.Sheet.GetCell(self.Row, column)
+
+
+def ParseCellReference(reference : str):
+    '''
+    Coordinates (row, column) of cell by its name ("B3" -> (2, 1)), range gives coordinates of first and last cell
+    '''
+    match = re.fullmatch(r"\$?([A-Za-z]+)\$?(\d+)(?::\$?([A-Za-z]+)\$?(\d+))?", reference)
+    if match is None:
+        raise Exception(f"Spreadsheet error! Wrong cell reference {reference}")
+    first = (int(match.group(2)) - 1, ColumnIndex(match.group(1)))
+    if match.group(3) is None:
+        return first, first
+    last = (int(match.group(4)) - 1, ColumnIndex(match.group(3)))
+    return (min(first[0], last[0]), min(first[1], last[1])), (max(first[0], last[0]), max(first[1], last[1]))
+
+def ColumnIndex(letters : str):
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+def CellName(row, column):
+    letters = ""
+    column += 1
+    while column > 0:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return f"{letters}{row + 1}"
+
+
+class RangeFunction:
+    '''
+    Formula reducing references to cells: SUM, AVERAGE, MIN, MAX or SUMPRODUCT.
+    It is evaluated as NumPy reduction of values of cells (see Spreadsheet.GetValues()) with the same rules as Excel
+    and library formulas: blank cells and text are ignored (AVERAGE is divided by number of numbers, MIN/MAX of range
+    without numbers is zero, both are zeros in SUMPRODUCT), the first error of references is the result.
+    Running aggregate (with counts of numbers and errors) is kept between evaluations and updated by changed cells only,
+    so change of one cell of large range costs O(1). Whole ranges are reduced again after Reset(), when change of MIN/MAX
+    can't be applied and after number of updates exceeds size of ranges (to bound rounding errors of running sum)
+    '''
+    _Pattern = re.compile(r"=\s*(SUM|AVERAGE|MIN|MAX|SUMPRODUCT)\s*\(([^()]*)\)", re.IGNORECASE)
+
+    def __init__(self, name : str, inputs : list[tuple]):
+        self.Name = name
+        self.Inputs = inputs
+        self.Shapes = [(last[0] - first[0] + 1, last[1] - first[1] + 1) for first, last in inputs]
+        self.Size = sum(rows * columns for rows, columns in self.Shapes)
+        self.Reset()
+
+    @staticmethod
+    def Parse(text : str):
+        '''
+        Range function of formula text or None if formula isn't a range function
+        '''
+        match = RangeFunction._Pattern.fullmatch(text.strip())
+        if match is None:
+            return None
+        try:
+            inputs = [ParseCellReference(argument.strip()) for argument in match.group(2).split(",")]
+        except Exception:
+            return None
+        function = RangeFunction(match.group(1).upper(), inputs)
+        if function.Name == "SUMPRODUCT" and len(set(function.Shapes)) > 1:
+            return None
+        return function
+
+    def Reset(self):
+        # Aggregate: sum (of products), number of numbers, minimum/maximum of numbers and number of errors. None - not calculated
+        self.Sum = None
+        self.Count = 0
+        self.Extreme = np.nan
+        self.Errors = 0
+        self.Updates = 0
+
+    def Evaluate(self, sheet : Spreadsheet, changes : dict[tuple, tuple]):
+        '''
+        Value of function. Changes are values of cells before their changes since last evaluation
+        '''
+        if self.Sum is None or self.Updates > self.Size or len(changes) > self.Size or not self._update(sheet, changes):
+            self._reduce(sheet)
+        if self.Errors > 0:
+            # The first error of references is the result
+            for index in range(len(self.Inputs)):
+                errors = [coordinates for coordinates in sheet._errors if self._contains(index, coordinates)]
+                if errors:
+                    return sheet._objects[min(errors)]
+
+        if self.Name == "AVERAGE":
+            if self.Count == 0:
+                return formulas.DIV if formulas is not None else "#DIV/0!"
+            return self.Sum / self.Count
+        if self.Name in ("MIN", "MAX"):
+            return 0.0 if self.Extreme != self.Extreme else self.Extreme
+        return self.Sum
+
+    def _contains(self, index, coordinates):
+        first, last = self.Inputs[index]
+        return first[0] <= coordinates[0] <= last[0] and first[1] <= coordinates[1] <= last[1]
+
+    def _multiplicity(self, coordinates):
+        # Number of references containing cell
+        return sum(1 for index in range(len(self.Inputs)) if self._contains(index, coordinates))
+
+    def _block(self, sheet : Spreadsheet, index):
+        # Values of reference: NaN - blank cells, cells out of table and not numbers
+        first, last = self.Inputs[index]
+        block = np.full(self.Shapes[index], np.nan)
+        values = sheet.GetValues(first, last)
+        block[:values.shape[0], :values.shape[1]] = values
+        return block
+
+    def _reduce(self, sheet : Spreadsheet):
+        blocks = [self._block(sheet, index) for index in range(len(self.Inputs))]
+        if self.Name == "SUMPRODUCT":
+            self.Sum = float(np.sum(np.prod([np.nan_to_num(block, nan = 0.0) for block in blocks], axis = 0)))
+        else:
+            self.Sum = float(sum(np.nansum(block) for block in blocks))
+            self.Count = int(sum(np.count_nonzero(block == block) for block in blocks))
+            reduce = np.fmin.reduce if self.Name == "MIN" else np.fmax.reduce
+            self.Extreme = float(reduce([reduce(block, axis = None) for block in blocks if block.size > 0]))
+        self.Errors = sum(self._multiplicity(coordinates) for coordinates in sheet._errors)
+        self.Updates = 0
+
+    def _update(self, sheet : Spreadsheet, changes : dict[tuple, tuple]):
+        # Applies changed cells to running aggregate, returns False if whole ranges must be reduced again
+        if self.Name == "SUMPRODUCT":
+            # Term of each changed position of ranges is replaced
+            positions = {(coordinates[0] - first[0], coordinates[1] - first[1])
+                         for coordinates in changes for index, (first, last) in enumerate(self.Inputs) if self._contains(index, coordinates)}
+            for position in positions:
+                old = new = 1.0
+                for first, _ in self.Inputs:
+                    coordinates = (first[0] + position[0], first[1] + position[1])
+                    value = sheet.Store.GetValue(*coordinates) \
+                        if coordinates[0] < sheet.NumberOfRows_y and coordinates[1] < sheet.NumberOfColums_x else 0.0
+                    new *= 0.0 if value != value else value
+                    value = changes[coordinates][0] if coordinates in changes else value
+                    old *= 0.0 if value != value else value
+                self.Sum += new - old
+            for coordinates, (_, wasError) in changes.items():
+                self.Errors += self._multiplicity(coordinates) * ((coordinates in sheet._errors) - wasError)
+            self.Updates += len(positions)
+            return True
+
+        for coordinates, (old, wasError) in changes.items():
+            multiplicity = self._multiplicity(coordinates)
+            if multiplicity == 0:
+                continue
+            new = sheet.Store.GetValue(*coordinates)
+            self.Sum += multiplicity * ((0.0 if new != new else new) - (0.0 if old != old else old))
+            self.Count += multiplicity * ((new == new) - (old == old))
+            self.Errors += multiplicity * ((coordinates in sheet._errors) - wasError)
+            if self.Name in ("MIN", "MAX"):
+                better = (lambda a, b: a < b) if self.Name == "MIN" else (lambda a, b: a > b)
+                if old == self.Extreme and not (new == new and not better(old, new)):
+                    return False
+                if new == new and (self.Extreme != self.Extreme or better(new, self.Extreme)):
+                    self.Extreme = new
+            self.Updates += 1
+        return True
+
+
 class Cell:
+    '''
+    Cell of spreadsheet. Cell of table is a view: its data is kept in arrays of spreadsheet (see Spreadsheet.GetCell()),
+    cell without spreadsheet keeps data itself
+    '''
+    __slots__ = ("CalcOder", "Sheet", "Row", "Column", "_value", "_imported", "_exported", "_formula", "_function", "_inputs")
+
     def __init__(self, name, calcOrder = 500):
-        self.ImportedVariable : NumericalProperty = None
-        self.ExportVariable : NumericalProperty = None
         self.CalcOder = calcOrder
+        # Spreadsheet keeping data of cell
+        self.Sheet : Spreadsheet = None
+        self.Row = 0
+        self.Column = 0
+        self._value = None
+        self._imported : NumericalProperty = None
+        self._exported : NumericalProperty = None
+        self._formula : str = None
+        # Compiled formula and coordinates of its inputs (see Compile())
+        self._function = None
+        self._inputs : list[tuple] = None
+
+    @property
+    def ImportedVariable(self):
+        if self.Sheet is None:
+            return self._imported
+        handle = self.Sheet.Store.GetImport(self.Row, self.Column)
+        return None if handle < 0 else self.Sheet.Owner.PropertyStore.Properties[handle]
+
+    @ImportedVariable.setter
+    def ImportedVariable(self, prop : NumericalProperty):
+        if self.Sheet is None:
+            self._imported = prop
+        else:
+            self.Sheet.SetImport(self.Row, self.Column, prop)
+
+    @property
+    def ExportVariable(self):
+        if self.Sheet is None:
+            return self._exported
+        handle = self.Sheet.Store.GetExport(self.Row, self.Column)
+        return None if handle < 0 else self.Sheet.Owner.PropertyStore.Properties[handle]
+
+    @ExportVariable.setter
+    def ExportVariable(self, prop : NumericalProperty):
+        if self.Sheet is None:
+            self._exported = prop
+        else:
+            self.Sheet.SetExport(self.Row, self.Column, prop)
+
+    @property
+    def Value(self):
+        '''
+        Constant, result of formula or last used value of imported property
+        '''
+        if self.Sheet is None:
+            return self._value
+        return self.Sheet._get_value(self.Row, self.Column)
+
+    @Value.setter
+    def Value(self, value):
+        if self.Sheet is None:
+            self._value = value
+        else:
+            self.Sheet.SetCellValue(self.Row, self.Column, value)
+
+    @property
+    def Formula(self):
+        return self._formula
+
+    @Formula.setter
+    def Formula(self, text : str):
+        if self.Sheet is not None:
+            self.Sheet.SetFormula(self.Row, self.Column, text)
+        elif text != self._formula:
+            self._formula = text
+            self._function = None
+            self._inputs = None
+
+    def Compile(self):
+        '''
+        Compiled formula and list of its inputs as (first cell, last cell) coordinates.
+        Formula is parsed only once, it is compiled again only after its text is changed.
+        Range functions (SUM, AVERAGE, MIN, MAX, SUMPRODUCT of references) are evaluated without library formulas
+        '''
+        if self._function is None:
+            function = RangeFunction.Parse(self._formula)
+            if function is not None:
+                self._function, self._inputs = function, function.Inputs
+                return self._function, self._inputs
+            if formulas is None:
+                raise Exception(f"Cell error! Library formulas is required to evaluate formula {self._formula}")
+            try:
+                function = formulas.Parser().ast(self._formula)[1].compile()
+            except formulas.errors.FormulaError:
+                raise Exception(f"Cell error! Wrong formula {self._formula}")
+            self._inputs = [ParseCellReference(name) for name in function.inputs]
+            self._function = function
+        return self._function, self._inputs
 
 
 if __name__ == '__main__':
     
     # Create flowsheet
     Flwsht  = Flowsheet()
+    Flwsht.StaticsSolver.Tracer = PrintTracer()
 
     # Add Unitops
     TestUO = DummyUnitOp("TestUO", Flwsht)
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+import Benchmark
+from Factory3 import Flowsheet, SolverStateEnum
+
+
+def Build(count = 50):
+    flowsheet = Flowsheet()
+    unitOps = Benchmark.BuildChain(flowsheet, count)
+    flowsheet.SetValues(Benchmark.GetSpecs("chain", unitOps))
+    flowsheet.StaticsSolver.SolverState = SolverStateEnum.Active
+    return flowsheet, unitOps
+
+
+def test_solve_async_matches_solve():
+    flowsheet, unitOps = Build()
+    asyncio.run(flowsheet.SolveAsync())
+    expected, expectedOps = Build()
+    expected.Solve()
+    assert [unitOp.PressureOut.Value for unitOp in unitOps] == [unitOp.PressureOut.Value for unitOp in expectedOps]
+    assert all(unitOp.IsCalculated for unitOp in unitOps)
+
+
+def test_solve_iter_reports_progress_and_yields_to_event_loop():
+    flowsheet, unitOps = Build()
+    ticks = []
+
+    async def Ticker():
+        while True:
+            ticks.append(len(ticks))
+            await asyncio.sleep(0)
+
+    async def Run():
+        ticker = asyncio.create_task(Ticker())
+        progress = [item async for item in flowsheet.SolveIter()]
+        ticker.cancel()
+        return progress
+
+    progress = asyncio.run(Run())
+    assert [item.Steps for item in progress] == list(range(1, len(progress) + 1))
+    assert progress[-1].Pending == 0
+    assert any(not item.IsForgetting for item in progress)
+    assert len(ticks) >= len(progress) - 1
+
+
+def test_timeout_leaves_flowsheet_forgotten():
+    flowsheet, unitOps = Build()
+
+    async def Run():
+        steps = 0
+        async for progress in flowsheet.SolveIter():
+            steps += 1
+            if steps == 3:
+                raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(Run())
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(flowsheet.SolveAsync(timeout = 0))
+
+    solver = flowsheet.StaticsSolver
+    assert len(solver.ForgettingQueue) == 0
+    assert len(solver.SolvingQueue) > 0
+    assert not solver.IsSolving and not flowsheet.IsSolvingAsync
+
+    # Not calculated unitops are solved by next solve
+    flowsheet.Solve()
+    assert all(unitOp.IsCalculated for unitOp in unitOps)
+
+
+def test_cancellation_leaves_flowsheet_consistent():
+    flowsheet, unitOps = Build()
+
+    async def Run():
+        task = asyncio.create_task(flowsheet.SolveAsync())
+        for _ in range(5):
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(Run())
+    assert len(flowsheet.StaticsSolver.ForgettingQueue) == 0
+    assert not flowsheet.IsSolvingAsync
+    asyncio.run(flowsheet.SolveAsync())
+    assert all(unitOp.IsCalculated for unitOp in unitOps)
+
+
+def test_concurrent_solves_are_serialized():
+    flowsheet, unitOps = Build()
+
+    async def Run():
+        first = asyncio.create_task(flowsheet.SolveAsync())
+        await asyncio.sleep(0)
+        # Spec change made while solve is suspended is taken by it
+        unitOps[10].PressureDrop.SetValue(2.0)
+        await asyncio.gather(first, flowsheet.SolveAsync())
+
+    asyncio.run(Run())
+    assert unitOps[-1].PressureOut.Value == 1e7 - len(unitOps) - 1
+    assert all(unitOp.IsCalculated for unitOp in unitOps)
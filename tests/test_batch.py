@@ -0,0 +1,40 @@
+from Factory3 import Flowsheet, DummyUnitOp
+
+
+def MakeUnitOp():
+    flowsheet = Flowsheet()
+    unitOp = DummyUnitOp("UO", flowsheet)
+    flowsheet.ActivateSolver()
+    return flowsheet, unitOp
+
+
+def test_batch_calls_one_solve():
+    flowsheet, unitOp = MakeUnitOp()
+    solves = flowsheet.SolvesCount
+    with flowsheet.Batch():
+        unitOp.PressureIn.SetValue(200, "kPa")
+        unitOp.PressureDrop.SetValue(100, "kPa")
+        unitOp.TemperatureIn.SetValue(10, "C")
+        unitOp.TemperatureDrop.SetValue(5, "C")
+        assert not unitOp.PressureOut.HasValue
+    assert flowsheet.SolvesCount == solves + 1
+    assert abs(unitOp.PressureOut.GetValue("kPa") - 100) < 1e-9
+    assert abs(unitOp.TemperatureOut.GetValue("C") - 5) < 1e-9
+
+
+def test_nested_batch_solves_at_outermost_exit():
+    flowsheet, unitOp = MakeUnitOp()
+    solves = flowsheet.SolvesCount
+    with flowsheet.Batch():
+        with flowsheet.Batch():
+            unitOp.PressureIn.SetValue(200, "kPa")
+        assert flowsheet.SolvesCount == solves
+        unitOp.PressureDrop.SetValue(100, "kPa")
+    assert flowsheet.SolvesCount == solves + 1
+    assert abs(unitOp.PressureOut.GetValue("kPa") - 100) < 1e-9
+
+
+def test_set_values_accepts_units():
+    flowsheet, unitOp = MakeUnitOp()
+    flowsheet.SetValues({unitOp.PressureIn : (200, "kPa"), unitOp.PressureDrop : 50000.0})
+    assert abs(unitOp.PressureOut.GetValue("kPa") - 150) < 1e-9
@@ -0,0 +1,9 @@
+import Benchmark
+
+
+def test_suite_runs_on_small_sizes():
+    results = Benchmark.RunSuite([20], [10], list(Benchmark.Topologies), workers = 2)
+    assert results["flowsheet/chain/20/solving_pass"] > 0
+    assert results["memory/20/ArrayPropertyStore"] < results["memory/20/__dict__ objects"]
+    assert "parallel/20/workers_2" in results
+    assert Benchmark.CompareResults(results, results, 0.2) == []
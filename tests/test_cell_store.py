@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from Factory3 import Flowsheet, Spreadsheet, DenseCellStore, SparseCellStore, CellStateEnum
+
+
+@pytest.mark.parametrize("storeType", [DenseCellStore, SparseCellStore])
+def test_store_keeps_typed_data_of_cells(storeType):
+    store = storeType(4, 5)
+    store.SetValue(1, 2, 3.5)
+    store.SetState(1, 2, CellStateEnum.CONSTANT.value)
+    store.SetImport(2, 3, 7)
+    store.SetExport(3, 4, 9)
+    assert store.GetValue(1, 2) == 3.5
+    assert store.GetState(1, 2) == CellStateEnum.CONSTANT.value
+    assert (store.GetImport(2, 3), store.GetExport(3, 4)) == (7, 9)
+    # Empty cell: NaN value and no links
+    assert np.isnan(store.GetValue(0, 0))
+    assert (store.GetState(0, 0), store.GetImport(0, 0), store.GetExport(0, 0)) == (CellStateEnum.EMPTY.value, -1, -1)
+
+    block = store.GetValues((0, 1), (1, 2))
+    assert block.shape == (2, 2)
+    assert block[1, 1] == 3.5 and np.isnan(block).sum() == 3
+    # Range is cut by size of table
+    assert store.GetValues((2, 3), (10, 10)).shape == (2, 2)
+
+
+def test_dense_store_grows_by_capacity_doubling():
+    store = DenseCellStore(4, 4)
+    store.SetValue(3, 3, 1.0)
+    store.Resize(5, 4)
+    assert store.Values.shape == (8, 4)
+    values = store.Values
+    # Growth inside of capacity doesn't reallocate arrays
+    store.Resize(8, 4)
+    assert store.Values is values
+    assert store.GetValue(3, 3) == 1.0
+    store.Resize(20, 4)
+    assert store.Values.shape == (20, 4)
+
+
+def test_dense_store_clears_cells_outside_of_table():
+    store = DenseCellStore(4, 4)
+    store.SetValue(3, 3, 1.0)
+    store.SetImport(3, 0, 5)
+    store.Resize(3, 3)
+    store.Resize(4, 4)
+    assert np.isnan(store.GetValue(3, 3))
+    assert store.GetImport(3, 0) == -1
+
+
+def test_resize_of_spreadsheet_keeps_cells_inside_of_table():
+    sheet = Spreadsheet(3, 3, "Sheet", Flowsheet())
+    sheet.SetCellValue(0, 0, 1.0)
+    sheet.SetCellValue(2, 2, 2.0)
+    sheet.SetCellValue(1, 2, "text")
+    sheet.SetFormula(2, 1, "=A1+1")
+    sheet.Resize(2, 2)
+    assert sheet.GetCellValue(0, 0) == 1.0
+    assert sheet._objects == {} and sheet._cells == {}
+    with pytest.raises(IndexError):
+        sheet.GetCell(2, 2)
+
+    sheet.Resize(6, 6)
+    assert (sheet.NumberOfRows_y, sheet.NumberOfColums_x) == (6, 6)
+    assert sheet.GetCellValue(2, 2) is None
+    sheet.SetCellValue(5, 5, 4.0)
+    assert sheet.GetCellValue(5, 5) == 4.0
+
+
+def test_cells_are_views_created_on_access():
+    sheet = Spreadsheet(100, 100, "Sheet", Flowsheet())
+    assert sheet._cells == {}
+    cell = sheet.Table[10][20]
+    assert (cell.Row, cell.Column) == (10, 20)
+    assert sheet._cells == {}
+    # Value of cell is written to store of spreadsheet
+    cell.Value = 5.0
+    assert sheet.Store.GetValue(10, 20) == 5.0
+    assert sheet.Table[10, 20].Value == 5.0
+    assert sheet._cells == {}
+
+    # Only cells with formulas are kept
+    sheet.SetFormula(1, 1, "=1+1")
+    assert sheet.Table[1, 1] is sheet.Table[1][1]
+    assert list(sheet._cells) == [(1, 1)]
+    sheet.SetFormula(1, 1, None)
+    assert sheet._cells == {}
+
+
+@pytest.mark.parametrize("storeType", [DenseCellStore, SparseCellStore])
+def test_rows_and_columns_have_float_values_only(storeType):
+    store = storeType(5, 5)
+    store.SetValue(1, 3, 2.0)
+    store.SetValue(1, 0, 1.0)
+    store.SetValue(4, 3, 3.0)
+    # Cell without value, but linked to property
+    store.SetImport(1, 1, 0)
+    columns, values = store.GetRow(1)
+    assert columns.tolist() == [0, 3] and values.tolist() == [1.0, 2.0]
+    rows, values = store.GetColumn(3)
+    assert rows.tolist() == [1, 4] and values.tolist() == [2.0, 3.0]
+
+    # Changed values are seen by layouts already built
+    store.SetValue(1, 3, 7.0)
+    assert store.GetRow(1)[1].tolist() == [1.0, 7.0]
+    assert store.GetColumn(3)[1].tolist() == [7.0, 3.0]
@@ -0,0 +1,92 @@
+import time
+import tracemalloc
+
+import pytest
+
+import Benchmark
+from Factory3 import Flowsheet, DummyUnitOp, Connector, Spreadsheet
+
+
+def Build(count, compactProperties = False):
+    flowsheet = Flowsheet(compactProperties = compactProperties)
+    unitOps = Benchmark.BuildChain(flowsheet, count)
+    flowsheet.SetValues(Benchmark.GetSpecs("chain", unitOps))
+    flowsheet.ActivateSolver()
+    return flowsheet, unitOps
+
+
+def test_unchanged_clone_copies_nothing():
+    flowsheet, unitOps = Build(5000)
+    tracemalloc.start()
+    start = time.perf_counter()
+    clone = flowsheet.Clone()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert size < 100 * 1024
+    assert elapsed < 0.1
+    assert len(clone.Dependencies.Nodes.Changes) == 0
+    assert clone.Diff() == {}
+
+    # Change at the end of chain copies only unitops it reaches
+    clone.ItemsDict["U4990"].PressureDrop.SetValue(1001.0)
+    assert len(clone.Dependencies.Nodes.Changes) < 100
+    assert clone.ItemsDict["U4999"].PressureOut.Value == unitOps[4999].PressureOut.Value - 1000
+    assert len(clone.Diff()) == 10 + 9 + 1
+
+
+@pytest.mark.parametrize("compactProperties", [False, True])
+def test_clone_and_parent_are_independent(compactProperties):
+    flowsheet, unitOps = Build(20, compactProperties)
+    pressures = [unitOp.PressureOut.Value for unitOp in unitOps]
+    clone = flowsheet.Clone()
+
+    clonedOps = [clone.ItemsDict[unitOp.Name] for unitOp in unitOps[:10]]
+    assert all(cloned is not unitOp and cloned.Owner is clone for cloned, unitOp in zip(clonedOps, unitOps))
+    assert clonedOps[0].PressureOut is not unitOps[0].PressureOut
+
+    # Parent is changed after cloning: unitops not copied by clone yet keep state of cloning time
+    unitOps[5].PressureDrop.SetValue(1001.0)
+    assert unitOps[19].PressureOut.Value == pressures[19] - 1000
+    assert [clone.ItemsDict[unitOp.Name].PressureOut.Value for unitOp in unitOps] == pressures
+    assert all(clone.ItemsDict[unitOp.Name].IsCalculated for unitOp in unitOps)
+    assert clone.Diff()["U19.PressureOut"] == (pressures[19] - 1000, pressures[19])
+
+    # Clone is changed: parent isn't affected
+    clone.ItemsDict["U0"].PressureIn.SetValue(2e7)
+    assert clone.ItemsDict["U19"].PressureOut.Value == pressures[19] + 1e7
+    assert unitOps[19].PressureOut.Value == pressures[19] - 1000
+
+
+def test_graph_changes_are_not_shared():
+    flowsheet, unitOps = Build(10)
+    clone = flowsheet.Clone()
+    # New unitop of parent doesn't exist in clone
+    flowsheet.DisableSolver()
+    extra = DummyUnitOp("Extra", flowsheet)
+    Connector("PX", flowsheet, unitOps[3].PressureOut, extra.PressureIn)
+    assert "Extra" not in clone.ItemsDict
+    assert "PX" not in clone.ItemsDict
+    assert len(clone.GetConsumers(clone.ItemsDict["U3"].PressureOut)) == 1
+    assert len(flowsheet.GetConsumers(unitOps[3].PressureOut)) == 2
+    assert clone.Dependencies.FindComponent(clone.ItemsDict["U0"]) == flowsheet.Dependencies.FindComponent(unitOps[0])
+
+    # Clone gets its own unitops and consumers
+    clone.DisableSolver()
+    sheet = Spreadsheet(2, 2, "Sheet", clone)
+    sheet.SetImport(0, 0, clone.ItemsDict["U9"].PressureOut)
+    sheet.SetFormula(0, 1, "=A1*2")
+    clone.ActivateSolver()
+    assert sheet.GetCellValue(0, 1) == 2 * unitOps[9].PressureOut.Value
+    assert "Sheet" not in flowsheet.ItemsDict
+    assert len(flowsheet.GetConsumers(unitOps[9].PressureOut)) == 0
+
+
+def test_clone_of_clone():
+    flowsheet, unitOps = Build(10)
+    clone = flowsheet.Clone()
+    clone.ItemsDict["U0"].PressureIn.SetValue(2e7)
+    grandClone = clone.Clone()
+    clone.ItemsDict["U0"].PressureIn.SetValue(3e7)
+    assert grandClone.ItemsDict["U9"].PressureOut.Value == unitOps[9].PressureOut.Value + 1e7
+    assert clone.ItemsDict["U9"].PressureOut.Value == unitOps[9].PressureOut.Value + 2e7
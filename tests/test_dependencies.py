@@ -0,0 +1,36 @@
+from Factory3 import Flowsheet, DummyUnitOp, Connector, CallCountTracer
+
+
+def BuildChain(flowsheet, count):
+    # CalcOrder is opposite to flow direction, so only dependency graph gives right order
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet, count - i) for i in range(count)]
+    for i in range(1, count):
+        Connector(f"P{i}", flowsheet, unitOps[i - 1].PressureOut, unitOps[i].PressureIn)
+    return unitOps
+
+
+def test_chain_is_solved_in_dependency_order():
+    flowsheet = Flowsheet()
+    unitOps = BuildChain(flowsheet, 5)
+    specs = {unitOp.PressureDrop : 10.0 for unitOp in unitOps}
+    specs.update({unitOp.TemperatureIn : 300.0 for unitOp in unitOps})
+    specs.update({unitOp.TemperatureDrop : 1.0 for unitOp in unitOps})
+    specs[unitOps[0].PressureIn] = 1000.0
+    flowsheet.SetValues(specs)
+
+    tracer = CallCountTracer()
+    flowsheet.StaticsSolver.Tracer = tracer
+    flowsheet.ActivateSolver()
+    assert all(tracer.SolvingCalls[unitOp.Name] == 1 for unitOp in unitOps)
+    assert abs(unitOps[-1].PressureOut.Value - 950.0) < 1e-9
+    ranks = [flowsheet.Dependencies.GetRank(unitOp) for unitOp in unitOps]
+    assert ranks == sorted(ranks)
+
+
+def test_recycle_is_one_component():
+    flowsheet = Flowsheet()
+    unitOps = BuildChain(flowsheet, 3)
+    Connector("Recycle", flowsheet, unitOps[-1].TemperatureOut, unitOps[0].TemperatureIn)
+    recycles = flowsheet.GetRecycles()
+    assert len(recycles) == 1
+    assert {unitOp.Name for unitOp in unitOps} <= {unitOp.Name for unitOp in recycles[0]}
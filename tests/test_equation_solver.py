@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from Factory3 import Flowsheet, DummyUnitOp, Connector
+
+
+def BuildChain(equationOriented, count = 5):
+    flowsheet = Flowsheet(equationOriented = equationOriented)
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    for i in range(1, count):
+        Connector(f"P{i}", flowsheet, unitOps[i - 1].PressureOut, unitOps[i].PressureIn)
+        Connector(f"T{i}", flowsheet, unitOps[i - 1].TemperatureOut, unitOps[i].TemperatureIn)
+    specs = {unitOp.PressureDrop : 10.0 * (i + 1) for i, unitOp in enumerate(unitOps)}
+    specs.update({unitOp.TemperatureDrop : 1.0 for unitOp in unitOps})
+    specs[unitOps[0].PressureIn] = 1000.0
+    specs[unitOps[0].TemperatureIn] = 400.0
+    flowsheet.SetValues(specs)
+    return flowsheet, unitOps
+
+
+def test_results_are_identical_to_sequential_solver():
+    results = []
+    for equationOriented in (False, True):
+        flowsheet, unitOps = BuildChain(equationOriented)
+        flowsheet.ActivateSolver()
+        unitOps[2].PressureDrop.SetValue(5.0)
+        results.append(flowsheet.PropertyStore.GetColumns()[0].copy())
+    assert np.allclose(results[0], results[1], equal_nan = True)
+    assert abs(results[1][-5] - 875.0) < 1e-9
+
+
+@pytest.mark.filterwarnings("ignore:Matrix is exactly singular")
+def test_singular_block_leaves_flowsheet_unchanged():
+    flowsheet = Flowsheet(equationOriented = True)
+    # Solvable block is gathered first
+    good = DummyUnitOp("Good", flowsheet)
+    first = DummyUnitOp("First", flowsheet)
+    second = DummyUnitOp("Second", flowsheet)
+    # Pressure loop without any specified pressure: as many relations as unknowns, but singular
+    Connector("P12", flowsheet, first.PressureOut, second.PressureIn)
+    Connector("P21", flowsheet, second.PressureOut, first.PressureIn)
+    specs = {good.PressureIn : 1000.0, good.PressureDrop : 10.0, good.TemperatureIn : 300.0, good.TemperatureDrop : 1.0}
+    for unitOp in (first, second):
+        specs.update({unitOp.PressureDrop : 0.0, unitOp.TemperatureIn : 300.0, unitOp.TemperatureDrop : 1.0})
+    flowsheet.SetValues(specs)
+
+    with pytest.raises(Exception, match = "Singular system"):
+        flowsheet.ActivateSolver()
+    assert not good.PressureOut.HasValue
+    assert not good.TemperatureOut.HasValue
+    assert not good.IsCalculated
+    assert good in flowsheet.StaticsSolver.SolvingQueue
+
+
+def test_specs_are_entered_one_by_one_on_active_solver():
+    flowsheet = Flowsheet(equationOriented = True)
+    first = DummyUnitOp("First", flowsheet)
+    second = DummyUnitOp("Second", flowsheet)
+    Connector("P", flowsheet, first.PressureOut, second.PressureIn)
+    Connector("T", flowsheet, first.TemperatureOut, second.TemperatureIn)
+    flowsheet.ActivateSolver()
+    solver = flowsheet.StaticsSolver
+
+    specs = [(first.PressureIn, 1000.0), (first.TemperatureIn, 400.0), (first.PressureDrop, 10.0),
+             (second.PressureDrop, 20.0), (first.TemperatureDrop, 1.0), (second.TemperatureDrop, 2.0)]
+    for prop, value in specs[:-1]:
+        # Under-specified blocks are left unsolved without exception
+        prop.SetValue(value)
+        assert solver.UnderSpecified
+        assert not second.IsCalculated
+        assert second in solver.SolvingQueue
+    # Pressure block is fully specified already
+    assert second.PressureOut.Value == 970.0
+    assert not second.TemperatureOut.HasValue
+
+    specs[-1][0].SetValue(specs[-1][1])
+    assert solver.UnderSpecified == []
+    assert second.TemperatureOut.Value == 397.0
+    assert first.IsCalculated and second.IsCalculated
+    assert len(solver.SolvingQueue) == 0
+
+
+def test_over_specified_block_raises():
+    flowsheet = Flowsheet(equationOriented = True)
+    unitOp = DummyUnitOp("UO", flowsheet)
+    flowsheet.SetValues({unitOp.PressureIn : 1000.0, unitOp.PressureDrop : 10.0, unitOp.PressureOut : 900.0})
+    with pytest.raises(Exception, match = "over-specified"):
+        flowsheet.ActivateSolver()
@@ -0,0 +1,47 @@
+from Factory3 import Flowsheet, DummyUnitOp, Connector, CallCountTracer
+
+
+def BuildSolvedChain(count):
+    flowsheet = Flowsheet()
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    for i in range(1, count):
+        Connector(f"P{i}", flowsheet, unitOps[i - 1].PressureOut, unitOps[i].PressureIn)
+    specs = {unitOp.PressureDrop : 10.0 for unitOp in unitOps}
+    specs.update({unitOp.TemperatureIn : 300.0 for unitOp in unitOps})
+    specs.update({unitOp.TemperatureDrop : 1.0 for unitOp in unitOps})
+    specs[unitOps[0].PressureIn] = 1000.0
+    flowsheet.SetValues(specs)
+    flowsheet.ActivateSolver()
+    return flowsheet, unitOps
+
+
+def test_affected_by_is_downstream_cone():
+    flowsheet, unitOps = BuildSolvedChain(6)
+    affectedOps, affectedProps = flowsheet.AffectedBy(unitOps[3].PressureDrop)
+    names = {unitOp.Name for unitOp in affectedOps}
+    assert {"U3", "U4", "U5"} <= names
+    assert not names & {"U0", "U1", "U2"}
+    assert unitOps[5].PressureOut in affectedProps
+    assert unitOps[2].PressureOut not in affectedProps
+
+
+def test_change_forgets_and_resolves_only_downstream():
+    flowsheet, unitOps = BuildSolvedChain(6)
+    tracer = CallCountTracer()
+    flowsheet.StaticsSolver.Tracer = tracer
+    unitOps[3].PressureDrop.SetValue(20.0)
+    assert set(tracer.SolvingCalls) >= {"U3", "U4", "U5"}
+    assert not set(tracer.SolvingCalls) & {"U0", "U1", "U2"}
+    assert abs(unitOps[2].PressureOut.Value - 970.0) < 1e-9
+    assert abs(unitOps[5].PressureOut.Value - 930.0) < 1e-9
+
+
+def test_clear_calculated_properties_forgets_downstream_cone():
+    flowsheet, unitOps = BuildSolvedChain(6)
+    flowsheet.DisableSolver()
+    affectedOps, affectedProps = flowsheet.AffectedBy(unitOps[3].PressureDrop)
+    unitOps[3].ClearCalculatedProperties()
+    assert all(not prop.HasValue for prop in affectedProps)
+    assert all(not unitOp.IsCalculated for unitOp in affectedOps)
+    assert unitOps[2].PressureOut.Value == 970.0
+    assert all(unitOp in flowsheet.StaticsSolver.SolvingQueue for unitOp in affectedOps)
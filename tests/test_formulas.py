@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from Factory3 import Flowsheet, Spreadsheet, ParseCellReference
+
+formulas = pytest.importorskip("formulas")
+from schedula import EMPTY
+
+
+# Column A: 1, blank, 3, text
+Values = {(0, 0): 1.0, (2, 0): 3.0, (3, 0): "text"}
+
+
+def BuildSheet(texts):
+    flowsheet = Flowsheet()
+    sheet = Spreadsheet(6, 3, "Sheet", flowsheet)
+    for coordinates, value in Values.items():
+        sheet.SetCellValue(*coordinates, value)
+    for row, text in enumerate(texts):
+        sheet.SetFormula(row, 1, text)
+    flowsheet.ActivateSolver()
+    return sheet
+
+
+def EvaluateUncached(text):
+    '''
+    Formula parsed on every evaluation, inputs are resolved by names as library formulas does
+    '''
+    function = formulas.Parser().ast(text)[1].compile()
+    arguments = []
+    for name in function.inputs:
+        first, last = ParseCellReference(name)
+        arguments.append(np.array([[Values.get((r, c), EMPTY) for c in range(first[1], last[1] + 1)]
+                                   for r in range(first[0], last[0] + 1)], dtype = object))
+    result = function(*arguments)
+    return result.item() if isinstance(result, np.ndarray) and result.size == 1 else result
+
+
+Texts = ["=AVERAGE(A1:A4, 0)", "=COUNT(A1:A4)", "=COUNTA(A1:A4)", "=A2+1", "=AVERAGE(A1,A2,1)", "=MIN(A1:A4)+0"]
+
+
+def test_compiled_formulas_match_uncached_evaluation():
+    sheet = BuildSheet(Texts)
+    for row, text in enumerate(Texts):
+        assert sheet.GetCellValue(row, 1) == pytest.approx(EvaluateUncached(text)), text
+    # Blanks are skipped by aggregates, not counted as zeros
+    assert sheet.GetCellValue(0, 1) == pytest.approx(4 / 3)
+    assert sheet.GetCellValue(1, 1) == 2
+    assert sheet.GetCellValue(4, 1) == 1.0
+
+
+def test_reference_to_blank_cell_is_zero():
+    sheet = BuildSheet(["=A2", "=A6"])
+    assert sheet.GetCellValue(0, 1) == 0.0
+    assert sheet.GetCellValue(1, 1) == 0.0
+
+
+def test_formula_is_parsed_once(monkeypatch):
+    sheet = BuildSheet(Texts)
+    calls = []
+    parser = formulas.Parser
+    monkeypatch.setattr(formulas, "Parser", lambda: calls.append(1) or parser())
+    sheet.Evaluate()
+    assert calls == []
+    sheet.SetFormula(3, 1, "=A3+1")
+    assert sheet.GetCellValue(3, 1) == 4.0
+    assert len(calls) == 1
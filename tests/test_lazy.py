@@ -0,0 +1,49 @@
+from Factory3 import Flowsheet, DummyUnitOp, Connector, CallCountTracer
+
+
+def BuildLazyChain(count, inletPressure = 1000.0):
+    flowsheet = Flowsheet()
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    for i in range(1, count):
+        Connector(f"P{i}", flowsheet, unitOps[i - 1].PressureOut, unitOps[i].PressureIn)
+    specs = {unitOp.PressureDrop : 10.0 for unitOp in unitOps}
+    specs.update({unitOp.TemperatureIn : 300.0 for unitOp in unitOps})
+    specs.update({unitOp.TemperatureDrop : 1.0 for unitOp in unitOps})
+    if inletPressure is not None:
+        specs[unitOps[0].PressureIn] = inletPressure
+    flowsheet.SetValues(specs)
+    flowsheet.ActivateLazySolver()
+    return flowsheet, unitOps
+
+
+def test_value_pulls_only_upstream_unitops():
+    flowsheet, unitOps = BuildLazyChain(6)
+    tracer = flowsheet.StaticsSolver.Tracer = CallCountTracer()
+    assert unitOps[2].PressureOut.Value == 970.0
+    assert set(tracer.SolvingCalls) == {"U0", "P1", "U1", "P2", "U2"}
+    assert not unitOps[5].IsCalculated
+
+    # Spec change only forgets, value is pulled again on read
+    unitOps[1].PressureDrop.SetValue(20.0)
+    assert not unitOps[2].IsCalculated
+    assert unitOps[5].PressureOut.Value == 930.0
+
+
+def test_value_of_under_specified_unitop_is_none():
+    flowsheet = Flowsheet()
+    unitOp = DummyUnitOp("UO", flowsheet)
+    flowsheet.SetValues({unitOp.PressureIn : 2e5, unitOp.PressureDrop : 1e5, unitOp.TemperatureIn : 300.0})
+    flowsheet.ActivateLazySolver()
+    assert unitOp.TemperatureOut.Value is None
+    assert unitOp.PressureOut.Value == 1e5
+    assert unitOp in flowsheet.StaticsSolver.SolvingQueue
+
+    # Missing spec makes unitop solvable
+    unitOp.TemperatureDrop.SetValue(5.0)
+    assert unitOp.TemperatureOut.Value == 295.0
+
+
+def test_value_with_under_specified_upstream_is_none():
+    flowsheet, unitOps = BuildLazyChain(4, inletPressure = None)
+    assert unitOps[3].PressureOut.Value is None
+    assert unitOps[3].TemperatureOut.Value == 299.0
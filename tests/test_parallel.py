@@ -0,0 +1,55 @@
+import numpy as np
+
+from Factory3 import Flowsheet, DummyUnitOp, Connector, CallCountTracer
+
+
+def BuildTrains(workers, trains = 8, length = 20):
+    flowsheet = Flowsheet(workers = workers)
+    specs = {}
+    for train in range(trains):
+        unitOps = [DummyUnitOp(f"U{train}_{i}", flowsheet) for i in range(length)]
+        for i in range(1, length):
+            Connector(f"P{train}_{i}", flowsheet, unitOps[i - 1].PressureOut, unitOps[i].PressureIn)
+            Connector(f"T{train}_{i}", flowsheet, unitOps[i - 1].TemperatureOut, unitOps[i].TemperatureIn)
+        specs[unitOps[0].PressureIn] = 1e6 + train
+        specs[unitOps[0].TemperatureIn] = 400.0 + train
+        for i, unitOp in enumerate(unitOps):
+            specs[unitOp.PressureDrop] = 100.0 + i
+            specs[unitOp.TemperatureDrop] = 0.5
+    flowsheet.SetValues(specs)
+    return flowsheet, specs
+
+
+def GetState(flowsheet):
+    values, states, calcByIds = flowsheet.PropertyStore.GetColumns()
+    edges = {id : set(successors) for id, successors in flowsheet.Dependencies.Successors.items()}
+    return values.copy(), states.copy(), calcByIds.copy(), edges
+
+
+def test_results_are_identical_to_sequential_solver():
+    results = []
+    for workers in (1, 4):
+        flowsheet, specs = BuildTrains(workers)
+        tracer = CallCountTracer()
+        flowsheet.StaticsSolver.Tracer = tracer
+        flowsheet.ActivateSolver()
+        # Change in the middle of one train and in the head of another one
+        flowsheet.SetValues({flowsheet.GetProperty("U3_10", "dP") : 50.0, flowsheet.GetProperty("U5_0", "PressureIn") : 2e6})
+        results.append((GetState(flowsheet), tracer.SolvingCalls, tracer.CalculatedProperties))
+
+    (sequential, sequentialCalls, sequentialCount), (parallel, parallelCalls, parallelCount) = results
+    assert np.array_equal(sequential[0], parallel[0], equal_nan = True)
+    assert np.array_equal(sequential[1], parallel[1])
+    assert np.array_equal(sequential[2], parallel[2])
+    assert sequential[3] == parallel[3]
+    assert sequentialCalls == parallelCalls
+    assert sequentialCount == parallelCount
+
+
+def test_clone_is_solved_on_coordinating_thread():
+    flowsheet, specs = BuildTrains(4, trains = 3, length = 5)
+    flowsheet.ActivateSolver()
+    clone = flowsheet.Clone()
+    clone.GetProperty("U1_0", "PressureIn").SetValue(5e5)
+    assert abs(clone.GetProperty("U1_4", "PressureOut").Value - (5e5 - 5 * 102)) < 1e-6
+    assert abs(flowsheet.GetProperty("U1_4", "PressureOut").Value - (1e6 + 1 - 5 * 102)) < 1e-6
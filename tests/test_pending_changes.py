@@ -0,0 +1,52 @@
+from Factory3 import Flowsheet, DummyUnitOp, CallCountTracer
+
+
+class Controller(DummyUnitOp):
+    '''
+    Sets specs of other unitop from its own calculation
+    '''
+    Target : DummyUnitOp = None
+
+    def Calculate(self, IsForgetting: bool):
+        if not super().Calculate(IsForgetting) or IsForgetting:
+            return self.IsCalculated
+        value = self.PressureOut.Value / 1000
+        if self.Target.PressureDrop.Value != value:
+            self.Target.PressureDrop.SetValue(value)
+            self.Target.TemperatureDrop.SetValue(value / 100)
+        return True
+
+
+def Build():
+    flowsheet = Flowsheet()
+    controller = Controller("Controller", flowsheet)
+    target = DummyUnitOp("Target", flowsheet)
+    controller.Target = target
+    tracer = flowsheet.StaticsSolver.Tracer = CallCountTracer()
+    flowsheet.SetValues({controller.PressureIn : 2e5, controller.PressureDrop : 1e5, controller.TemperatureIn : 300.0,
+                         controller.TemperatureDrop : 5.0, target.PressureIn : 1e3, target.TemperatureIn : 10.0})
+    return flowsheet, controller, target, tracer
+
+
+def test_specs_changed_during_solve_are_taken_after_pass():
+    flowsheet, controller, target, tracer = Build()
+    flowsheet.ActivateSolver()
+    assert target.PressureDrop.Value == 100.0
+    assert target.PressureOut.Value == 900.0
+    assert target.TemperatureOut.Value == 9.0
+    assert controller.IsCalculated and target.IsCalculated
+    assert len(flowsheet.StaticsSolver.PendingChanges) == 0
+
+
+def test_changes_of_one_owner_are_coalesced():
+    flowsheet, controller, target, tracer = Build()
+    solvesCount = flowsheet.SolvesCount
+    flowsheet.ActivateSolver()
+    # Two specs of target give one forgetting of target, nested solves are avoided
+    assert tracer.ForgettingCalls["Target"] == 2
+    assert flowsheet.SolvesCount == solvesCount + 1
+    assert flowsheet.SolvesAvoidedCount >= 2
+
+    controller.PressureIn.SetValue(3e5)
+    assert target.PressureOut.Value == 800.0
+    assert tracer.ForgettingCalls["Target"] == 3
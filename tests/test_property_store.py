@@ -0,0 +1,57 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+from Factory3 import (Flowsheet, DummyUnitOp, Spreadsheet, NumericalProperty, PropertyStateEnum, UnitTypeEnum,
+                      ArrayPropertyStore)
+
+
+@pytest.mark.parametrize("compactProperties", [False, True])
+def test_properties_are_handles_into_store(compactProperties):
+    flowsheet = Flowsheet(compactProperties = compactProperties)
+    unitOp = DummyUnitOp("UO", flowsheet)
+    store = flowsheet.PropertyStore
+    assert isinstance(store, ArrayPropertyStore) == compactProperties
+    assert store.Properties[unitOp.PressureIn.Handle] is unitOp.PressureIn
+
+    unitOp.PressureIn.SetValue(200, "kPa")
+    assert store.GetValue(unitOp.PressureIn.Handle) == 200000.0
+    assert unitOp.PressureIn.PropertyState is PropertyStateEnum.SPECIFIED
+    assert not unitOp.PressureOut.HasValue
+
+
+@pytest.mark.parametrize("compactProperties", [False, True])
+def test_solved_values_are_the_same_for_both_stores(compactProperties):
+    flowsheet = Flowsheet(compactProperties = compactProperties)
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(600)]
+    flowsheet.SetValues({unitOp.PressureIn : 1000.0 + i for i, unitOp in enumerate(unitOps)})
+    flowsheet.SetValues({unitOp.PressureDrop : 1.0 for unitOp in unitOps})
+    flowsheet.ActivateSolver()
+    values = flowsheet.GetValues([unitOp.PressureOut for unitOp in unitOps])
+    assert np.array_equal(values, 999.0 + np.arange(600))
+    assert unitOps[0].PressureOut.CalcBy is unitOps[0]
+    assert unitOps[0].PressureOut.PropertyState is PropertyStateEnum.CALCULATED
+    assert np.isnan(flowsheet.GetValues([unitOps[0].TemperatureOut]))[0]
+
+
+def test_properties_without_owner_have_no_handles_and_are_freed():
+    first = NumericalProperty("First", UnitTypeEnum.PRESSURE, defaultValue = 1.0)
+    second = NumericalProperty("Second", UnitTypeEnum.PRESSURE, defaultValue = 2.0)
+    assert first.Handle is None and second.Handle is None
+    second.Value = 3.0
+    assert (first.Value, second.Value) == (1.0, 3.0)
+    # Store of property is freed with it
+    reference = weakref.ref(second._store)
+    del second
+    gc.collect()
+    assert reference() is None
+
+    # Handles don't point to properties of flowsheet
+    flowsheet = Flowsheet()
+    unitOp = DummyUnitOp("UO", flowsheet)
+    assert all(prop._store is flowsheet.PropertyStore for prop in unitOp.Properties)
+    sheet = Spreadsheet(2, 2, "Sheet", flowsheet)
+    with pytest.raises(Exception, match = "doesn't belong to flowsheet"):
+        sheet.SetImport(0, 0, first)
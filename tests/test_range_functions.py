@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from Factory3 import Flowsheet, Spreadsheet, RangeFunction, ParseCellReference
+
+formulas = pytest.importorskip("formulas")
+from schedula import EMPTY
+
+
+Texts = ["=AVERAGE(A1,A2)", "=AVERAGE(A1:A5)", "=SUM(A1:A5)", "=MIN(A2:A5)", "=MAX(A1:A5)",
+         "=MIN(A2,A4)", "=SUMPRODUCT(A1:A5,C1:C5)", "=AVERAGE(A1:A3,C1:C2)"]
+
+
+def BuildSheet(values):
+    flowsheet = Flowsheet()
+    sheet = Spreadsheet(8, 4, "Sheet", flowsheet)
+    for coordinates, value in values.items():
+        sheet.SetCellValue(*coordinates, value)
+    for row, text in enumerate(Texts):
+        sheet.SetFormula(row, 1, text)
+    flowsheet.ActivateSolver()
+    return sheet
+
+
+def EvaluateByLibrary(text, values):
+    function = formulas.Parser().ast(text)[1].compile()
+    arguments = []
+    for name in function.inputs:
+        first, last = ParseCellReference(name)
+        arguments.append(np.array([[values.get((r, c), EMPTY) for c in range(first[1], last[1] + 1)]
+                                   for r in range(first[0], last[0] + 1)], dtype = object))
+    result = function(*arguments)
+    return result.item() if isinstance(result, np.ndarray) and result.size == 1 else result
+
+
+def AssertMatchesLibrary(sheet, values):
+    for row, text in enumerate(Texts):
+        assert isinstance(sheet.GetCell(row, 1)._function, RangeFunction), text
+        expected = EvaluateByLibrary(text, values)
+        if isinstance(expected, formulas.XlError):
+            assert sheet.GetCellValue(row, 1) is expected, text
+        else:
+            assert sheet.GetCellValue(row, 1) == pytest.approx(expected), text
+
+
+# Column A: 1, blank, -3, text, blank; column C: 2, 5
+Values = {(0, 0): 1.0, (2, 0): -3.0, (3, 0): "text", (0, 2): 2.0, (1, 2): 5.0}
+
+
+def test_blank_cells_and_text_are_ignored():
+    sheet = BuildSheet(Values)
+    AssertMatchesLibrary(sheet, Values)
+    assert sheet.GetCellValue(0, 1) == 1.0
+    assert sheet.GetCellValue(1, 1) == -1.0
+    assert sheet.GetCellValue(5, 1) == 0.0
+
+
+def test_running_aggregates_follow_changed_cells():
+    values = dict(Values)
+    sheet = BuildSheet(values)
+    changes = [((1, 0), 4.0), ((0, 0), None), ((2, 0), "text"), ((3, 0), 7.0), ((4, 0), -2.0), ((1, 0), None),
+               ((3, 0), None), ((4, 0), None), ((2, 0), 6.0), ((1, 2), None)]
+    for coordinates, value in changes:
+        sheet.SetCellValue(*coordinates, value)
+        if value is None:
+            values.pop(coordinates, None)
+        else:
+            values[coordinates] = value
+        AssertMatchesLibrary(sheet, values)
+
+    # Aggregates were updated, not reduced again
+    assert sheet.GetCell(2, 1)._function.Updates > 0
+
+
+def test_first_error_of_references_is_result():
+    values = dict(Values)
+    sheet = BuildSheet(values)
+    sheet.SetFormula(7, 3, "=1/0")
+    sheet.SetCellValue(4, 0, formulas.NA)
+    values[(4, 0)] = formulas.NA
+    AssertMatchesLibrary(sheet, values)
+    assert sheet.GetCellValue(2, 1) is formulas.NA
+
+    # Error cell changed to number is counted as number
+    sheet.SetCellValue(4, 0, 9.0)
+    values[(4, 0)] = 9.0
+    AssertMatchesLibrary(sheet, values)
+    assert sheet.GetCell(2, 1)._function.Errors == 0
+
+
+def test_objects_outside_of_ranges_are_not_visited():
+    flowsheet = Flowsheet()
+    sheet = Spreadsheet(2000, 2, "Sheet", flowsheet)
+    for row in range(10, 2000):
+        sheet.SetCellValue(row, 1, "text")
+    sheet.SetCellValue(0, 0, 1.0)
+    sheet.SetFormula(0, 1, "=SUM(A1:A5)")
+    flowsheet.ActivateSolver()
+
+    class Objects(dict):
+        def __iter__(self):
+            raise AssertionError("all objects of sheet are visited")
+
+        def items(self):
+            raise AssertionError("all objects of sheet are visited")
+
+    sheet._objects = Objects(sheet._objects)
+    sheet.SetCellValue(1, 0, 2.0)
+    assert sheet.GetCellValue(0, 1) == 3.0
+    sheet.Evaluate()
+    assert sheet.GetCellValue(0, 1) == 3.0
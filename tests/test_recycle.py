@@ -0,0 +1,69 @@
+import pytest
+
+from Factory3 import (Flowsheet, BaseUnitOp, DummyUnitOp, Connector, NumericalProperty, UnitTypeEnum,
+                      ConvergenceMethodEnum, RecycleConverger, SelectTears)
+
+
+class Mixer(BaseUnitOp):
+    '''
+    Outlet pressure is mean of feed and recycle pressures
+    '''
+    def __init__(self, name, flowsheet):
+        super().__init__(name, flowsheet)
+        self.Feed = NumericalProperty("Feed", UnitTypeEnum.PRESSURE, self, True)
+        self.Recycle = NumericalProperty("Recycle", UnitTypeEnum.PRESSURE, self, True)
+        self.Out = NumericalProperty("Out", UnitTypeEnum.PRESSURE, self, True)
+
+    def Calculate(self, IsForgetting: bool):
+        self.IsCalculated = False
+        if IsForgetting:
+            return True
+        if self.Feed.HasValue and self.Recycle.HasValue:
+            self.Out.Calculate(0.5 * (self.Feed.Value + self.Recycle.Value), self)
+            self.IsCalculated = True
+        return self.IsCalculated
+
+    def VariableChanging(self, Variable):
+        return True
+
+    def VariableChanged(self, Variable):
+        pass
+
+
+def BuildLoop():
+    flowsheet = Flowsheet()
+    mixer = Mixer("Mixer", flowsheet)
+    pipe = DummyUnitOp("Pipe", flowsheet)
+    Connector("ToPipe", flowsheet, mixer.Out, pipe.PressureIn)
+    Connector("Back", flowsheet, pipe.PressureOut, mixer.Recycle)
+    flowsheet.SetValues({mixer.Feed : 1000.0, pipe.PressureDrop : 10.0, pipe.TemperatureIn : 300.0, pipe.TemperatureDrop : 0.0})
+    flowsheet.ActivateSolver()
+    return flowsheet, mixer, pipe
+
+
+def test_tears_break_every_recycle():
+    flowsheet, mixer, pipe = BuildLoop()
+    assert len(flowsheet.GetRecycles()) == 1
+    assert len(SelectTears(flowsheet)) == 1
+    assert not mixer.Out.HasValue
+
+
+@pytest.mark.parametrize("method", list(ConvergenceMethodEnum))
+def test_recycle_converges_to_fixed_point(method):
+    flowsheet, mixer, pipe = BuildLoop()
+    converger = flowsheet.ConvergeRecycles(method)
+    assert converger.IsConverged
+    # x = (1000 + x - 10) / 2
+    assert abs(mixer.Recycle.Value - 980.0) < 0.1
+    assert abs(pipe.PressureOut.Value - 980.0) < 0.1
+    assert converger.History[-1] < converger.History[0]
+    if method is not ConvergenceMethodEnum.DirectSubstitution:
+        assert converger.Iterations < 10
+
+
+def test_not_converged_recycle_is_forgotten():
+    flowsheet, mixer, pipe = BuildLoop()
+    converger = RecycleConverger(flowsheet, ConvergenceMethodEnum.DirectSubstitution, maxIterations = 3)
+    assert not converger.Converge()
+    assert len(converger.History) == 3
+    assert not pipe.PressureOut.HasValue
@@ -0,0 +1,39 @@
+import math
+
+from Factory3 import Flowsheet, DummyUnitOp, Quantize
+
+
+class CachedUnitOp(DummyUnitOp):
+    ResultCacheSize = 4
+    Calls = 0
+
+    def Calculate(self, IsForgetting: bool):
+        if not IsForgetting:
+            CachedUnitOp.Calls += 1
+        return super().Calculate(IsForgetting)
+
+
+def test_quantize():
+    assert Quantize(None) is None
+    assert Quantize(0) == 0
+    assert Quantize(123456.789) == 123457.0
+    assert Quantize(0.1234567) == 0.12346
+    assert Quantize(123456.7891) == Quantize(123456.7894)
+    assert Quantize(math.inf) == math.inf
+    assert Quantize(-math.inf) == -math.inf
+    assert math.isnan(Quantize(math.nan))
+
+
+def test_repeated_inputs_are_restored_from_cache():
+    flowsheet = Flowsheet()
+    unitOp = CachedUnitOp("UO", flowsheet)
+    flowsheet.SetValues({unitOp.PressureIn : 2e5, unitOp.PressureDrop : 1e5, unitOp.TemperatureIn : 300.0, unitOp.TemperatureDrop : 5.0})
+    flowsheet.ActivateSolver()
+    unitOp.PressureIn.SetValue(3e5)
+    assert unitOp.PressureOut.Value == 2e5
+    assert len(unitOp.ResultCache) == 2
+    unitOp.PressureIn.SetValue(2e5)
+    assert unitOp.PressureOut.Value == 1e5
+    assert unitOp.TemperatureOut.Value == 295.0
+    assert len(unitOp.ResultCache) == 2
+    assert CachedUnitOp.Calls == 2
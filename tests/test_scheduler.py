@@ -0,0 +1,45 @@
+from Factory3 import CalcScheduler
+
+
+class Item:
+    def __init__(self, id, calcOrder):
+        self.Id = id
+        self.CalcOrder = calcOrder
+
+
+def PopAll(scheduler):
+    result = []
+    while True:
+        item = scheduler.TryPop()
+        if item is None:
+            return result
+        result.append(item.Id)
+
+
+def test_pops_by_calc_order_then_id():
+    scheduler = CalcScheduler()
+    for id, calcOrder in ((1, 5), (2, 1), (3, 5), (4, 0)):
+        scheduler.TryAdd(Item(id, calcOrder))
+    assert PopAll(scheduler) == [4, 2, 1, 3]
+
+
+def test_no_duplicates():
+    scheduler = CalcScheduler()
+    item = Item(1, 0)
+    assert scheduler.TryAdd(item)
+    assert not scheduler.TryAdd(item)
+    assert len(scheduler) == 1 and item in scheduler
+    assert PopAll(scheduler) == [1]
+
+
+def test_reprioritize_and_remove():
+    scheduler = CalcScheduler()
+    items = [Item(id, id) for id in range(4)]
+    for item in items:
+        scheduler.TryAdd(item)
+    items[3].CalcOrder = -1
+    assert scheduler.Reprioritize(items[3])
+    assert scheduler.Remove(items[1])
+    assert not scheduler.Remove(items[1])
+    assert len(scheduler) == 3
+    assert PopAll(scheduler) == [3, 0, 2]
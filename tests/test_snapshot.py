@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from Factory3 import Flowsheet, DummyUnitOp, Connector
+
+
+def Build(compactProperties = False, count = 4):
+    flowsheet = Flowsheet(compactProperties = compactProperties)
+    unitOps = [DummyUnitOp(f"U{i}", flowsheet) for i in range(count)]
+    for i in range(1, count):
+        Connector(f"P{i}", flowsheet, unitOps[i - 1].PressureOut, unitOps[i].PressureIn)
+    return flowsheet, unitOps
+
+
+def Specify(flowsheet, unitOps):
+    specs = {unitOp.PressureDrop : 10.0 for unitOp in unitOps}
+    specs.update({unitOp.TemperatureIn : 300.0 for unitOp in unitOps})
+    specs.update({unitOp.TemperatureDrop : 1.0 for unitOp in unitOps})
+    specs[unitOps[0].PressureIn] = 1000.0
+    flowsheet.SetValues(specs)
+    flowsheet.ActivateSolver()
+
+
+@pytest.mark.parametrize("compactProperties, lazy", [(False, False), (True, False), (True, True)])
+def test_save_load_round_trip(tmp_path, compactProperties, lazy):
+    flowsheet, unitOps = Build(compactProperties)
+    Specify(flowsheet, unitOps)
+    path = tmp_path / "case.npz"
+    flowsheet.Save(path)
+
+    loaded, loadedOps = Build(compactProperties)
+    loaded.Load(path, lazy)
+    for original, restored in zip(flowsheet.PropertyStore.GetColumns(), loaded.PropertyStore.GetColumns()):
+        assert np.array_equal(original, restored, equal_nan = True)
+    assert all(unitOp.IsCalculated for unitOp in loadedOps)
+    assert loadedOps[3].PressureOut.CalcBy is loadedOps[3]
+
+    # Loaded case is solved further by active solver
+    loaded.ActivateSolver()
+    loadedOps[1].PressureDrop.SetValue(20.0)
+    assert loadedOps[3].PressureOut.Value == 950.0
+
+
+def test_load_checks_structure(tmp_path):
+    flowsheet, unitOps = Build()
+    path = tmp_path / "case.npz"
+    flowsheet.Save(path)
+    other, otherOps = Build(count = 3)
+    with pytest.raises(Exception, match = "Load error"):
+        other.Load(path)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from Factory3 import Flowsheet, DummyUnitOp, Spreadsheet, SparseCellStore
+
+formulas = pytest.importorskip("formulas")
+
+
+def test_store_is_switched_by_fraction_of_populated_cells(monkeypatch):
+    monkeypatch.setattr(Spreadsheet, "SparseMinimumSize", 100)
+    sheet = Spreadsheet(20, 10, "Sheet", Flowsheet())
+    assert sheet.IsSparse
+    assert Spreadsheet(5, 5, "Small", sheet.Owner).IsSparse is False
+
+    # Sparse store keeps only populated cells and becomes dense above DenseFillRatio
+    for row in range(10):
+        sheet.SetCellValue(row, 1, float(row))
+    assert sheet.IsSparse and sheet.Store.Count() == 10
+    sheet.SetCellValue(10, 1, 10.0)
+    assert not sheet.IsSparse
+    assert [sheet.GetCellValue(row, 1) for row in range(11)] == [float(row) for row in range(11)]
+    columns, values = sheet.GetRow(3)
+    assert columns.tolist() == [1] and values.tolist() == [3.0]
+
+    # Growing table becomes sparse again
+    sheet.Resize(200, 10)
+    assert sheet.IsSparse
+    assert sheet.GetColumn(1)[1].tolist() == [float(row) for row in range(11)]
+
+
+def test_sparse_store_reads_ranges_from_layout():
+    store = SparseCellStore(1000, 1000)
+    store.SetValue(10, 20, 1.0)
+    store.SetValue(12, 21, 2.0)
+    store.SetValue(500, 20, 3.0)
+    block = store.GetValues((10, 20), (12, 21))
+    assert np.array_equal(block, [[1.0, np.nan], [np.nan, np.nan], [np.nan, 2.0]], equal_nan = True)
+    # Cell without data is removed from store
+    store.SetValue(12, 21, np.nan)
+    assert store.Count() == 2
+    assert np.isnan(store.GetValues((10, 20), (12, 21))).sum() == 5
+
+
+def Build(linked = True):
+    flowsheet = Flowsheet()
+    unitOp = DummyUnitOp("UO", flowsheet)
+    sheet = Spreadsheet(1000, 200, "Sheet", flowsheet)
+    flowsheet.SetValues({unitOp.PressureIn : 200.0, unitOp.PressureDrop : 20.0, unitOp.TemperatureIn : 300.0, unitOp.TemperatureDrop : 5.0})
+    if linked:
+        sheet.SetImport(0, 0, unitOp.PressureOut)
+        sheet.SetFormula(0, 1, "=A1+4")
+        sheet.SetFormula(900, 150, "=1/0")
+        sheet.SetCellValue(500, 100, "text")
+        sheet.SetCellValue(500, 101, 2.5)
+    return flowsheet, unitOp, sheet
+
+
+def test_save_load_round_trip_of_sparse_sheet(tmp_path):
+    flowsheet, unitOp, sheet = Build()
+    flowsheet.ActivateSolver()
+    assert sheet.IsSparse
+    assert sheet.GetCellValue(900, 150) is formulas.DIV
+    path = tmp_path / "case.npz"
+    flowsheet.Save(path)
+
+    loaded, loadedOp, loadedSheet = Build(linked = False)
+    loaded.Load(path)
+    assert loadedSheet.IsSparse
+    # Values, which aren't numbers, are restored without solving
+    assert loadedSheet.GetCellValue(500, 100) == "text"
+    assert loadedSheet.GetCellValue(900, 150) is formulas.DIV
+    assert loadedSheet.GetCellValue(500, 101) == 2.5
+    assert loadedSheet.GetCellValue(0, 1) == 184.0
+    assert loadedSheet.Store.Count() == sheet.Store.Count()
+    assert loaded.GetConsumers(loadedOp.PressureOut) == [loadedSheet]
+
+    loaded.ActivateSolver()
+    loadedOp.PressureDrop.SetValue(22.0)
+    assert loadedSheet.GetCellValue(0, 1) == 182.0
+    assert loadedSheet.GetCellValue(500, 100) == "text"
@@ -0,0 +1,98 @@
+import pytest
+
+from Factory3 import Flowsheet, DummyUnitOp, Spreadsheet
+
+pytest.importorskip("formulas")
+
+
+def Build(linked = True, pressureIn = 200.0):
+    flowsheet = Flowsheet()
+    unitOp = DummyUnitOp("UO", flowsheet)
+    sheet = Spreadsheet(3, 3, "Sheet", flowsheet)
+    specs = {unitOp.PressureDrop : 20.0, unitOp.TemperatureIn : 300.0, unitOp.TemperatureDrop : 5.0}
+    if pressureIn is not None:
+        specs[unitOp.PressureIn] = pressureIn
+    flowsheet.SetValues(specs)
+    if linked:
+        sheet.SetImport(0, 0, unitOp.PressureOut)
+        sheet.SetFormula(0, 1, "=A1+4")
+        sheet.SetFormula(1, 1, "=B1*2")
+    return flowsheet, unitOp, sheet
+
+
+def test_imported_property_change_recalculates_downstream_cells():
+    flowsheet, unitOp, sheet = Build()
+    flowsheet.ActivateSolver()
+    assert sheet.GetCellValue(0, 1) == 184.0
+    assert sheet.GetCellValue(1, 1) == 368.0
+    unitOp.PressureDrop.SetValue(22.0)
+    assert sheet.GetCellValue(0, 1) == 182.0
+    assert sheet.GetCellValue(1, 1) == 364.0
+
+
+def test_circular_reference_is_detected():
+    flowsheet, unitOp, sheet = Build()
+    sheet.SetFormula(2, 0, "=C2+1")
+    sheet.SetFormula(1, 2, "=A3+1")
+    with pytest.raises(Exception, match = "Circular reference"):
+        flowsheet.ActivateSolver()
+
+
+def test_loaded_spreadsheet_consumes_imported_properties(tmp_path):
+    flowsheet, unitOp, sheet = Build()
+    flowsheet.ActivateSolver()
+    path = tmp_path / "case.npz"
+    flowsheet.Save(path)
+
+    # Imports of loaded sheet come from snapshot only
+    loaded, loadedOp, loadedSheet = Build(linked = False)
+    loaded.Load(path)
+    assert loaded.GetConsumers(loadedOp.PressureOut) == [loadedSheet]
+    loaded.ActivateSolver()
+    assert loadedSheet.GetCellValue(0, 1) == 184.0
+    loadedOp.PressureDrop.SetValue(22.0)
+    assert loadedSheet.GetCellValue(0, 1) == 182.0
+    assert loadedSheet.GetCellValue(1, 1) == 364.0
+
+
+def test_export_depending_on_blank_import_is_not_calculated():
+    flowsheet, unitOp, sheet = Build(pressureIn = None)
+    target = DummyUnitOp("Target", flowsheet)
+    sheet.SetExport(0, 1, target.PressureIn)
+    sheet.SetFormula(0, 2, "=5")
+    sheet.SetExport(0, 2, target.TemperatureIn)
+    flowsheet.SetValues({target.PressureDrop : 10.0, target.TemperatureDrop : 1.0})
+    flowsheet.ActivateSolver()
+    assert unitOp.PressureOut.Value is None
+    assert target.PressureIn.Value is None
+    # Exports not depending on blank import are calculated
+    assert target.TemperatureIn.Value == 5.0
+    assert not sheet.IsCalculated
+
+    unitOp.PressureIn.SetValue(200.0)
+    assert target.PressureIn.Value == 184.0
+    assert target.PressureOut.Value == 174.0
+    assert sheet.IsCalculated
+
+
+def test_export_links_spreadsheet_to_owner_of_property():
+    flowsheet, unitOp, sheet = Build()
+    target = DummyUnitOp("Target", flowsheet)
+    other = DummyUnitOp("Other", flowsheet)
+    sheet.SetExport(1, 1, target.PressureIn)
+    sheet.SetExport(0, 1, target.TemperatureIn)
+    # Dependency is known before the first calculation
+    dependencies = flowsheet.Dependencies
+    assert target.Id in dependencies.Successors[sheet.Id]
+    assert dependencies.FindComponent(target) == dependencies.FindComponent(unitOp)
+    order = [component[0] for component in dependencies.StronglyConnectedComponents()]
+    assert order.index(unitOp) < order.index(sheet) < order.index(target)
+
+    # Edge is kept while any cell is exported to owner
+    sheet.SetExport(1, 1, other.PressureIn)
+    assert target.Id in dependencies.Successors[sheet.Id]
+    assert other.Id in dependencies.Successors[sheet.Id]
+    sheet.SetExport(0, 1, None)
+    assert target.Id not in dependencies.Successors[sheet.Id]
+    sheet.Resize(1, 3)
+    assert other.Id not in dependencies.Successors[sheet.Id]
@@ -0,0 +1,45 @@
+import numpy as np
+
+from Factory3 import Flowsheet, DummyUnitOp, Connector
+
+
+class ScalarUnitOp(DummyUnitOp):
+    # Forces scenario by scenario sweep
+    SupportsArrays = False
+
+
+def BuildPair(unitOpType):
+    flowsheet = Flowsheet()
+    first = unitOpType("First", flowsheet)
+    second = unitOpType("Second", flowsheet)
+    Connector("P", flowsheet, first.PressureOut, second.PressureIn)
+    flowsheet.SetValues({first.PressureDrop : 5.0, second.PressureDrop : 100.0})
+    flowsheet.ActivateSolver()
+    return flowsheet, first, second
+
+
+def Sweep(unitOpType, pressures):
+    flowsheet, first, second = BuildPair(unitOpType)
+    first.PressureIn.SetValue(1000.0)
+    results = flowsheet.Sweep({first.PressureIn : np.array(pressures)})
+    # State of flowsheet isn't changed
+    assert first.PressureIn.Value == 1000.0
+    assert abs(second.PressureOut.Value - 895.0) < 1e-9
+    return results
+
+
+def test_array_and_scenario_sweeps_agree():
+    arrays = Sweep(DummyUnitOp, [100.0, 200.0, 300.0])
+    scenarios = Sweep(ScalarUnitOp, [100.0, 200.0, 300.0])
+    for key, values in arrays.items():
+        assert np.array_equal(values, scenarios[key], equal_nan = True), key
+    assert np.allclose(arrays["First.PressureOut"], [95.0, 195.0, 295.0])
+
+
+def test_rejected_scenario_is_nan():
+    for unitOpType in (DummyUnitOp, ScalarUnitOp):
+        results = Sweep(unitOpType, [200.0, -50.0, 300.0])
+        assert np.allclose(results["First.PressureOut"][[0, 2]], [195.0, 295.0])
+        assert np.isnan(results["First.PressureOut"][1])
+        assert np.isnan(results["First.PressureIn"][1])
+        assert np.isnan(results["Second.PressureOut"][1])
@@ -0,0 +1,40 @@
+import json
+
+from Factory3 import Flowsheet, DummyUnitOp, CallCountTracer, TimingTracer, ChromeTraceTracer, MultiTracer, PrintTracer
+
+
+def Solve(tracer):
+    flowsheet = Flowsheet()
+    unitOp = DummyUnitOp("UO", flowsheet)
+    flowsheet.StaticsSolver.Tracer = tracer
+    flowsheet.SetValues({unitOp.PressureIn : 2e5, unitOp.PressureDrop : 1e5, unitOp.TemperatureIn : 300.0, unitOp.TemperatureDrop : 5.0})
+    flowsheet.ActivateSolver()
+    return flowsheet, unitOp
+
+
+def test_call_count_and_timing_tracers():
+    counts, timing = CallCountTracer(), TimingTracer()
+    Solve(MultiTracer(counts, timing))
+    assert counts.SolvingCalls == {"UO": 1}
+    assert counts.ForgettingCalls == {"UO": 1}
+    assert counts.CalculatedProperties == 2
+    assert counts.ForgettingPasses >= 1 and counts.SolvingPasses >= 1
+    assert [name for name, elapsed in timing.Slowest()] == ["UO"]
+
+
+def test_chrome_trace(tmp_path):
+    tracer = ChromeTraceTracer()
+    Solve(tracer)
+    path = tmp_path / "trace.json"
+    tracer.Save(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert {event["ph"] for event in events} == {"B", "E", "i"}
+    assert sum(event["ph"] == "B" for event in events) == sum(event["ph"] == "E" for event in events)
+    assert {event["name"] for event in events if event["ph"] == "i"} == {"UO.PressureOut", "UO.TemperatureOut"}
+
+
+def test_solver_is_silent_without_tracer(capsys):
+    Solve(None)
+    assert capsys.readouterr().out == ""
+    Solve(PrintTracer())
+    assert "UO" in capsys.readouterr().out
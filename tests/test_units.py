@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from Factory3 import Flowsheet, DummyUnitOp, Units, UnitTypeEnum
+
+
+def test_get_conversion_is_affine():
+    scale, offset = Units.GetConversion(UnitTypeEnum.TEMPERATURE, "C", "")
+    assert (scale, offset) == (1.0, 273.15)
+    scale, offset = Units.GetConversion(UnitTypeEnum.PRESSURE, "bar", "kPa")
+    assert abs(100.0 * scale + offset - 10000.0) < 1e-9
+
+
+def test_convert_array_in_place():
+    values = np.array([0.0, 100.0])
+    result = Units.ConvertArray(values, UnitTypeEnum.TEMPERATURE, "C", "K")
+    assert result is values
+    assert np.allclose(values, [273.15, 373.15])
+    assert np.allclose(Units.ConvertArray([1, 2], UnitTypeEnum.PRESSURE, "kPa", ""), [1000.0, 2000.0])
+
+
+def test_flowsheet_values_in_units():
+    flowsheet = Flowsheet()
+    unitOp = DummyUnitOp("UO", flowsheet)
+    unitOp.PressureIn.SetValue(2, "bar")
+    unitOp.TemperatureIn.SetValue(25, "C")
+    assert abs(unitOp.PressureIn.GetValue("kPa") - 200.0) < 1e-9
+    assert np.allclose(flowsheet.GetValues([unitOp.PressureIn, unitOp.PressureOut], "kPa"), [200.0, np.nan], equal_nan = True)
+    assert np.allclose(flowsheet.GetValues([unitOp.PressureIn, unitOp.TemperatureIn]), [2e5, 298.15])
+
+
+def test_unknown_units_raise():
+    flowsheet = Flowsheet()
+    unitOp = DummyUnitOp("UO", flowsheet)
+    with pytest.raises(Exception, match = "SetValue error"):
+        unitOp.PressureIn.SetValue(1, "kg")
+
+
+def test_unit_expressions():
+    assert abs(Units.GetConversion(UnitTypeEnum.MOLAR_ENTROPY, "kJ/[kmole*K]", "")[0] - 1.0) < 1e-12
+    assert abs(Units.GetConversion(UnitTypeEnum.MASS_FLOW, "t/d", "")[0] - 1e3 / 86400) < 1e-12
+    assert abs(Units.GetConversion(UnitTypeEnum.ACCELERATION, "km/h^2", "")[0] - 1e3 / 3600**2) < 1e-15
+    assert Units.GetConversion(UnitTypeEnum.TEMPERATURE, " C ", "") == (1.0, 273.15)
+    with pytest.raises(Exception, match = "can't be used"):
+        Units.GetConversion(UnitTypeEnum.PRESSURE, "kg/m3", "")
+
+
+@pytest.mark.parametrize("expression", ["m^0.5", "m2.5", "mC", "kK", "[m*s", "m*", "foo"])
+def test_wrong_unit_expressions_raise_parser_error(expression):
+    with pytest.raises(Exception, match = "UnitParser error!"):
+        Units.GetConversion(UnitTypeEnum.LENGTH if "m" in expression else UnitTypeEnum.TEMPERATURE, expression, "")
+
+
+@pytest.mark.parametrize("expression", ["[C]", "(C)", "[ (C) ]", "C^1", "[C]1"])
+def test_bracketed_absolute_temperature_has_bias(expression):
+    assert Units.GetConversion(UnitTypeEnum.TEMPERATURE, expression, "") == (1.0, 273.15)
+    assert np.allclose(Units.ConvertArray([25.0], UnitTypeEnum.TEMPERATURE, expression, "K"), [298.15])
+
+
+@pytest.mark.parametrize("expression", ["2*C", "C*K/K", "[C^2]/C", "C/1"])
+def test_absolute_temperature_in_products_and_powers_raises(expression):
+    with pytest.raises(Exception, match = "Absolute temperature"):
+        Units.GetConversion(UnitTypeEnum.TEMPERATURE, expression, "")
+
+
+def test_temperature_difference_units_have_no_bias():
+    assert Units.GetConversion(UnitTypeEnum.DELTA_T, "[C]", "") == (1.0, 0.0)
+    assert Units.GetConversion(UnitTypeEnum.MOLAR_ENTROPY, "J/[mole*C]", "") == (1.0, 0.0)